@@ -19,6 +19,8 @@ from typing import Optional, Dict, List, Any
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
+from db_manager import as_async
+
 # Anthropic Claude API
 try:
     import anthropic
@@ -37,11 +39,11 @@ class AdminManager:
         Инициализация AdminManager
         
         Args:
-            db_manager: Экземпляр DatabaseManager
+            db_manager: DatabaseManager или AsyncDatabaseManager
             ai_core: Экземпляр AICore
             autotrader: Экземпляр AutoTrader
         """
-        self.db_manager = db_manager
+        self.db_manager = as_async(db_manager)
         self.ai_core = ai_core
         self.autotrader = autotrader
         
@@ -105,17 +107,17 @@ class AdminManager:
             return
         
         # Получаем глобальную статистику
-        stats = self.db_manager.get_global_stats()
-        
-        # Получаем информацию о автоторговле
-        users_with_autotrade = len(self.db_manager.get_users_with_auto_trading()) if self.db_manager else 0
+        stats = await self.db_manager.get_global_stats()
+        user_cache = self.db_manager.stats().get('user_cache', {})
         
         text = (
             "📊 **СТАТИСТИКА БОТА**\n\n"
             f"👥 Всего пользователей: {stats.get('total_users', 0)}\n"
             f"💎 Активных подписок: {stats.get('active_subscriptions', 0)}\n"
+            f"{self.format_subscriptions(stats)}"
             f"📈 Всего сигналов: {stats.get('total_signals', 0)}\n"
-            f"🤖 Автоторговля включена: {users_with_autotrade} польз.\n\n"
+            f"🤖 Автоторговля включена: {stats.get('auto_trading_users', 0)} польз.\n"
+            f"🗄 Кэш пользователей: {user_cache.get('hit_rate', 0):.0f}% попаданий\n\n"
             f"🕐 Обновлено: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')} UTC"
         )
         
@@ -124,6 +126,12 @@ class AdminManager:
         
         await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
     
+    @staticmethod
+    def format_subscriptions(stats: Dict[str, Any]) -> str:
+        """Строки активных подписок по тарифам для статистики"""
+        by_type = stats.get('subscriptions_by_type') or {}
+        return ''.join(f"   • {subscription_type.upper()}: {count}\n" for subscription_type, count in by_type.items())
+    
     # ========================================
     # КОМАНДА /logs - ЛОГИ
     # ========================================
@@ -245,15 +253,17 @@ class AdminManager:
         
         if data == 'admin_stats':
             # Статистика
-            stats = self.db_manager.get_global_stats() if self.db_manager else {}
-            users_with_autotrade = len(self.db_manager.get_users_with_auto_trading()) if self.db_manager else 0
+            stats = await self.db_manager.get_global_stats() if self.db_manager else {}
+            user_cache = self.db_manager.stats().get('user_cache', {}) if self.db_manager else {}
             
             text = (
                 "📊 **СТАТИСТИКА БОТА**\n\n"
                 f"👥 Всего пользователей: {stats.get('total_users', 0)}\n"
                 f"💎 Активных подписок: {stats.get('active_subscriptions', 0)}\n"
+                f"{self.format_subscriptions(stats)}"
                 f"📈 Всего сигналов: {stats.get('total_signals', 0)}\n"
-                f"🤖 Автоторговля: {users_with_autotrade} польз.\n\n"
+                f"🤖 Автоторговля: {stats.get('auto_trading_users', 0)} польз.\n"
+                f"🗄 Кэш пользователей: {user_cache.get('hit_rate', 0):.0f}% попаданий\n\n"
                 f"🕐 {datetime.now(timezone.utc).strftime('%H:%M:%S')} UTC"
             )
             
@@ -280,7 +290,7 @@ class AdminManager:
         
         elif data == 'admin_users':
             # Список пользователей
-            users = self.db_manager.get_all_users() if self.db_manager else []
+            users = await self.db_manager.get_all_users() if self.db_manager else []
             
             text = f"👥 **ПОЛЬЗОВАТЕЛИ** ({len(users)})\n\n"
             
@@ -297,7 +307,7 @@ class AdminManager:
         
         elif data == 'admin_autotrade':
             # Информация об автоторговле
-            users_with_autotrade = self.db_manager.get_users_with_auto_trading() if self.db_manager else []
+            users_with_autotrade = await self.db_manager.get_users_with_auto_trading() if self.db_manager else []
             
             text = f"🤖 **АВТОТОРГОВЛЯ**\n\n"
             text += f"Активных пользователей: {len(users_with_autotrade)}\n\n"
@@ -319,6 +329,22 @@ class AdminManager:
                 text += "✅ AI Core активен\n"
                 text += f"📊 Активов в анализе: {len(self.ai_core.assets)}\n"
                 text += f"⏱️ Интервал: {self.ai_core.analysis_interval}сек\n"
+                if self.ai_core.adaptive_schedule:
+                    schedule = self.ai_core.scheduler.stats()
+                    text += f"📅 Адаптивное расписание: запусков {schedule['runs']}, пропущено закрытых сессий {schedule['skipped_closed']}\n"
+                
+                # Индикаторы - из общего кэша (пересчет только при новой свече)
+                features = await self.ai_core.get_features_batch(self.ai_core.assets[:5], self.ai_core.timeframes[0])
+                if features:
+                    text += "\n📈 Индикаторы (последняя закрытая свеча):\n"
+                    for symbol, item in features.items():
+                        text += f"• {symbol}: RSI {item['RSI']:.1f}, MACD diff {item['MACD_diff']:.3g}\n"
+                
+                cache = self.ai_core.feature_cache.stats()
+                text += (
+                    f"\n🧮 Кэш индикаторов: {cache['size']}/{cache['maxsize']}, "
+                    f"попаданий {cache['hit_rate']:.0f}%, расчетов {cache['computes']}\n"
+                )
             else:
                 text += "❌ AI Core не инициализирован"
             
@@ -7,13 +7,16 @@ ai_core.py - AI Core для аналитики рынка
 - Аналитику рынка через LLM (Claude/GPT)
 - Генерацию торговых сигналов на основе технического анализа
 - Использование внешних сигналов (из парсера) для обучения и улучшения анализа
-- Бесконечный цикл анализа (run_analysis_cycle)
+- Бесконечный цикл анализа (run_analysis_cycle) по адаптивному
+  расписанию активов (asset_scheduler.py)
 - Интеграция с yfinance для получения рыночных данных
 """
 
 import os
 import asyncio
 import logging
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 from typing import Optional, Dict, List, Any
 
@@ -27,19 +30,24 @@ except ImportError:
     pd = None
     np = None
 
-# Технический анализ
-try:
-    import ta
-    TA_AVAILABLE = True
-except ImportError:
-    TA_AVAILABLE = False
+# Технический анализ: ta импортируется лениво и только для бэкенда 'ta',
+# по умолчанию индикаторы считаются через numpy_indicators
+TA_AVAILABLE = importlib.util.find_spec('ta') is not None
+ta = None
 
-# yfinance для рыночных данных
-try:
-    import yfinance as yf
-    YFINANCE_AVAILABLE = True
-except ImportError:
-    YFINANCE_AVAILABLE = False
+from streaming_indicators import StreamingIndicatorEngine, indicators_match, INDICATOR_COLUMNS
+import numpy_indicators
+from candle_store import CandleStore, PERIOD_SECONDS, INTERVAL_SECONDS, OHLCV_COLUMNS, to_epoch_seconds
+import batch_signals
+from cache_utils import TTLCache, FeatureCache, normalized_hash
+from market_data import MarketDataProvider, create_provider
+from resampler import TimeframeResampler
+from signal_cooldown import SignalCooldownIndex
+from asset_scheduler import AdaptiveScheduler
+from external_signals import ExternalSignalTracker
+from signal_performance import SignalPerformanceTracker
+from analysis_executor import AnalysisExecutor, stack_results
+from db_manager import as_async
 
 # Anthropic Claude API
 try:
@@ -50,32 +58,70 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Ключ кэша LLM: цены и MACD сохраняют 6 значащих цифр, грубо округляются
+# только ограниченные осцилляторы из build_market_summary
+LLM_CACHE_COARSE = {'rsi': 2, 'bollinger': 2}
+
 
 class AICore:
     """AI Core для аналитики рынка"""
     
-    def __init__(self, db_manager=None):
+    def __init__(self, db_manager=None, fetch_concurrency: int = None, fetch_timeout: float = None,
+                 candle_store: CandleStore = None, market_data: MarketDataProvider = None,
+                 signal_bus=None):
         """
         Инициализация AI Core
         
         Args:
-            db_manager: Экземпляр DatabaseManager для сохранения сигналов
+            db_manager: DatabaseManager или AsyncDatabaseManager для сохранения сигналов
+            fetch_concurrency: Максимум одновременных загрузок рыночных данных
+                (по умолчанию AI_FETCH_CONCURRENCY или 8)
+            fetch_timeout: Таймаут загрузки одного актива в секундах
+                (по умолчанию AI_FETCH_TIMEOUT или 20)
+            candle_store: Локальное хранилище свечей (по умолчанию создается,
+                если AI_CANDLE_STORE не равен '0')
+            market_data: Источник свечей (по умолчанию create_provider():
+                MARKET_DATA_PROVIDER или yfinance)
+            signal_bus: Шина сигналов (SignalBus). Если задана, сигналы
+                публикуются подписчикам, иначе сохраняются в БД напрямую
         """
-        self.db_manager = db_manager
+        self.db_manager = as_async(db_manager)
+        self.signal_bus = signal_bus
+        
+        # Внешние сигналы читаются по курсору, агрегаты копятся в памяти
+        # (трекер синхронный, его запросы выполняются в пуле db_manager)
+        self.external_signals = ExternalSignalTracker(self.db_manager.sync if self.db_manager else None)
+        
+        # Источник рыночных данных (yfinance, replay из файлов или синтетика).
+        # Его часы задают время цикла анализа
+        self.market_data = market_data or create_provider()
         
         # Anthropic API ключ
         self.anthropic_key = os.getenv('ANTHROPIC_API_KEY')
         self.anthropic_client = None
+        self.llm_timeout = float(os.getenv('AI_LLM_TIMEOUT', '30'))
         
+        # Асинхронный клиент: запрос к LLM не блокирует event loop
+        # (polling Telegram и автотрейдинг продолжают работать)
         if ANTHROPIC_AVAILABLE and self.anthropic_key:
             try:
-                self.anthropic_client = anthropic.Anthropic(api_key=self.anthropic_key)
+                self.anthropic_client = anthropic.AsyncAnthropic(
+                    api_key=self.anthropic_key,
+                    timeout=self.llm_timeout
+                )
                 logger.info("✅ Anthropic Claude API инициализирован")
             except Exception as e:
                 logger.error(f"❌ Ошибка инициализации Claude API: {e}")
         else:
             logger.warning("⚠️ Anthropic API недоступен (отсутствует ключ или библиотека)")
         
+        # Кэш ответов LLM по нормализованной сводке рынка
+        self.llm_cache = TTLCache(
+            maxsize=int(os.getenv('AI_LLM_CACHE_SIZE', '128')),
+            ttl=float(os.getenv('AI_LLM_CACHE_TTL', '900')),
+            name='llm'
+        )
+        
         # Список активов для анализа (синхронизировано с Pocket Option)
         self.assets = [
             'EURUSD=X', 'GBPUSD=X', 'USDJPY=X', 'AUDUSD=X',
@@ -87,37 +133,117 @@ class AICore:
         # Интервал анализа (в секундах)
         self.analysis_interval = 300  # 5 минут
         
+        # Адаптивное расписание: у каждого актива свой срок следующего анализа.
+        # Закрытые сессии пропускаются, интервал зависит от волатильности.
+        # AI_ADAPTIVE_SCHEDULE=0 - все активы каждые analysis_interval секунд
+        self.adaptive_schedule = os.getenv('AI_ADAPTIVE_SCHEDULE', '1') != '0'
+        self.scheduler = AdaptiveScheduler(self.assets, base_interval=self.analysis_interval)
+        
+        # Параллельная загрузка данных: yfinance блокирующий, поэтому
+        # запросы выполняются в ограниченном пуле потоков, а не в event loop
+        self.fetch_concurrency = fetch_concurrency or int(os.getenv('AI_FETCH_CONCURRENCY', '8'))
+        self.fetch_timeout = fetch_timeout or float(os.getenv('AI_FETCH_TIMEOUT', '20'))
+        self._fetch_executor = ThreadPoolExecutor(
+            max_workers=self.fetch_concurrency,
+            thread_name_prefix='market-data'
+        )
+        
+        # Локальное хранилище свечей: из сети дозагружаются только свечи
+        # новее верхней отметки серии, остальное читается с диска.
+        # Офлайн-провайдеры (replay, synthetic) получают свое хранилище в
+        # памяти: общий файл с рабочим ботом ломал бы детерминизм прогона
+        self.candle_store = candle_store
+        if self.candle_store is None and os.getenv('AI_CANDLE_STORE', '1') != '0':
+            try:
+                self.candle_store = CandleStore(':memory:' if self.market_data.offline else None)
+            except Exception as e:
+                logger.error(f"❌ Ошибка инициализации хранилища свечей: {e}")
+        
+        # Бэкенд полного пересчета индикаторов: 'numpy' (numpy_indicators) или 'ta'
+        self.indicator_backend = os.getenv('AI_INDICATOR_BACKEND', 'numpy')
+        if self.indicator_backend == 'ta' and not TA_AVAILABLE:
+            logger.warning("⚠️ Библиотека ta не установлена - используется бэкенд numpy")
+            self.indicator_backend = 'numpy'
+        
+        # Потоковые индикаторы: на каждом цикле обрабатываются только новые свечи.
+        # Полный пересчет остается для холодного старта и периодической сверки
+        self.incremental_indicators = os.getenv('AI_INCREMENTAL_INDICATORS', '1') != '0'
+        self.indicator_validation_interval = int(os.getenv('AI_INDICATOR_VALIDATE_EVERY', '12'))
+        self.indicator_engine = StreamingIndicatorEngine()
+        self._indicator_updates: Dict[tuple, int] = {}
+        
+        # Пул процессов для индикаторов (включается AI_ANALYSIS_WORKERS > 0):
+        # event loop не блокируется расчетом, но в пул уходит вся серия.
+        # По умолчанию расчет в event loop с потоковыми индикаторами и кэшем
+        # признаков буфера - на 1-2 ядрах это быстрее
+        self.analysis_executor = None
+        analysis_workers = int(os.getenv('AI_ANALYSIS_WORKERS', '0') or 0)
+        if analysis_workers > 0:
+            self.analysis_executor = AnalysisExecutor(workers=analysis_workers)
+        
+        # Мультитаймфреймовый анализ: на актив загружается одна базовая серия
+        # (AI_BASE_INTERVAL), из нее агрегируются все AI_TIMEFRAMES
+        self.base_interval = os.getenv('AI_BASE_INTERVAL', '1m')
+        self.base_period = os.getenv('AI_BASE_PERIOD', '1d')
+        self.timeframes = [tf.strip() for tf in os.getenv('AI_TIMEFRAMES', '5m').split(',') if tf.strip()]
+        self.resamplers: Dict[str, TimeframeResampler] = {}
+        
+        # Общий кэш индикаторов последней закрытой свечи серии для цикла
+        # анализа, /short и /long, админ-панели и сводки для LLM.
+        # Ключ (symbol, timeframe, метка закрытой свечи) - запись не устаревает
+        self.feature_cache = FeatureCache(
+            maxsize=int(os.getenv('AI_FEATURE_CACHE_SIZE', '1024')),
+            name='features'
+        )
+        
+        # Подавление повторов: сигнал того же направления по той же серии
+        # отправляется повторно только после cooldown или при росте уверенности
+        self.signal_cooldown = SignalCooldownIndex(
+            cooldown_bars=int(os.getenv('AI_SIGNAL_COOLDOWN_BARS', '12')),
+            escalation=float(os.getenv('AI_SIGNAL_ESCALATION', '10'))
+        )
+        
+        # Параметры правил сигналов по активам (таблица optimizer.py,
+        # путь AI_SIGNAL_PARAMS_PATH). Без таблицы - исходные пороги и веса
+        self.signal_params = batch_signals.load_signal_params()
+        
+        # Адаптивные веса серий по фактическим результатам (signal_performance):
+        # уверенность сигнала умножается на вес до сравнения с порогом
+        self.performance = None
+        if os.getenv('AI_SIGNAL_PERFORMANCE', '1') != '0':
+            try:
+                self.performance = SignalPerformanceTracker()
+            except Exception as e:
+                logger.error(f"❌ Ошибка инициализации signal_performance: {e}")
+        
         logger.info(f"✅ AI Core инициализирован (активов: {len(self.assets)})")
     
     # ========================================
     # ПОЛУЧЕНИЕ РЫНОЧНЫХ ДАННЫХ
     # ========================================
     
-    def get_market_data(self, symbol: str, period: str = '1d', interval: str = '5m') -> Optional[Dict]:
+    def get_market_data(self, symbol: str, period: str = '1d', interval: str = '5m',
+                        start: datetime = None) -> Optional[Dict]:
         """
-        Получить рыночные данные через yfinance
+        Получить рыночные данные от провайдера (self.market_data)
         
         Args:
             symbol: Символ актива (например, 'BTC-USD')
             period: Период данных ('1d', '5d', '1mo', etc.)
             interval: Интервал ('1m', '5m', '15m', '1h', etc.)
+            start: Начало периода (если указано, period игнорируется)
         
         Returns:
             pd.DataFrame или Dict: DataFrame с ценовыми данными или None
         """
-        if not YFINANCE_AVAILABLE:
-            logger.warning("⚠️ yfinance не установлен - рыночные данные недоступны")
-            return None
-        
         if not PANDAS_AVAILABLE:
             logger.warning("⚠️ pandas не установлен - анализ данных ограничен")
             return None
         
         try:
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(period=period, interval=interval)
+            data = self.market_data.history(symbol, period=period, interval=interval, start=start)
             
-            if data.empty:
+            if data is None or data.empty:
                 logger.warning(f"⚠️ Нет данных для {symbol}")
                 return None
             
@@ -128,16 +254,103 @@ class AICore:
             logger.error(f"❌ Ошибка получения данных для {symbol}: {e}")
             return None
     
+    def load_market_data(self, symbol: str, period: str = '1d', interval: str = '5m'):
+        """
+        Получить рыночные данные через локальное хранилище свечей
+        
+        Из сети запрашиваются только свечи начиная с верхней отметки серии
+        (последняя сохраненная свеча могла быть незакрытой). Если серии нет
+        или она устарела больше чем на period (или новее часов провайдера),
+        загружается весь период. Свечи новее часов провайдера не читаются.
+        Возвращаемые данные читаются из хранилища.
+        
+        Args:
+            symbol: Символ актива
+            period: Глубина данных ('1d', '5d', '1mo', etc.)
+            interval: Интервал ('1m', '5m', '15m', '1h', etc.)
+        
+        Returns:
+            DataFrame с ценовыми данными или None
+        """
+        if not self.candle_store:
+            return self.get_market_data(symbol, period=period, interval=interval)
+        
+        period_seconds = PERIOD_SECONDS.get(period, PERIOD_SECONDS['1d'])
+        now = int(self.market_data.now().timestamp())
+        watermark = self.candle_store.get_watermark(symbol, interval)
+        
+        # Отметка новее "сейчас" (хранилище заполнено при более поздних часах)
+        # не говорит, какие свечи до now уже есть - загружаем весь период
+        if watermark is None or watermark > now or watermark < now - period_seconds:
+            fresh = self.get_market_data(symbol, period=period, interval=interval)
+        else:
+            start = datetime.fromtimestamp(watermark, tz=timezone.utc)
+            fresh = self.get_market_data(symbol, interval=interval, start=start)
+        
+        if fresh is not None:
+            self.candle_store.upsert(symbol, interval, fresh)
+        
+        # Свечи новее "сейчас" провайдера (часы реплея в прошлом) не читаются
+        return self.candle_store.load(symbol, interval, since=now - period_seconds, until=now)
+    
+    async def fetch_market_data_batch(self, symbols: List[str], period: str = '1d',
+                                      interval: str = '5m') -> Dict[str, Any]:
+        """
+        Параллельно получить рыночные данные для нескольких активов
+        
+        Загрузки выполняются в пуле потоков (не более fetch_concurrency
+        одновременно), каждая ограничена fetch_timeout. Ошибка или таймаут
+        одного актива не влияет на остальные - такой актив просто
+        отсутствует в результате. Время выполнения определяется самым
+        медленным активом, а не суммой всех загрузок.
+        
+        Args:
+            symbols: Список символов активов
+            period: Период данных ('1d', '5d', '1mo', etc.)
+            interval: Интервал ('1m', '5m', '15m', '1h', etc.)
+        
+        Returns:
+            Dict[str, DataFrame]: Данные по успешно загруженным активам
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.fetch_concurrency)
+        
+        async def fetch_one(symbol: str):
+            async with semaphore:
+                try:
+                    data = await asyncio.wait_for(
+                        loop.run_in_executor(
+                            self._fetch_executor, self.load_market_data, symbol, period, interval
+                        ),
+                        timeout=self.fetch_timeout
+                    )
+                    return symbol, data
+                except asyncio.TimeoutError:
+                    logger.warning(f"⏱️ Таймаут загрузки данных для {symbol} ({self.fetch_timeout:g}с)")
+                except Exception as e:
+                    logger.error(f"❌ Ошибка загрузки данных для {symbol}: {e}")
+                return symbol, None
+        
+        results = await asyncio.gather(*(fetch_one(symbol) for symbol in symbols))
+        
+        return {
+            symbol: data for symbol, data in results
+            if data is not None and not data.empty
+        }
+    
     # ========================================
     # ТЕХНИЧЕСКИЙ АНАЛИЗ
     # ========================================
     
-    def calculate_indicators(self, df):
+    def calculate_indicators(self, df, symbol: str = None, timeframe: str = '5m'):
         """
         Рассчитать технические индикаторы
         
         Args:
             df: DataFrame с ценовыми данными
+            symbol: Символ актива. Если указан, индикаторы обновляются
+                инкрементально по состоянию серии (symbol, timeframe)
+            timeframe: Таймфрейм серии
         
         Returns:
             DataFrame с добавленными индикаторами
@@ -146,11 +359,134 @@ class AICore:
             logger.warning("⚠️ pandas не установлен - технический анализ недоступен")
             return df
         
+        if symbol and self.incremental_indicators:
+            return self._calculate_indicators_incremental(df, symbol, timeframe)
+        
+        return self._calculate_indicators_full(df)
+    
+    def _calculate_indicators_incremental(self, df, symbol: str, timeframe: str):
+        """
+        Обновить индикаторы только по новым свечам серии
+        
+        Раз в indicator_validation_interval обновлений результат сверяется
+        с полным пересчетом; при расхождении состояние серии
+        сбрасывается и следующий цикл начинается с холодного старта.
+        """
+        try:
+            df = self.indicator_engine.apply_frame(symbol, timeframe, df)
+        except Exception as e:
+            logger.error(f"❌ Ошибка потокового расчета индикаторов для {symbol}: {e}")
+            self.indicator_engine.reset(symbol, timeframe)
+            return self._calculate_indicators_full(df)
+        
+        if self.indicator_validation_interval > 0:
+            key = (symbol, timeframe)
+            updates = self._indicator_updates.get(key, 0) + 1
+            self._indicator_updates[key] = updates
+            
+            if updates % self.indicator_validation_interval == 0:
+                full = self._calculate_indicators_full(df[['High', 'Low', 'Close']].copy())
+                if not indicators_match(df, full):
+                    logger.warning(f"⚠️ Потоковые индикаторы {symbol} {timeframe} расходятся с полным пересчетом - сброс состояния")
+                    self.indicator_engine.reset(symbol, timeframe)
+                    return full
+        
+        return df
+    
+    def update_buffer_indicators(self, symbol: str, timeframe: str, buffer) -> Optional[int]:
+        """
+        Обновить индикаторы серии в ее кольцевом буфере свечей
+        
+        Сверка с полным пересчетом - как в _calculate_indicators_incremental
+        (по последней строке, полный пересчет - numpy_indicators).
+        
+        Args:
+            symbol: Символ актива
+            timeframe: Таймфрейм серии
+            buffer: CandleRingBuffer таймфрейма
+        
+        Returns:
+            Optional[int]: Количество обработанных свечей; None, если индикаторы
+            серии не удалось рассчитать и в этом цикле ее нужно пропустить
+        """
+        try:
+            processed = self.indicator_engine.apply_buffer(symbol, timeframe, buffer)
+        except Exception as e:
+            logger.error(f"❌ Ошибка потокового расчета индикаторов для {symbol}: {e}")
+            return self._reapply_buffer_indicators(symbol, timeframe, buffer)
+        
+        if self.indicator_validation_interval > 0:
+            key = (symbol, timeframe)
+            updates = self._indicator_updates.get(key, 0) + 1
+            self._indicator_updates[key] = updates
+            
+            if updates % self.indicator_validation_interval == 0:
+                view = buffer.view()
+                full = numpy_indicators.compute_indicators(
+                    *(view[:, buffer.positions[column]].astype(np.float64) for column in ('High', 'Low', 'Close'))
+                )
+                first = buffer.positions[INDICATOR_COLUMNS[0]]
+                rtol = 1e-6 if buffer.dtype == np.float64 else 1e-5
+                if not np.allclose(view[-1, first:first + len(INDICATOR_COLUMNS)], full[-1],
+                                   rtol=rtol, atol=1e-8, equal_nan=True):
+                    logger.warning(f"⚠️ Потоковые индикаторы {symbol} {timeframe} расходятся с полным пересчетом - сброс состояния")
+                    processed = self._reapply_buffer_indicators(symbol, timeframe, buffer)
+        
+        return processed
+    
+    def _reapply_buffer_indicators(self, symbol: str, timeframe: str, buffer) -> Optional[int]:
+        """Сбросить состояние серии и пересчитать индикаторы буфера заново (None при ошибке)"""
+        self.indicator_engine.reset(symbol, timeframe)
+        try:
+            return self.indicator_engine.apply_buffer(symbol, timeframe, buffer)
+        except Exception as e:
+            logger.error(f"❌ Повторный расчет индикаторов {symbol} {timeframe} не удался, серия пропущена: {e}")
+            # Следующий цикл начнет серию с нуля
+            self.indicator_engine.reset(symbol, timeframe)
+            return None
+    
+    def _calculate_indicators_full(self, df):
+        """
+        Полный пересчет индикаторов по всему DataFrame выбранным бэкендом
+        
+        Args:
+            df: DataFrame с ценовыми данными
+        
+        Returns:
+            DataFrame с добавленными индикаторами
+        """
+        if self.indicator_backend == 'ta':
+            return self._calculate_indicators_ta(df)
+        
+        try:
+            df = numpy_indicators.calculate_indicators(df)
+            logger.info(f"✅ Рассчитаны индикаторы для {len(df)} свечей")
+            return df
+        
+        except Exception as e:
+            logger.error(f"❌ Ошибка расчета индикаторов: {e}")
+            return df
+    
+    def _calculate_indicators_ta(self, df):
+        """
+        Полный пересчет индикаторов через библиотеку ta
+        
+        Args:
+            df: DataFrame с ценовыми данными
+        
+        Returns:
+            DataFrame с добавленными индикаторами
+        """
+        global ta
+        
         if not TA_AVAILABLE:
             logger.warning("⚠️ Библиотека ta не установлена, технический анализ ограничен")
             return df
         
         try:
+            if ta is None:
+                import ta
+            
             # RSI (Relative Strength Index)
             df['RSI'] = ta.momentum.RSIIndicator(df['Close'], window=14).rsi()
             
@@ -182,13 +518,34 @@ class AICore:
             logger.error(f"❌ Ошибка расчета индикаторов: {e}")
             return df
     
-    def generate_signal(self, df, symbol: str) -> Optional[Dict[str, Any]]:
+    def get_signal_params(self, symbol: str, timeframe: str = '5m') -> Dict[str, float]:
+        """Параметры правил сигналов для актива (с учетом таблицы оптимизатора)"""
+        return batch_signals.resolve_signal_params(self.signal_params, symbol, timeframe)
+    
+    def get_signal_weight(self, symbol: str, timeframe: str = '5m') -> float:
+        """Адаптивный вес уверенности серии (1.0 без истории результатов)"""
+        return self.performance.weight(symbol, timeframe) if self.performance else 1.0
+    
+    def record_signal_result(self, signal: Dict[str, Any]) -> Optional[float]:
+        """
+        Учесть результат закрытого сигнала в адаптивных весах
+        
+        Args:
+            signal: Сигнал с symbol, timeframe и result ('win' / 'loss')
+        
+        Returns:
+            float: Новый вес серии или None
+        """
+        return self.performance.on_signal_resolved(signal) if self.performance else None
+    
+    def generate_signal(self, df, symbol: str, timeframe: str = '5m') -> Optional[Dict[str, Any]]:
         """
         Генерирует торговый сигнал на основе технического анализа
         
         Args:
             df: DataFrame с индикаторами
             symbol: Символ актива
+            timeframe: Таймфрейм (для выбора параметров правил)
         
         Returns:
             Dict: Торговый сигнал или None
@@ -205,19 +562,20 @@ class AICore:
             last = df.iloc[-1]
             prev = df.iloc[-2]
             
+            params = self.get_signal_params(symbol, timeframe)
             signal_type = None
             confidence = 0.0
             reasons = []
             
             # Анализ RSI
             if 'RSI' in last and not (pd and pd.isna(last['RSI'])):
-                if last['RSI'] < 30:
+                if last['RSI'] < params['rsi_oversold']:
                     signal_type = 'CALL'
-                    confidence += 20
+                    confidence += params['rsi_weight']
                     reasons.append(f"RSI перепродан ({last['RSI']:.1f})")
-                elif last['RSI'] > 70:
+                elif last['RSI'] > params['rsi_overbought']:
                     signal_type = 'PUT'
-                    confidence += 20
+                    confidence += params['rsi_weight']
                     reasons.append(f"RSI перекуплен ({last['RSI']:.1f})")
             
             # Анализ MACD
@@ -225,12 +583,12 @@ class AICore:
                 if last['MACD_diff'] > 0 and prev['MACD_diff'] < 0:
                     if signal_type != 'PUT':
                         signal_type = 'CALL'
-                        confidence += 25
+                        confidence += params['macd_weight']
                         reasons.append("MACD бычий кроссовер")
                 elif last['MACD_diff'] < 0 and prev['MACD_diff'] > 0:
                     if signal_type != 'CALL':
                         signal_type = 'PUT'
-                        confidence += 25
+                        confidence += params['macd_weight']
                         reasons.append("MACD медвежий кроссовер")
             
             # Анализ Bollinger Bands
@@ -238,16 +596,19 @@ class AICore:
                 if not (pd and pd.isna(last['BB_lower'])) and last['Close'] < last['BB_lower']:
                     if signal_type != 'PUT':
                         signal_type = 'CALL'
-                        confidence += 15
+                        confidence += params['bb_weight']
                         reasons.append("Цена ниже нижней полосы Боллинджера")
                 elif not (pd and pd.isna(last['BB_upper'])) and last['Close'] > last['BB_upper']:
                     if signal_type != 'CALL':
                         signal_type = 'PUT'
-                        confidence += 15
+                        confidence += params['bb_weight']
                         reasons.append("Цена выше верхней полосы Боллинджера")
             
+            # Поправка на фактические результаты серии
+            confidence *= self.get_signal_weight(symbol, timeframe)
+            
             # Если сигнал слабый, не генерируем
-            if confidence < 40:
+            if signal_type is None or confidence < params['min_confidence']:
                 return None
             
             # Формируем сигнал
@@ -258,7 +619,7 @@ class AICore:
                 'entry_price': float(last['Close']),
                 'timestamp': datetime.now(timezone.utc).isoformat(),
                 'reasons': reasons,
-                'timeframe': '5m'
+                'timeframe': timeframe
             }
             
             logger.info(f"📊 Сигнал сгенерирован: {symbol} {signal_type} (уверенность: {confidence:.0f}%)")
@@ -268,6 +629,228 @@ class AICore:
             logger.error(f"❌ Ошибка генерации сигнала: {e}")
             return None
     
+    def generate_signals_batch(self, frames: Dict[str, Any], timeframe: str = '5m',
+                               stacked: Dict[str, Any] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Сгенерировать сигналы для всех активов одним векторизованным вызовом
+        
+        Правила и результат совпадают с generate_signal. Для серий, чьи
+        индикаторы посчитаны потоково и актуальны, значения берутся прямо
+        из состояния движка, минуя DataFrame.
+        
+        Args:
+            frames: {symbol: DataFrame с индикаторами}
+            timeframe: Таймфрейм сигналов
+            stacked: Готовые последние значения индикаторов (формат
+                batch_signals.stack_latest_rows, например из пула анализа)
+                вместо frames
+        
+        Returns:
+            Dict: {symbol: сигнал} только для активов с сигналом
+        """
+        if not PANDAS_AVAILABLE:
+            logger.warning("⚠️ pandas не установлен - генерация сигналов недоступна")
+            return {}
+        
+        try:
+            states = {}
+            remaining = {}
+            for symbol, df in (frames or {}).items():
+                state = self.indicator_engine.states.get((symbol, timeframe)) if self.incremental_indicators else None
+                if state is not None and df is not None and len(df) and state.last_timestamp == df.index[-1]:
+                    states[symbol] = state
+                else:
+                    remaining[symbol] = df
+            
+            symbols = stacked['symbols'] if stacked is not None else list(frames or {})
+            weights = self.performance.weights(symbols, timeframe) if self.performance else None
+            
+            signals = {}
+            if stacked is not None:
+                signals = batch_signals.generate_signals_batch(
+                    stacked=stacked, timeframe=timeframe, param_table=self.signal_params, weights=weights
+                )
+            if states:
+                signals.update(batch_signals.generate_signals_batch(
+                    states=states, timeframe=timeframe, param_table=self.signal_params, weights=weights
+                ))
+            if remaining:
+                signals.update(batch_signals.generate_signals_batch(
+                    remaining, timeframe=timeframe, param_table=self.signal_params, weights=weights
+                ))
+            
+            for symbol, signal in signals.items():
+                logger.info(f"📊 Сигнал сгенерирован: {symbol} {signal['signal_type']} (уверенность: {signal['confidence']:.0f}%)")
+            
+            return signals
+        
+        except Exception as e:
+            logger.error(f"❌ Ошибка пакетной генерации сигналов: {e}")
+            return {}
+    
+    # ========================================
+    # ПРИЗНАКИ (ОБЩИЙ КЭШ ИНДИКАТОРОВ)
+    # ========================================
+    
+    def nearest_timeframe(self, timeframe: str) -> str:
+        """Ближайший к timeframe таймфрейм из self.timeframes (агрегатор строит только их)"""
+        if timeframe in self.timeframes:
+            return timeframe
+        seconds = INTERVAL_SECONDS.get(timeframe, 300)
+        return min(self.timeframes, key=lambda tf: abs(INTERVAL_SECONDS.get(tf, 0) - seconds))
+    
+    def _closed_rows(self, buffer, timeframe: str) -> int:
+        """Сколько первых свечей буфера уже закрыто к текущему моменту"""
+        closed_before = self.market_data.now().timestamp() - INTERVAL_SECONDS.get(timeframe, 300)
+        return int(np.searchsorted(buffer.timestamps(), closed_before, side='right'))
+    
+    @staticmethod
+    def _compute_features(symbol: str, timeframe: str, timestamp: int, ohlc) -> Dict[str, Any]:
+        """Индикаторы последней свечи по массиву (свечи, OHLC) - выполняется в потоке"""
+        high, low, close = ohlc[:, 1], ohlc[:, 2], ohlc[:, 3]
+        values = numpy_indicators.compute_indicators(high, low, close)
+        features = {'symbol': symbol, 'timeframe': timeframe, 'timestamp': timestamp, 'Close': float(close[-1])}
+        features.update(zip(INDICATOR_COLUMNS, values[-1].tolist()))
+        features['MACD_diff_prev'] = float(values[-2, INDICATOR_COLUMNS.index('MACD_diff')])
+        return features
+    
+    def _cache_buffer_features(self, symbol: str, timeframe: str, buffer):
+        """
+        Положить в кэш индикаторы последней закрытой свечи, уже записанные
+        циклом анализа в буфер (без пересчета)
+        """
+        rows = self._closed_rows(buffer, timeframe)
+        if rows < 2:
+            return
+        
+        timestamp = int(buffer.timestamps()[rows - 1])
+        key = (symbol, timeframe, timestamp)
+        if key in self.feature_cache:
+            return
+        
+        last, prev = buffer.view()[rows - 1], buffer.view()[rows - 2]
+        positions = buffer.positions
+        features = {'symbol': symbol, 'timeframe': timeframe, 'timestamp': timestamp,
+                    'Close': float(last[positions['Close']])}
+        features.update({column: float(last[positions[column]]) for column in INDICATOR_COLUMNS})
+        features['MACD_diff_prev'] = float(prev[positions['MACD_diff']])
+        self.feature_cache.set(key, features)
+    
+    async def _ensure_series(self, symbols: List[str]):
+        """
+        Загрузить свечи активов, для которых еще нет данных в агрегаторе
+        (параллельные запросы одного актива выполняют одну загрузку)
+        """
+        async def load(symbol: str) -> bool:
+            market_data = await self.fetch_market_data_batch(
+                [symbol], period=self.base_period, interval=self.base_interval
+            )
+            df = market_data.get(symbol)
+            if df is None:
+                return False
+            self.get_resampler(symbol).update_frame(df)
+            return True
+        
+        missing = [symbol for symbol in symbols if symbol not in self.resamplers]
+        await asyncio.gather(*(
+            self.feature_cache.get_or_compute(('series', symbol), lambda symbol=symbol: load(symbol), store=False)
+            for symbol in missing
+        ))
+    
+    async def get_features(self, symbol: str, timeframe: str = '5m') -> Optional[Dict[str, Any]]:
+        """
+        Индикаторы последней закрытой свечи серии (через общий кэш)
+        
+        Свечи берутся из агрегатора (обновляется циклом анализа); для
+        активов без данных выполняется загрузка. Расчет выполняется
+        в потоке один раз на (symbol, timeframe, метка свечи), параллельные
+        запросы того же ключа ждут его результат.
+        
+        Args:
+            symbol: Символ актива
+            timeframe: Таймфрейм (заменяется ближайшим из self.timeframes)
+        
+        Returns:
+            Dict: symbol, timeframe, timestamp, Close, колонки индикаторов,
+            MACD_diff_prev; None, если закрытых свечей меньше двух
+        """
+        if not PANDAS_AVAILABLE:
+            return None
+        
+        timeframe = self.nearest_timeframe(timeframe)
+        await self._ensure_series([symbol])
+        resampler = self.resamplers.get(symbol)
+        buffer = resampler.buffer(timeframe) if resampler else None
+        if not buffer:
+            return None
+        
+        rows = self._closed_rows(buffer, timeframe)
+        if rows < 2:
+            return None
+        
+        timestamp = int(buffer.timestamps()[rows - 1])
+        # Копия свечей: буфер может обновиться, пока идет расчет в потоке
+        ohlc = buffer.view()[:rows, :len(OHLCV_COLUMNS)].astype(np.float64)
+        
+        try:
+            return await self.feature_cache.get_or_compute(
+                (symbol, timeframe, timestamp),
+                lambda: asyncio.to_thread(self._compute_features, symbol, timeframe, timestamp, ohlc)
+            )
+        except Exception as e:
+            logger.error(f"❌ Ошибка расчета индикаторов {symbol} {timeframe}: {e}")
+            return None
+    
+    async def get_features_batch(self, symbols: List[str] = None, timeframe: str = '5m') -> Dict[str, Dict[str, Any]]:
+        """Индикаторы последней закрытой свечи нескольких активов: {symbol: признаки}"""
+        symbols = symbols or self.assets
+        await self._ensure_series(symbols)
+        features = await asyncio.gather(*(self.get_features(symbol, timeframe) for symbol in symbols))
+        return {symbol: item for symbol, item in zip(symbols, features) if item}
+    
+    async def get_latest_signal(self, timeframe: str = '5m') -> Optional[Dict[str, Any]]:
+        """
+        Самый уверенный сигнал по закрытым свечам всех активов
+        (для /short и /long)
+        
+        Returns:
+            Dict: Сигнал в формате generate_signal или None
+        """
+        timeframe = self.nearest_timeframe(timeframe)
+        features = await self.get_features_batch(timeframe=timeframe)
+        if not features:
+            return None
+        
+        symbols = list(features)
+        stacked = {'symbols': symbols}
+        for field, column in (('close', 'Close'), ('rsi', 'RSI'), ('macd_diff', 'MACD_diff'),
+                              ('macd_diff_prev', 'MACD_diff_prev'), ('bb_upper', 'BB_upper'),
+                              ('bb_lower', 'BB_lower')):
+            stacked[field] = np.array([features[symbol][column] for symbol in symbols], dtype=np.float64)
+        
+        signals = self.generate_signals_batch(None, timeframe=timeframe, stacked=stacked)
+        if not signals:
+            return None
+        return max(signals.values(), key=lambda signal: signal['confidence'])
+    
+    async def build_market_summary(self, timeframe: str = '5m', symbols: List[str] = None) -> str:
+        """
+        Текстовая сводка индикаторов по активам (вход для analyze_with_llm)
+        
+        Returns:
+            str: Строка на актив: цена, RSI, MACD, положение в полосах Боллинджера
+        """
+        timeframe = self.nearest_timeframe(timeframe)
+        lines = []
+        for symbol, item in (await self.get_features_batch(symbols, timeframe)).items():
+            band = item['BB_upper'] - item['BB_lower']
+            position = (item['Close'] - item['BB_lower']) / band * 100 if band > 0 else float('nan')
+            lines.append(
+                f"{symbol} ({timeframe}): цена {item['Close']:.5g}, RSI {item['RSI']:.1f}, "
+                f"MACD diff {item['MACD_diff']:.3g}, Bollinger {position:.0f}%"
+            )
+        return "\n".join(lines)
+    
     # ========================================
     # LLM АНАЛИЗ (ОПЦИОНАЛЬНО)
     # ========================================
@@ -276,6 +859,10 @@ class AICore:
         """
         Анализ рынка с помощью Claude
         
+        Одинаковые (с точностью до регистра, пробелов и мелких колебаний
+        RSI и положения в полосах) сводки в пределах AI_LLM_CACHE_TTL отдаются из кэша.
+        Запрос ограничен AI_LLM_TIMEOUT и отменяется вместе с вызывающей задачей.
+        
         Args:
             market_summary: Сводка по рынку
         
@@ -285,6 +872,12 @@ class AICore:
         if not self.anthropic_client:
             return None
         
+        cache_key = normalized_hash(market_summary, coarse=LLM_CACHE_COARSE)
+        cached = self.llm_cache.get(cache_key)
+        if cached is not None:
+            logger.info("♻️ LLM анализ взят из кэша")
+            return cached
+        
         try:
             prompt = f"""Ты - опытный трейдер. Проанализируй следующую рыночную ситуацию и дай краткие рекомендации:
 
@@ -292,18 +885,26 @@ class AICore:
 
 Ответь кратко (2-3 предложения): какие активы сейчас интересны для торговли и почему?"""
             
-            message = self.anthropic_client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=300,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
+            message = await asyncio.wait_for(
+                self.anthropic_client.messages.create(
+                    model="claude-3-5-sonnet-20241022",
+                    max_tokens=300,
+                    messages=[
+                        {"role": "user", "content": prompt}
+                    ]
+                ),
+                timeout=self.llm_timeout
             )
             
             analysis = message.content[0].text
+            self.llm_cache.set(cache_key, analysis)
             logger.info(f"✅ LLM анализ получен: {analysis[:100]}...")
             return analysis
         
+        except asyncio.TimeoutError:
+            logger.warning(f"⏱️ LLM анализ не получен за {self.llm_timeout:g}с")
+            return None
+        
         except Exception as e:
             logger.error(f"❌ Ошибка LLM анализа: {e}")
             return None
@@ -314,20 +915,19 @@ class AICore:
     
     async def get_external_signals(self) -> List[Dict[str, Any]]:
         """
-        Получить внешние сигналы из парсера для анализа
+        Получить новые внешние сигналы из парсера (после курсора)
         
         Returns:
-            List[Dict]: Список внешних сигналов из БД
+            List[Dict]: Внешние сигналы, появившиеся с прошлого вызова
         """
         if not self.db_manager:
             return []
         
         try:
-            # Получаем сигналы, помеченные как внешние (от парсера)
-            signals = self.db_manager.get_external_signals()
+            signals = await self.db_manager.run(self.external_signals.fetch_new)
             
             if signals:
-                logger.info(f"📨 Получено {len(signals)} внешних сигналов для анализа")
+                logger.info(f"📨 Получено {len(signals)} новых внешних сигналов для анализа")
             
             return signals
         
@@ -339,37 +939,24 @@ class AICore:
         """
         Анализ внешних сигналов для обучения и улучшения модели
         
+        Новые сигналы добавляются к накопительным агрегатам по активам
+        и направлениям; курсор и агрегаты сохраняет в БД цикл анализа.
+        
         Args:
-            external_signals: Список внешних сигналов
+            external_signals: Новые внешние сигналы
         
         Returns:
-            Dict: Статистика по внешним сигналам
+            Dict: Статистика по внешним сигналам (total - за все время, new - новые)
         """
         if not external_signals:
             return {}
         
         try:
-            # Группируем сигналы по активам
-            by_symbol = {}
-            by_type = {'CALL': 0, 'PUT': 0}
-            
-            for signal in external_signals:
-                symbol = signal.get('symbol', 'UNKNOWN')
-                signal_type = signal.get('signal_type', 'UNKNOWN')
-                
-                if symbol not in by_symbol:
-                    by_symbol[symbol] = {'CALL': 0, 'PUT': 0}
-                
-                by_symbol[symbol][signal_type] = by_symbol[symbol].get(signal_type, 0) + 1
-                by_type[signal_type] = by_type.get(signal_type, 0) + 1
+            new = self.external_signals.ingest(external_signals)
             
-            logger.info(f"📊 Анализ внешних сигналов: {by_type}")
+            logger.info(f"📊 Анализ внешних сигналов: {self.external_signals.by_type}")
             
-            return {
-                'total': len(external_signals),
-                'by_symbol': by_symbol,
-                'by_type': by_type
-            }
+            return self.external_signals.stats(new)
         
         except Exception as e:
             logger.error(f"❌ Ошибка анализа внешних сигналов: {e}")
@@ -379,6 +966,203 @@ class AICore:
     # БЕСКОНЕЧНЫЙ ЦИКЛ АНАЛИЗА
     # ========================================
     
+    def get_resampler(self, symbol: str) -> TimeframeResampler:
+        """Получить (или создать) агрегатор таймфреймов актива"""
+        resampler = self.resamplers.get(symbol)
+        if resampler is None:
+            resampler = TimeframeResampler(
+                self.timeframes,
+                base_interval=self.base_interval,
+                history_seconds=PERIOD_SECONDS.get(self.base_period, PERIOD_SECONDS['1d'])
+            )
+            self.resamplers[symbol] = resampler
+        return resampler
+    
+    def build_timeframe_frames(self, symbol: str, base_df) -> Dict[str, Any]:
+        """
+        Обновить агрегатор базовыми свечами и получить свечи всех таймфреймов
+        
+        Args:
+            symbol: Символ актива
+            base_df: Свечи базового таймфрейма (AI_BASE_INTERVAL)
+        
+        Returns:
+            Dict: {timeframe: DataFrame} для таймфреймов из self.timeframes
+        """
+        resampler = self.get_resampler(symbol)
+        resampler.update_frame(base_df)
+        
+        frames = {}
+        for timeframe in self.timeframes:
+            df = resampler.frame(timeframe)
+            if df is not None:
+                frames[timeframe] = df
+        return frames
+    
+    def get_close_series(self, symbol: str, since: int):
+        """
+        Цены закрытия базовых свечей актива начиная с since
+        
+        Сначала используются свечи агрегатора в памяти, затем - локальное
+        хранилище свечей. Источник цен для SignalOutcomeResolver.
+        
+        Args:
+            symbol: Символ актива
+            since: Минимальная метка времени (Unix-секунды)
+        
+        Returns:
+            Tuple: (timestamps, closes) массивы NumPy или None
+        """
+        resampler = self.resamplers.get(symbol)
+        if resampler is not None:
+            # Вызывается из потока, а event loop тем временем дописывает буфер:
+            # метки и цены берутся одним снимком под блокировкой буфера
+            series = resampler.buffer(self.base_interval).column_since('Close', since)
+            if series is not None:
+                return series
+        
+        if self.candle_store:
+            df = self.candle_store.load(symbol, self.base_interval, since=since,
+                                        until=int(self.market_data.now().timestamp()))
+            if df is not None:
+                timestamps = np.array(to_epoch_seconds(df.index), dtype=np.int64)
+                return timestamps, df['Close'].to_numpy(dtype=np.float64)
+        
+        return None
+    
+    async def analyze_assets(self, symbols: List[str] = None) -> int:
+        """
+        Один проход анализа: загрузка данных, индикаторы и сигналы
+        
+        На каждый актив выполняется одна загрузка базовой серии; свечи
+        всех таймфреймов из self.timeframes агрегируются из нее.
+        
+        Args:
+            symbols: Список активов (по умолчанию self.assets)
+        
+        Returns:
+            int: Количество сгенерированных сигналов
+        """
+        symbols = symbols or self.assets
+        market_data = await self.fetch_market_data_batch(
+            symbols, period=self.base_period, interval=self.base_interval
+        )
+        
+        frames: Dict[str, Dict[str, Any]] = {timeframe: {} for timeframe in self.timeframes}
+        buffers: Dict[str, Dict[str, Any]] = {timeframe: {} for timeframe in self.timeframes}
+        pool_series = []
+        for symbol in symbols:
+            df = market_data.get(symbol)
+            if df is None:
+                continue
+            
+            # Волатильность базовой серии задает интервал следующего анализа
+            if 'Close' in df:
+                self.scheduler.update_volatility(symbol, df['Close'].to_numpy())
+            
+            if self.analysis_executor:
+                # Индикаторы считаются в пуле процессов по массивам свечей
+                resampler = self.get_resampler(symbol)
+                resampler.update_frame(df)
+                for timeframe in self.timeframes:
+                    buffer = resampler.buffer(timeframe)
+                    if buffer:
+                        pool_series.append(((symbol, timeframe), buffer.view()))
+            elif self.incremental_indicators:
+                # Индикаторы пишутся в кольцевые буферы свечей на место
+                resampler = self.get_resampler(symbol)
+                resampler.update_frame(df)
+                for timeframe in self.timeframes:
+                    buffer = resampler.buffer(timeframe)
+                    if buffer and self.update_buffer_indicators(symbol, timeframe, buffer) is not None:
+                        self._cache_buffer_features(symbol, timeframe, buffer)
+                        buffers[timeframe][symbol] = buffer
+            else:
+                # Рассчитываем индикаторы для каждого таймфрейма
+                for timeframe, tf_df in self.build_timeframe_frames(symbol, df).items():
+                    frames[timeframe][symbol] = self.calculate_indicators(tf_df, symbol=symbol, timeframe=timeframe)
+            
+            # Отдаем управление event loop между активами
+            await asyncio.sleep(0)
+        
+        stacked: Dict[str, Dict[str, Any]] = {timeframe: {} for timeframe in self.timeframes}
+        if pool_series:
+            # Event loop только ожидает результаты пула
+            for (symbol, timeframe), values in (await self.analysis_executor.compute(pool_series)).items():
+                stacked[timeframe][symbol] = values
+        
+        # Генерируем сигналы сразу по всем активам (по таймфреймам) и
+        # отправляем их, не дожидаясь остальных таймфреймов
+        signals_generated = 0
+        for timeframe in self.timeframes:
+            if frames[timeframe]:
+                signals = self.generate_signals_batch(frames[timeframe], timeframe=timeframe)
+            elif buffers[timeframe]:
+                signals = self.generate_signals_batch(
+                    None, timeframe=timeframe, stacked=batch_signals.stack_candle_buffers(buffers[timeframe])
+                )
+            elif stacked[timeframe]:
+                signals = self.generate_signals_batch(
+                    None, timeframe=timeframe, stacked=stack_results(stacked[timeframe])
+                )
+            else:
+                continue
+            
+            # Повторы уже отправленных сигналов не сохраняются и не рассылаются;
+            # в индекс cooldown попадают только действительно отправленные
+            now = self.market_data.now().timestamp()
+            for signal in signals.values():
+                if not self.signal_cooldown.should_emit(signal, now):
+                    continue
+                if await self.emit_signal(signal):
+                    self.signal_cooldown.record(signal, now)
+                    signals_generated += 1
+        
+        return signals_generated
+    
+    async def emit_signal(self, signal: Dict[str, Any]) -> bool:
+        """
+        Отправить сигнал: опубликовать в шину или сохранить в БД
+        
+        Args:
+            signal: Сгенерированный сигнал
+        
+        Returns:
+            bool: True, если сигнал сохранен (подтвердили подписчики шины
+            с confirm=True или вернул add_signal)
+        """
+        # Помечаем как сигнал от AI Core
+        signal['source'] = 'ai_core'
+        
+        if self.signal_bus:
+            # Запись в БД, автоторговля и рассылка - подписчики шины;
+            # ждем подтверждающих подписчиков (запись в БД)
+            return await self.signal_bus.deliver(signal)
+        
+        if self.db_manager:
+            # Сохраняем в БД
+            return bool(await self.db_manager.add_signal(signal))
+        
+        return False
+    
+    async def rebuild_signal_cooldown(self) -> int:
+        """
+        Восстановить индекс cooldown из недавних сигналов в БД
+        
+        Returns:
+            int: Количество активных записей
+        """
+        now = self.market_data.now()
+        if not self.db_manager:
+            return 0
+        
+        longest = max(
+            (self.signal_cooldown.cooldown_seconds(tf) for tf in self.timeframes),
+            default=self.signal_cooldown.cooldown_seconds('5m')
+        )
+        rows = await self.db_manager.get_recent_signals(now - timedelta(seconds=longest), source='ai_core')
+        return self.signal_cooldown.rebuild(rows, now.timestamp())
+    
     async def run_analysis_cycle(self):
         """
         Бесконечный цикл аналитики рынка
@@ -388,50 +1172,58 @@ class AICore:
         logger.info("🔍 Запуск бесконечного цикла аналитики...")
         logger.info("📊 Режим: собственный анализ + обучение на внешних сигналах")
         
+        try:
+            await self.rebuild_signal_cooldown()
+        except Exception as e:
+            logger.error(f"❌ Ошибка восстановления индекса cooldown: {e}")
+        
+        try:
+            if self.db_manager:
+                await self.db_manager.run(self.external_signals.load)
+        except Exception as e:
+            logger.error(f"❌ Ошибка восстановления курсора внешних сигналов: {e}")
+        
         iteration = 0
+        external_checked_at = None
         
         while True:
             try:
-                iteration += 1
-                logger.info(f"📊 Итерация анализа #{iteration}")
+                now = self.market_data.now().timestamp()
                 
-                # Получаем внешние сигналы для анализа
-                external_signals = await self.get_external_signals()
-                if external_signals:
-                    external_stats = self.analyze_external_signals(external_signals)
-                    logger.info(f"📈 Внешние сигналы: {external_stats.get('total', 0)}")
+                # Внешние сигналы проверяются раз в analysis_interval
+                if external_checked_at is None or now - external_checked_at >= self.analysis_interval:
+                    external_checked_at = now
+                    external_signals = await self.get_external_signals()
+                    if external_signals:
+                        external_stats = self.analyze_external_signals(external_signals)
+                        logger.info(f"📈 Внешние сигналы: +{external_stats.get('new', 0)} (всего {external_stats.get('total', 0)})")
+                        await self.db_manager.run(self.external_signals.persist)
                 
-                # Анализируем каждый актив
-                signals_generated = 0
+                # Активы, которым пора на анализ (рынок открыт и срок наступил)
+                symbols = self.scheduler.pop_due(now) if self.adaptive_schedule else list(self.assets)
                 
-                for symbol in self.assets:
-                    # Получаем данные
-                    df = self.get_market_data(symbol, period='1d', interval='5m')
+                if symbols:
+                    iteration += 1
+                    logger.info(f"📊 Итерация анализа #{iteration} (активов: {len(symbols)})")
                     
-                    if df is None or df.empty:
-                        continue
+                    try:
+                        # Данные выбранных активов загружаются параллельно
+                        signals_generated = await self.analyze_assets(symbols)
+                    finally:
+                        if self.adaptive_schedule:
+                            finished = self.market_data.now().timestamp()
+                            for symbol in symbols:
+                                self.scheduler.complete(symbol, finished)
                     
-                    # Рассчитываем индикаторы
-                    df = self.calculate_indicators(df)
-                    
-                    # Генерируем сигнал на основе технического анализа
-                    signal = self.generate_signal(df, symbol)
-                    
-                    if signal and self.db_manager:
-                        # Помечаем как сигнал от AI Core
-                        signal['source'] = 'ai_core'
-                        
-                        # Сохраняем в БД
-                        self.db_manager.add_signal(signal)
-                        signals_generated += 1
-                    
-                    # Небольшая задержка между активами
-                    await asyncio.sleep(1)
-                
-                logger.info(f"✅ Итерация #{iteration} завершена. Сигналов сгенерировано: {signals_generated}")
+                    logger.info(f"✅ Итерация #{iteration} завершена. Сигналов сгенерировано: {signals_generated}")
                 
-                # Ждем до следующей итерации
-                await asyncio.sleep(self.analysis_interval)
+                # Ждем до ближайшего срока (не дольше analysis_interval)
+                wait = self.analysis_interval
+                if self.adaptive_schedule:
+                    next_due = self.scheduler.seconds_until_next(self.market_data.now().timestamp())
+                    if next_due is not None:
+                        wait = min(wait, max(next_due, 1))
+                await self.market_data.sleep(wait)
             
             except Exception as e:
                 logger.error(f"❌ Ошибка в цикле анализа: {e}")
@@ -0,0 +1,235 @@
+"""
+analysis_executor.py - Расчет индикаторов в пуле процессов
+Версия: 1.0
+Дата: 2026-10-18
+
+Обеспечивает:
+- Вынос расчета индикаторов (numpy_indicators) из event loop в пул
+  процессов: polling Telegram и автоторговля не ждут анализа активов
+  (включается AI_ANALYSIS_WORKERS > 0; по умолчанию AICore считает
+  индикаторы в event loop потоковым движком)
+- Компактную передачу данных: High/Low/Close всех серий пачки упаковываются
+  в один непрерывный массив float64 (pickle NumPy-буфера без DataFrame),
+  обратно возвращаются только последние значения индикаторов для правил
+  сигналов (формат batch_signals.stack_latest_rows)
+- Метрику задержки event loop (EventLoopLagMonitor): насколько позже
+  запланированного просыпается периодическая задача
+"""
+
+import os
+import time
+import asyncio
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, List, Tuple, Any
+
+import numpy as np
+
+import numpy_indicators
+from streaming_indicators import INDICATOR_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Колонки результата в порядке stack_latest_rows
+STACKED_FIELDS = ('close', 'rsi', 'macd_diff', 'macd_diff_prev', 'bb_upper', 'bb_lower')
+
+RSI = INDICATOR_COLUMNS.index('RSI')
+MACD_DIFF = INDICATOR_COLUMNS.index('MACD_diff')
+BB_UPPER = INDICATOR_COLUMNS.index('BB_upper')
+BB_LOWER = INDICATOR_COLUMNS.index('BB_lower')
+
+
+# ========================================
+# ВОРКЕР
+# ========================================
+
+def pack_series(arrays: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Упаковать свечи нескольких серий в один массив
+
+    Args:
+        arrays: Массивы свечей (n, колонки) с первыми колонками Open, High,
+            Low, Close (представления CandleRingBuffer.view)
+
+    Returns:
+        Tuple: (packed (3, всего свечей) - high, low, close;
+        offsets (серии + 1) - границы серий)
+    """
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(array) for array in arrays])
+    packed = np.empty((3, offsets[-1]), dtype=np.float64)
+    for i, array in enumerate(arrays):
+        packed[:, offsets[i]:offsets[i + 1]] = array[:, 1:4].T
+    return packed, offsets
+
+
+def compute_latest(packed: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """
+    Рассчитать индикаторы серий и вернуть значения для правил сигналов
+
+    Выполняется в процессе пула (и в основном процессе без пула).
+
+    Returns:
+        ndarray (серии, len(STACKED_FIELDS)); NaN для серий короче 2 свечей
+    """
+    result = np.full((len(offsets) - 1, len(STACKED_FIELDS)), np.nan)
+    for i in range(len(offsets) - 1):
+        start, end = offsets[i], offsets[i + 1]
+        if end - start < 2:
+            continue
+        high, low, close = packed[:, start:end]
+        values = numpy_indicators.compute_indicators(high, low, close)
+        result[i] = (
+            close[-1], values[-1, RSI], values[-1, MACD_DIFF],
+            values[-2, MACD_DIFF], values[-1, BB_UPPER], values[-1, BB_LOWER]
+        )
+    return result
+
+
+# ========================================
+# ПУЛ
+# ========================================
+
+class AnalysisExecutor:
+    """Пул процессов для расчета индикаторов пачками активов"""
+
+    def __init__(self, workers: int = None, min_batch: int = 4):
+        """
+        Args:
+            workers: Число процессов (AI_ANALYSIS_WORKERS; по умолчанию
+                число ядер - 1, от 1 до 4)
+            min_batch: Минимум серий в одной задаче пула
+        """
+        default_workers = max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.workers = workers or int(os.getenv('AI_ANALYSIS_WORKERS', str(default_workers))) or default_workers
+        self.min_batch = min_batch
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+        self.batches = 0
+        self.series = 0
+        self.busy_seconds = 0.0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: дочерний процесс не наследует потоки и event loop родителя
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            logger.info(f"✅ Пул анализа запущен ({self.workers} процессов)")
+        return self._pool
+
+    def shutdown(self):
+        """Остановить процессы пула"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def compute(self, series: List[Tuple[Any, np.ndarray]]) -> Dict[Any, Dict[str, float]]:
+        """
+        Рассчитать индикаторы серий в пуле
+
+        Args:
+            series: [(ключ серии, массив свечей (n, колонки), см. pack_series)]
+
+        Returns:
+            Dict: {ключ: {поле STACKED_FIELDS: значение}} для серий с результатом
+        """
+        if not series:
+            return {}
+
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+
+        # Несколько задач на процесс, чтобы длинные серии не задерживали остальных
+        size = max(self.min_batch, -(-len(series) // (self.workers * 2)))
+        chunks = [series[i:i + size] for i in range(0, len(series), size)]
+
+        futures = []
+        for chunk in chunks:
+            packed, offsets = pack_series([array for _, array in chunk])
+            futures.append(loop.run_in_executor(pool, compute_latest, packed, offsets))
+
+        results = {}
+        for chunk, values in zip(chunks, await asyncio.gather(*futures)):
+            for (key, _), row in zip(chunk, values):
+                if not np.isnan(row[0]):
+                    results[key] = dict(zip(STACKED_FIELDS, row))
+
+        self.batches += 1
+        self.series += len(series)
+        self.busy_seconds += time.perf_counter() - started
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.workers,
+            'batches': self.batches,
+            'series': self.series,
+            'busy_seconds': round(self.busy_seconds, 3)
+        }
+
+
+def stack_results(results: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+    """Результаты compute() одного таймфрейма -> формат stack_latest_rows"""
+    symbols = list(results)
+    stacked = {'symbols': symbols}
+    for field in STACKED_FIELDS:
+        stacked[field] = np.array([results[symbol][field] for symbol in symbols], dtype=np.float64)
+    return stacked
+
+
+# ========================================
+# ЗАДЕРЖКА EVENT LOOP
+# ========================================
+
+class EventLoopLagMonitor:
+    """Периодически измеряет, насколько позже срока просыпается event loop"""
+
+    def __init__(self, interval: float = 0.1, window: int = 3000, report_every: float = 300):
+        """
+        Args:
+            interval: Период замера (секунды)
+            window: Сколько последних замеров хранить
+            report_every: Как часто писать сводку в лог (секунды, 0 - не писать)
+        """
+        self.interval = interval
+        self.report_every = report_every
+        self.samples: deque = deque(maxlen=window)
+
+    async def run(self):
+        """
+        Бесконечный цикл замеров
+        Вызывается из main.py через asyncio.gather
+        """
+        reported_at = time.monotonic()
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - expected))
+
+            if self.report_every and time.monotonic() - reported_at >= self.report_every:
+                reported_at = time.monotonic()
+                stats = self.stats()
+                logger.info(
+                    f"⏱️ Задержка event loop: p50 {stats['p50_ms']:.1f} мс, "
+                    f"p99 {stats['p99_ms']:.1f} мс, max {stats['max_ms']:.1f} мс"
+                )
+
+    def reset(self):
+        self.samples.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Задержка в миллисекундах: p50, p99, max по последним замерам"""
+        if not self.samples:
+            return {'samples': 0, 'p50_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+        values = np.asarray(self.samples) * 1000
+        return {
+            'samples': len(values),
+            'p50_ms': float(np.percentile(values, 50)),
+            'p99_ms': float(np.percentile(values, 99)),
+            'max_ms': float(values.max())
+        }
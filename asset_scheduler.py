@@ -0,0 +1,347 @@
+"""
+asset_scheduler.py - Адаптивное расписание анализа активов
+Версия: 1.0
+Дата: 2026-10-18
+
+Обеспечивает:
+- Торговый календарь: недельные торговые окна по классам активов
+  (крипто 24/7, форекс, акции США, фьючерсы CME) в часовом поясе биржи
+  с учетом перехода на летнее время и праздников
+- Очередь с приоритетом по времени следующего анализа каждого актива
+- Пропуск закрытых сессий: актив переносится на открытие рынка
+  и не загружается ночью и в выходные
+- Интервал анализа по реализованной волатильности: волатильные активы
+  анализируются чаще, спокойные - реже (в пределах min/max)
+"""
+
+import os
+import json
+import math
+import heapq
+import logging
+from datetime import datetime, date, time as dtime, timedelta, timezone
+from typing import Optional, Dict, List, Tuple, Any
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+logger = logging.getLogger(__name__)
+
+
+def _weekly(days, open_: str, close: str) -> List[Tuple[int, str, str]]:
+    """Одинаковое окно для нескольких дней недели (0 = понедельник)"""
+    return [(day, open_, close) for day in days]
+
+
+# Торговые окна по классам активов: (день недели, открытие, закрытие)
+# во времени биржи. '24:00' - до конца суток
+TRADING_SESSIONS: Dict[str, Dict[str, Any]] = {
+    'crypto': {
+        'timezone': 'UTC',
+        'windows': _weekly(range(7), '00:00', '24:00')
+    },
+    # Форекс: с 17:00 воскресенья до 17:00 пятницы по Нью-Йорку
+    'forex': {
+        'timezone': 'America/New_York',
+        'windows': [(6, '17:00', '24:00')] + _weekly(range(4), '00:00', '24:00') + [(4, '00:00', '17:00')]
+    },
+    # Фьючерсы CME Globex: ежедневный перерыв 17:00-18:00
+    'futures': {
+        'timezone': 'America/New_York',
+        'windows': [(6, '18:00', '24:00')]
+                   + _weekly(range(4), '00:00', '17:00')
+                   + _weekly(range(4), '18:00', '24:00')
+                   + [(4, '00:00', '17:00')]
+    },
+    'us_equity': {
+        'timezone': 'America/New_York',
+        'windows': _weekly(range(5), '09:30', '16:00')
+    }
+}
+
+
+def asset_class(symbol: str) -> str:
+    """Класс актива по тикеру yfinance"""
+    if symbol.endswith('=X'):
+        return 'forex'
+    if symbol.endswith('=F'):
+        return 'futures'
+    if symbol.endswith('-USD') or symbol.endswith('-USDT'):
+        return 'crypto'
+    return 'us_equity'
+
+
+def _minutes(value: str) -> int:
+    hours, minutes = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def realized_volatility(closes, window: int = 60) -> Optional[float]:
+    """
+    Реализованная волатильность: стандартное отклонение лог-доходностей
+    последних window свечей
+
+    Returns:
+        float или None, если данных недостаточно
+    """
+    values = [float(v) for v in list(closes)[-(window + 1):] if v and v > 0]
+    if len(values) < 3:
+        return None
+
+    returns = [math.log(b / a) for a, b in zip(values, values[1:])]
+    mean = sum(returns) / len(returns)
+    return math.sqrt(sum((r - mean) ** 2 for r in returns) / (len(returns) - 1))
+
+
+class TradingCalendar:
+    """Торговые сессии активов"""
+
+    def __init__(self, sessions: Dict[str, Dict[str, Any]] = None,
+                 overrides: Dict[str, str] = None, holidays: Dict[str, List[str]] = None):
+        """
+        Args:
+            sessions: Окна по классам активов (по умолчанию TRADING_SESSIONS)
+            overrides: Явный класс для тикеров {symbol: asset_class}
+            holidays: Закрытые дни по классам {asset_class: ['2026-12-25', ...]}
+                (даты во времени биржи)
+        """
+        self.overrides = dict(overrides or {})
+        self.holidays = {
+            cls: {date.fromisoformat(day) for day in days}
+            for cls, days in (holidays or {}).items()
+        }
+
+        self.sessions = {}
+        for cls, session in (sessions or TRADING_SESSIONS).items():
+            windows: Dict[int, List[Tuple[int, int]]] = {}
+            for day, open_, close in session['windows']:
+                windows.setdefault(day, []).append((_minutes(open_), _minutes(close)))
+            self.sessions[cls] = {
+                'zone': self._zone(session.get('timezone', 'UTC')),
+                'windows': {day: sorted(items) for day, items in windows.items()}
+            }
+
+    @classmethod
+    def from_file(cls, path: str = None) -> 'TradingCalendar':
+        """
+        Календарь из JSON (AI_TRADING_CALENDAR_PATH):
+        {"sessions": {...}, "overrides": {...}, "holidays": {...}}
+
+        Без файла - сессии по умолчанию без праздников.
+        """
+        path = path or os.getenv('AI_TRADING_CALENDAR_PATH', 'trading_calendar.json')
+        if not os.path.exists(path):
+            return cls()
+
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        logger.info(f"📅 Торговый календарь загружен: {path}")
+        return cls(data.get('sessions'), data.get('overrides'), data.get('holidays'))
+
+    @staticmethod
+    def _zone(name: str):
+        if name == 'UTC' or ZoneInfo is None:
+            return timezone.utc
+        try:
+            return ZoneInfo(name)
+        except Exception:
+            logger.warning(f"⚠️ Часовой пояс {name} недоступен - используется UTC")
+            return timezone.utc
+
+    def session_for(self, symbol: str) -> Tuple[str, Dict[str, Any]]:
+        cls = self.overrides.get(symbol) or asset_class(symbol)
+        return cls, self.sessions.get(cls) or self.sessions['crypto']
+
+    def is_open(self, symbol: str, ts: float) -> bool:
+        """Открыт ли рынок актива в момент ts (Unix-секунды)"""
+        cls, session = self.session_for(symbol)
+        local = datetime.fromtimestamp(ts, session['zone'])
+        if local.date() in self.holidays.get(cls, ()):
+            return False
+
+        minute = local.hour * 60 + local.minute
+        return any(
+            open_ <= minute < close
+            for open_, close in session['windows'].get(local.weekday(), ())
+        )
+
+    def next_open(self, symbol: str, ts: float) -> float:
+        """
+        Ближайший момент, когда рынок актива открыт (ts, если открыт сейчас)
+
+        Returns:
+            float: Unix-секунды (ts + 7 дней, если окон нет)
+        """
+        if self.is_open(symbol, ts):
+            return ts
+
+        cls, session = self.session_for(symbol)
+        zone = session['zone']
+        start = datetime.fromtimestamp(ts, zone).date()
+
+        for offset in range(8):
+            day = start + timedelta(days=offset)
+            if day in self.holidays.get(cls, ()):
+                continue
+            for open_, _ in session['windows'].get(day.weekday(), ()):
+                opens_at = datetime.combine(
+                    day, dtime(open_ // 60, open_ % 60), tzinfo=zone
+                ).timestamp()
+                if opens_at > ts:
+                    return opens_at
+
+        return ts + 7 * 86400
+
+
+class AdaptiveScheduler:
+    """Очередь анализа активов по времени следующего запуска"""
+
+    def __init__(self, symbols: List[str], base_interval: float = 300,
+                 min_interval: float = None, max_interval: float = None,
+                 target_volatility: float = None, calendar: TradingCalendar = None):
+        """
+        Args:
+            symbols: Активы
+            base_interval: Интервал при целевой волатильности (секунды)
+            min_interval: Нижняя граница интервала (AI_SCHEDULER_MIN_INTERVAL или 60)
+            max_interval: Верхняя граница интервала (AI_SCHEDULER_MAX_INTERVAL или 1800)
+            target_volatility: Волатильность одной базовой свечи, при которой
+                интервал равен base_interval (AI_SCHEDULER_TARGET_VOL или 0.0005)
+            calendar: Торговый календарь (по умолчанию TradingCalendar.from_file())
+        """
+        self.base_interval = base_interval
+        self.min_interval = min_interval or float(os.getenv('AI_SCHEDULER_MIN_INTERVAL', '60'))
+        self.max_interval = max_interval or float(os.getenv('AI_SCHEDULER_MAX_INTERVAL', '1800'))
+        self.target_volatility = target_volatility or float(os.getenv('AI_SCHEDULER_TARGET_VOL', '0.0005'))
+        self.calendar = calendar or TradingCalendar.from_file()
+
+        self.volatility: Dict[str, float] = {}
+        self.intervals: Dict[str, float] = {}
+        self._due: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+
+        self.runs = 0
+        self.skipped_closed = 0
+
+        for symbol in symbols:
+            self.add(symbol, 0.0)
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def add(self, symbol: str, due_at: float):
+        """Добавить актив (или перенести его запуск) на момент due_at"""
+        self._due[symbol] = due_at
+        heapq.heappush(self._heap, (due_at, symbol))
+
+    def remove(self, symbol: str):
+        """Убрать актив из расписания"""
+        self._due.pop(symbol, None)
+
+    def _pop(self) -> Optional[Tuple[float, str]]:
+        """Снять ближайший актуальный элемент кучи"""
+        while self._heap:
+            due_at, symbol = heapq.heappop(self._heap)
+            # Устаревшие элементы перенесенных или удаленных активов
+            if self._due.get(symbol) == due_at:
+                return due_at, symbol
+        return None
+
+    def _peek(self) -> Optional[float]:
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    # ========================================
+    # ИНТЕРВАЛЫ
+    # ========================================
+
+    def interval(self, symbol: str) -> float:
+        """Текущий интервал анализа актива (секунды)"""
+        return self.intervals.get(symbol, self.base_interval)
+
+    def update_volatility(self, symbol: str, closes, window: int = 60) -> float:
+        """
+        Пересчитать интервал актива по последним ценам закрытия
+
+        Интервал обратно пропорционален волатильности:
+        base_interval * target_volatility / volatility, в пределах min/max.
+
+        Args:
+            symbol: Актив
+            closes: Цены закрытия базовой серии
+            window: Сколько последних свечей учитывать
+
+        Returns:
+            float: Новый интервал (секунды)
+        """
+        volatility = realized_volatility(closes, window)
+        if volatility is None:
+            return self.interval(symbol)
+
+        self.volatility[symbol] = volatility
+        interval = self.base_interval * self.target_volatility / max(volatility, 1e-12)
+        self.intervals[symbol] = min(self.max_interval, max(self.min_interval, interval))
+        return self.intervals[symbol]
+
+    # ========================================
+    # ОЧЕРЕДЬ
+    # ========================================
+
+    def pop_due(self, now: float) -> List[str]:
+        """
+        Активы, которым пора на анализ
+
+        Активы с закрытым рынком переносятся на ближайшее открытие.
+        Выданные активы нужно вернуть в расписание через complete().
+
+        Args:
+            now: Текущее время (Unix-секунды)
+
+        Returns:
+            List[str]: Активы с открытым рынком
+        """
+        due = []
+        while True:
+            head = self._peek()
+            if head is None or head > now:
+                break
+            _, symbol = self._pop()
+
+            opens_at = self.calendar.next_open(symbol, now)
+            if opens_at > now:
+                self.skipped_closed += 1
+                self.add(symbol, opens_at)
+                continue
+
+            del self._due[symbol]
+            due.append(symbol)
+        return due
+
+    def complete(self, symbol: str, now: float) -> float:
+        """
+        Запланировать следующий анализ актива после выполненного
+
+        Returns:
+            float: Время следующего запуска (Unix-секунды)
+        """
+        self.runs += 1
+        due_at = now + self.interval(symbol)
+        self.add(symbol, due_at)
+        return due_at
+
+    def seconds_until_next(self, now: float) -> Optional[float]:
+        """Сколько ждать до ближайшего запуска (None - расписание пусто)"""
+        head = self._peek()
+        return None if head is None else max(0.0, head - now)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики и текущие интервалы по активам"""
+        return {
+            'runs': self.runs,
+            'skipped_closed': self.skipped_closed,
+            'scheduled': len(self._due),
+            'intervals': {symbol: round(self.interval(symbol), 1) for symbol in self._due}
+        }
@@ -5,7 +5,8 @@ autotrader.py - Автоторговля
 
 Обеспечивает:
 - Автоматическое выполнение сделок через Pocket Option API
-- Выполнение сделок на основе сигналов от AI Core
+- Выполнение сделок на основе сигналов от AI Core (подписка на шину
+  сигналов: сделка открывается сразу после генерации сигнала)
 - Бесконечный цикл автоторговли (run_autotrade_cycle)
 - Управление стратегиями (Мартингейл, Процентная ставка, Д'Аламбер)
 
@@ -18,6 +19,8 @@ import logging
 from datetime import datetime, timezone
 from typing import Optional, Dict, List, Any
 
+from db_manager import as_async
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,17 +32,17 @@ class AutoTrader:
         Инициализация AutoTrader
         
         Args:
-            db_manager: Экземпляр DatabaseManager
+            db_manager: DatabaseManager или AsyncDatabaseManager
             pocket_api: Экземпляр PocketOptionAPI
         """
-        self.db_manager = db_manager
+        self.db_manager = as_async(db_manager)
         self.pocket_api = pocket_api
         
         # Интервал проверки автоторговли (в секундах)
         self.autotrade_interval = 60  # 1 минута
         
         logger.info(f"✅ AutoTrader инициализирован")
-        logger.info(f"📊 Режим работы: получение сигналов из БД")
+        logger.info(f"📊 Режим работы: сигналы из шины AI Core")
     
     # ========================================
     # ВЫПОЛНЕНИЕ СДЕЛОК
@@ -49,6 +52,8 @@ class AutoTrader:
         """
         Выполнить сделку для пользователей с автоторговлей
         
+        Обработчик подписки AutoTrader на шину сигналов (signal_bus.py)
+        
         Args:
             signal: Торговый сигнал
         """
@@ -56,7 +61,7 @@ class AutoTrader:
             return
         
         # Получаем пользователей с включенной автоторговлей
-        users = self.db_manager.get_users_with_auto_trading()
+        users = await self.db_manager.get_users_with_auto_trading()
         
         logger.info(f"🤖 Выполняем сигнал для {len(users)} пользователей")
         
@@ -94,13 +99,16 @@ class AutoTrader:
         # Режим торговли (demo/real)
         mode = user.get('auto_trading_mode', 'demo')
         
-        logger.info(f"💰 Открываем сделку для user {user_id}: {signal['type']} {signal['symbol']} (${stake}, {mode})")
+        # Сигналы AI Core содержат signal_type, старый формат - type
+        direction = signal.get('signal_type') or signal.get('type')
+        
+        logger.info(f"💰 Открываем сделку для user {user_id}: {direction} {signal['symbol']} (${stake}, {mode})")
         
         # Выполняем сделку через Pocket Option API
         result = await self.pocket_api.place_trade(
             user_id=user_id,
             symbol=signal['symbol'],
-            direction=signal['type'],
+            direction=direction,
             amount=stake,
             duration=signal.get('timeframe', '5m'),
             mode=mode
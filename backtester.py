@@ -0,0 +1,328 @@
+"""
+backtester.py - Векторизованный бэктест правил генерации сигналов
+Версия: 1.0
+Дата: 2026-10-18
+
+Обеспечивает:
+- Прогон сохраненных свечей (candles / market_history) через те же
+  индикаторы и правила, что использует AICore
+- Разрешение каждого сигнала по цене на момент экспирации
+- Винрейт, P&L с учетом выплаты брокера и просадку по активу и таймфрейму
+- Сводку фактических результатов из signal_history для сравнения
+- Полностью векторизованный расчет (год 5-минутных свечей - секунды)
+
+Запуск:
+    python backtester.py --source market_history --payout 0.92
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import argparse
+from typing import Optional, Dict, List, Tuple, Any
+
+import numpy as np
+import pandas as pd
+
+import numpy_indicators
+from batch_signals import evaluate_signals, DEFAULT_SIGNAL_PARAMS
+from candle_store import INTERVAL_SECONDS
+from streaming_indicators import INDICATOR_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Выплата брокера за выигрыш (доля ставки), как в signal_history
+DEFAULT_PAYOUT = 0.92
+
+
+def normalize_timeframe(timeframe: str) -> str:
+    """Привести таймфрейм к формату yfinance ('5M' -> '5m', '1H' -> '1h')"""
+    return timeframe.strip().lower()
+
+
+# ========================================
+# МЕТРИКИ
+# ========================================
+
+def summarize_pnl(pnl) -> Dict[str, Any]:
+    """
+    Посчитать метрики по последовательности результатов сделок
+
+    Args:
+        pnl: Массив P&L каждой сделки в долях ставки (+payout, 0 или -1)
+
+    Returns:
+        Dict: signals, wins, losses, draws, win_rate, pnl, max_drawdown
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    wins = int(np.count_nonzero(pnl > 0))
+    losses = int(np.count_nonzero(pnl < 0))
+    draws = len(pnl) - wins - losses
+
+    equity = np.concatenate(([0.0], np.cumsum(pnl)))
+    drawdown = np.maximum.accumulate(equity) - equity
+
+    return {
+        'signals': len(pnl),
+        'wins': wins,
+        'losses': losses,
+        'draws': draws,
+        'win_rate': (wins / (wins + losses) * 100) if wins + losses else 0.0,
+        'pnl': float(equity[-1]),
+        'max_drawdown': float(drawdown.max())
+    }
+
+
+# ========================================
+# ПРОГОН ОДНОЙ СЕРИИ
+# ========================================
+
+def backtest_series(timestamps, high, low, close, expiry_seconds: int,
+                    payout: float = DEFAULT_PAYOUT, params: Dict[str, float] = None,
+                    indicators=None) -> Dict[str, Any]:
+    """
+    Прогнать одну серию свечей через индикаторы и правила сигналов
+
+    Сигнал на свече t входит по close[t] и закрывается по цене первой
+    свечи с меткой времени >= t + expiry_seconds. Сигналы без такой свечи
+    (конец данных) не учитываются.
+
+    Args:
+        timestamps: Unix-время свечей (секунды, по возрастанию)
+        high, low, close: Цены свечей
+        expiry_seconds: Время экспирации сигнала
+        payout: Выплата за выигрыш в долях ставки
+        params: Параметры правил (по умолчанию DEFAULT_SIGNAL_PARAMS)
+        indicators: Готовый буфер compute_indicators (если уже посчитан)
+
+    Returns:
+        Dict: Метрики summarize_pnl и массивы index, direction, pnl сделок
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    close = np.ascontiguousarray(close, dtype=np.float64)
+
+    if indicators is None:
+        indicators = numpy_indicators.compute_indicators(high, low, close)
+
+    column = {name: indicators[:, i] for i, name in enumerate(INDICATOR_COLUMNS)}
+    macd_diff_prev = np.empty_like(column['MACD_diff'])
+    macd_diff_prev[0] = np.nan
+    macd_diff_prev[1:] = column['MACD_diff'][:-1]
+
+    evaluated = evaluate_signals(
+        close, column['RSI'], column['MACD_diff'], macd_diff_prev,
+        column['BB_upper'], column['BB_lower'],
+        params=params
+    )
+
+    exit_index = np.searchsorted(timestamps, timestamps + expiry_seconds, side='left')
+    fired = evaluated['passed'] & (exit_index < len(close))
+
+    index = np.flatnonzero(fired)
+    direction = evaluated['direction'][index]
+    move = (close[exit_index[index]] - close[index]) * direction
+    pnl = np.where(move > 0, payout, np.where(move < 0, -1.0, 0.0))
+
+    result = summarize_pnl(pnl)
+    result.update({'index': index, 'direction': direction, 'trade_pnl': pnl})
+    return result
+
+
+# ========================================
+# ЗАГРУЗКА ДАННЫХ
+# ========================================
+
+class Backtester:
+    """Бэктест правил AICore по локальной истории"""
+
+    def __init__(self, db_path: str = None, payout: float = DEFAULT_PAYOUT,
+                 expiry_bars: int = 1, min_confidence: float = 40):
+        """
+        Args:
+            db_path: Путь к SQLite (по умолчанию CANDLE_STORE_PATH или crypto_signals_bot.db)
+            payout: Выплата за выигрыш в долях ставки
+            expiry_bars: Экспирация сигнала в свечах своего таймфрейма
+            min_confidence: Порог уверенности сигнала
+        """
+        self.db_path = db_path or os.getenv('CANDLE_STORE_PATH', 'crypto_signals_bot.db')
+        self.payout = payout
+        self.expiry_bars = expiry_bars
+        self.params = dict(DEFAULT_SIGNAL_PARAMS, min_confidence=float(min_confidence))
+
+    def _read_sql(self, query: str, params: Tuple = ()) -> pd.DataFrame:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return pd.read_sql_query(query, conn, params=params)
+        finally:
+            conn.close()
+
+    def load_series(self, source: str = 'candles') -> Dict[Tuple[str, str], Dict[str, np.ndarray]]:
+        """
+        Загрузить серии свечей
+
+        Args:
+            source: 'candles' (OHLCV из CandleStore) или 'market_history'
+                (снимки цены; High = Low = Close = price)
+
+        Returns:
+            Dict: {(asset, timeframe): {'timestamp', 'high', 'low', 'close'}}
+        """
+        if source == 'candles':
+            try:
+                df = self._read_sql(
+                    "SELECT asset_symbol, timeframe, timestamp, high, low, close FROM candles"
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Таблица candles недоступна ({e}) - нет свечей для бэктеста")
+                return {}
+        elif source == 'market_history':
+            df = self._read_sql(
+                "SELECT asset_symbol, timeframe, timestamp, price AS close FROM market_history "
+                "WHERE price IS NOT NULL"
+            )
+            df['timestamp'] = (
+                pd.to_datetime(df['timestamp'], utc=True).astype('datetime64[s, UTC]').astype('int64')
+            )
+            df['high'] = df['close']
+            df['low'] = df['close']
+        else:
+            raise ValueError(f"Неизвестный источник данных: {source}")
+
+        df['timeframe'] = df['timeframe'].map(normalize_timeframe)
+        df = df.sort_values(['asset_symbol', 'timeframe', 'timestamp'], kind='stable')
+        df = df.drop_duplicates(['asset_symbol', 'timeframe', 'timestamp'], keep='last')
+
+        series = {}
+        for (asset, timeframe), group in df.groupby(['asset_symbol', 'timeframe'], sort=True):
+            series[(asset, timeframe)] = {
+                'timestamp': group['timestamp'].to_numpy(dtype=np.int64),
+                'high': group['high'].to_numpy(dtype=np.float64),
+                'low': group['low'].to_numpy(dtype=np.float64),
+                'close': group['close'].to_numpy(dtype=np.float64)
+            }
+        return series
+
+    # ========================================
+    # ЗАПУСК
+    # ========================================
+
+    def run(self, source: str = 'candles', series: Dict = None) -> Dict[str, Any]:
+        """
+        Прогнать бэктест по всем сериям
+
+        Args:
+            source: Источник свечей (см. load_series)
+            series: Уже загруженные серии (вместо чтения из БД)
+
+        Returns:
+            Dict: {'by_series': {"asset|timeframe": метрики}, 'total': метрики,
+            'elapsed': секунды}
+        """
+        started = time.perf_counter()
+        series = series if series is not None else self.load_series(source)
+
+        by_series = {}
+        all_pnl = []
+        for (asset, timeframe), data in series.items():
+            interval = INTERVAL_SECONDS.get(timeframe)
+            if interval is None or len(data['close']) < 2:
+                continue
+
+            result = backtest_series(
+                data['timestamp'], data['high'], data['low'], data['close'],
+                expiry_seconds=interval * self.expiry_bars,
+                payout=self.payout,
+                params=self.params
+            )
+            all_pnl.append(result['trade_pnl'])
+            by_series[f'{asset}|{timeframe}'] = {
+                key: value for key, value in result.items()
+                if key not in ('index', 'direction', 'trade_pnl')
+            }
+
+        total = summarize_pnl(np.concatenate(all_pnl) if all_pnl else [])
+        elapsed = time.perf_counter() - started
+
+        logger.info(
+            f"📊 Бэктест: {len(by_series)} серий, {total['signals']} сигналов, "
+            f"винрейт {total['win_rate']:.1f}%, P&L {total['pnl']:+.2f} ставок ({elapsed:.2f}с)"
+        )
+        return {'by_series': by_series, 'total': total, 'elapsed': elapsed}
+
+    def summarize_signal_history(self) -> Dict[str, Any]:
+        """
+        Фактические результаты сохраненных сигналов из signal_history
+
+        P&L переводится в доли ставки (profit_loss / stake_amount), чтобы
+        сравнивать с результатами бэктеста.
+
+        Returns:
+            Dict: {'by_series': {"asset|timeframe": метрики}, 'total': метрики}
+        """
+        df = self._read_sql(
+            "SELECT asset, timeframe, result, profit_loss, stake_amount, signal_date "
+            "FROM signal_history WHERE result IN ('win', 'loss')"
+        )
+        if df.empty:
+            return {'by_series': {}, 'total': summarize_pnl([])}
+
+        df['timeframe'] = df['timeframe'].map(normalize_timeframe)
+        df['signal_date'] = pd.to_datetime(df['signal_date'], format='mixed')
+        df = df.sort_values('signal_date', kind='stable')
+
+        stake = df['stake_amount'].where(df['stake_amount'] > 0)
+        fallback = np.where(df['result'] == 'win', self.payout, -1.0)
+        df['pnl'] = (df['profit_loss'] / stake).fillna(pd.Series(fallback, index=df.index))
+
+        by_series = {
+            f'{asset}|{timeframe}': summarize_pnl(group['pnl'].to_numpy())
+            for (asset, timeframe), group in df.groupby(['asset', 'timeframe'], sort=True)
+        }
+        return {'by_series': by_series, 'total': summarize_pnl(df['pnl'].to_numpy())}
+
+
+def main():
+    """Запуск бэктеста из командной строки"""
+    parser = argparse.ArgumentParser(description='Бэктест правил генерации сигналов AICore')
+    parser.add_argument('--db', default=None, help='Путь к SQLite базе')
+    parser.add_argument('--source', default='candles', choices=['candles', 'market_history'])
+    parser.add_argument('--payout', type=float, default=DEFAULT_PAYOUT)
+    parser.add_argument('--expiry-bars', type=int, default=1)
+    parser.add_argument('--min-confidence', type=float, default=40)
+    parser.add_argument('--json', dest='json_path', default=None, help='Сохранить отчет в JSON')
+    args = parser.parse_args()
+
+    backtester = Backtester(
+        db_path=args.db,
+        payout=args.payout,
+        expiry_bars=args.expiry_bars,
+        min_confidence=args.min_confidence
+    )
+
+    report = backtester.run(source=args.source)
+    report['signal_history'] = backtester.summarize_signal_history()
+
+    for key, metrics in report['by_series'].items():
+        if metrics['signals']:
+            logger.info(
+                f"  {key}: {metrics['signals']} сигн., винрейт {metrics['win_rate']:.1f}%, "
+                f"P&L {metrics['pnl']:+.2f}, просадка {metrics['max_drawdown']:.2f}"
+            )
+
+    history_total = report['signal_history']['total']
+    logger.info(
+        f"📜 signal_history: {history_total['signals']} сигналов, "
+        f"винрейт {history_total['win_rate']:.1f}%, P&L {history_total['pnl']:+.2f} ставок"
+    )
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        logger.info(f"💾 Отчет сохранен: {args.json_path}")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
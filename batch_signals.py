@@ -0,0 +1,458 @@
+"""
+batch_signals.py - Векторизованная генерация сигналов по всем активам сразу
+Версия: 1.0
+Дата: 2026-10-18
+
+Обеспечивает:
+- Сборку последних строк индикаторов всех активов в массивы NumPy
+- Правила RSI / MACD-кроссовер / Bollinger в виде векторных масок
+- Результат, идентичный AICore.generate_signal (те же приоритеты и веса)
+- Параметры правил (пороги RSI, веса, порог уверенности) по активам
+  из версионированной таблицы optimizer.py
+- Бенчмарк масштабирования от 14 до 1000 активов
+"""
+
+import os
+import json
+import time
+import logging
+from datetime import datetime, timezone
+from typing import Optional, Dict, List, Any
+
+# Pandas и NumPy - опциональные (для облегченных версий)
+try:
+    import pandas as pd
+    import numpy as np
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+    pd = None
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Колонки, из которых собираются массивы (Close и индикаторы)
+SIGNAL_COLUMNS = ['Close', 'RSI', 'MACD_diff', 'BB_upper', 'BB_lower']
+
+CALL = 1
+PUT = -1
+
+# Параметры правил по умолчанию (исходные значения generate_signal)
+DEFAULT_SIGNAL_PARAMS = {
+    'rsi_oversold': 30.0,
+    'rsi_overbought': 70.0,
+    'rsi_weight': 20.0,
+    'macd_weight': 25.0,
+    'bb_weight': 15.0,
+    'min_confidence': 40.0
+}
+
+
+# ========================================
+# ПАРАМЕТРЫ ПРАВИЛ
+# ========================================
+
+def load_signal_params(path: str = None) -> Dict[str, Any]:
+    """
+    Загрузить таблицу параметров, созданную optimizer.py
+
+    Args:
+        path: Путь к JSON (по умолчанию AI_SIGNAL_PARAMS_PATH или signal_params.json)
+
+    Returns:
+        Dict: Таблица {'version', 'params': {symbol: {timeframe: {...}}}, ...}
+        или пустой словарь, если файла нет
+    """
+    path = path or os.getenv('AI_SIGNAL_PARAMS_PATH', 'signal_params.json')
+    if not os.path.exists(path):
+        return {}
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            table = json.load(f)
+        logger.info(f"✅ Загружены параметры сигналов v{table.get('version')} ({path})")
+        return table
+    except Exception as e:
+        logger.error(f"❌ Ошибка загрузки параметров сигналов: {e}")
+        return {}
+
+
+def resolve_signal_params(table: Dict[str, Any], symbol: str, timeframe: str) -> Dict[str, float]:
+    """Параметры правил для серии: значения из таблицы поверх значений по умолчанию"""
+    params = dict(DEFAULT_SIGNAL_PARAMS)
+    overrides = (table or {}).get('params', {}).get(symbol, {}).get(timeframe)
+    if overrides:
+        params.update({key: float(overrides[key]) for key in DEFAULT_SIGNAL_PARAMS if key in overrides})
+    return params
+
+
+def stack_signal_params(param_list: List[Dict[str, float]]) -> Dict[str, Any]:
+    """Собрать параметры нескольких серий в массивы (по одному значению на серию)"""
+    return {
+        key: np.array([params[key] for params in param_list], dtype=np.float64)
+        for key in DEFAULT_SIGNAL_PARAMS
+    }
+
+
+def stack_latest_rows(frames: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Собрать последние две строки индикаторов всех активов в массивы
+
+    Отсутствующие колонки заполняются NaN, так же как их пропускает
+    скалярная версия правил (полосы Боллинджера учитываются только парой).
+
+    Args:
+        frames: {symbol: DataFrame с индикаторами}
+
+    Returns:
+        Dict: symbols (список) и массивы close, rsi, macd_diff,
+        macd_diff_prev, bb_upper, bb_lower длиной len(symbols)
+    """
+    symbols = [
+        symbol for symbol, df in frames.items()
+        if df is not None and not df.empty and len(df) >= 2
+    ]
+
+    last = np.full((len(symbols), len(SIGNAL_COLUMNS)), np.nan)
+    macd_diff_prev = np.full(len(symbols), np.nan)
+
+    for i, symbol in enumerate(symbols):
+        df = frames[symbol]
+        column_positions = {column: j for j, column in enumerate(df.columns)}
+        positions = np.array([column_positions.get(column, -1) for column in SIGNAL_COLUMNS])
+        if positions[3] < 0 or positions[4] < 0:
+            positions[3:5] = -1
+
+        # Одна выгрузка в NumPy на актив дешевле поколоночного доступа pandas;
+        # выгружаются только две последние строки, а не вся история
+        tail = df.iloc[-2:].to_numpy(dtype=float, na_value=np.nan)
+        present = positions >= 0
+        last[i, present] = tail[-1, positions[present]]
+        if positions[2] >= 0:
+            macd_diff_prev[i] = tail[-2, positions[2]]
+
+    return {
+        'symbols': symbols,
+        'close': last[:, 0],
+        'rsi': last[:, 1],
+        'macd_diff': last[:, 2],
+        'macd_diff_prev': macd_diff_prev,
+        'bb_upper': last[:, 3],
+        'bb_lower': last[:, 4]
+    }
+
+
+def stack_indicator_states(states: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Собрать массивы из состояний потоковых индикаторов (без DataFrame)
+
+    Args:
+        states: {symbol: IndicatorState}
+
+    Returns:
+        Dict в формате stack_latest_rows
+    """
+    from streaming_indicators import INDICATOR_COLUMNS
+
+    rsi_col = INDICATOR_COLUMNS.index('RSI')
+    macd_col = INDICATOR_COLUMNS.index('MACD_diff')
+    upper_col = INDICATOR_COLUMNS.index('BB_upper')
+    lower_col = INDICATOR_COLUMNS.index('BB_lower')
+
+    symbols = [symbol for symbol, state in states.items() if len(state.history) >= 2]
+    rows = []
+    for symbol in symbols:
+        state = states[symbol]
+        last = state.history[-1][1]
+        rows.append((
+            state.prev_close, last[rsi_col], last[macd_col],
+            state.history[-2][1][macd_col], last[upper_col], last[lower_col]
+        ))
+
+    values = np.array(rows, dtype=float).reshape(len(symbols), 6)
+    return {
+        'symbols': symbols,
+        'close': values[:, 0],
+        'rsi': values[:, 1],
+        'macd_diff': values[:, 2],
+        'macd_diff_prev': values[:, 3],
+        'bb_upper': values[:, 4],
+        'bb_lower': values[:, 5]
+    }
+
+
+def stack_candle_buffers(buffers: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Собрать массивы из кольцевых буферов свечей с индикаторами
+
+    Читаются представления двух последних строк каждого буфера (без
+    копирования серии и без DataFrame).
+
+    Args:
+        buffers: {symbol: candle_buffer.CandleRingBuffer}
+
+    Returns:
+        Dict в формате stack_latest_rows
+    """
+    symbols = [symbol for symbol, buffer in buffers.items() if len(buffer) >= 2]
+    values = np.full((len(symbols), 6), np.nan)
+
+    for i, symbol in enumerate(symbols):
+        buffer = buffers[symbol]
+        positions = buffer.positions
+        tail = buffer.view(2)
+        values[i] = (
+            tail[1, positions['Close']], tail[1, positions['RSI']], tail[1, positions['MACD_diff']],
+            tail[0, positions['MACD_diff']], tail[1, positions['BB_upper']], tail[1, positions['BB_lower']]
+        )
+
+    return {
+        'symbols': symbols,
+        'close': values[:, 0],
+        'rsi': values[:, 1],
+        'macd_diff': values[:, 2],
+        'macd_diff_prev': values[:, 3],
+        'bb_upper': values[:, 4],
+        'bb_lower': values[:, 5]
+    }
+
+
+def evaluate_signals(close, rsi, macd_diff, macd_diff_prev, bb_upper, bb_lower,
+                     params: Dict[str, Any] = None, weights=None) -> Dict[str, Any]:
+    """
+    Применить правила генерации сигналов к массивам
+
+    Порядок и приоритеты совпадают с AICore.generate_signal: RSI задает
+    направление первым, MACD и Bollinger добавляют вес только если не
+    противоречат уже выбранному направлению.
+
+    Args:
+        close, rsi, macd_diff, macd_diff_prev, bb_upper, bb_lower: Массивы
+            одинаковой длины (одна позиция = один актив или одна свеча)
+        params: Параметры правил (DEFAULT_SIGNAL_PARAMS); значения могут быть
+            числами или массивами той же длины (свои параметры на позицию)
+        weights: Множитель уверенности (адаптивный вес signal_performance),
+            число или массив; применяется до сравнения с min_confidence
+
+    Returns:
+        Dict: direction (1 = CALL, -1 = PUT, 0 = нет), confidence, passed
+        (confidence >= min_confidence) и маски сработавших правил
+        (rsi_call, rsi_put, macd_call, macd_put, bb_call, bb_put)
+    """
+    params = params or DEFAULT_SIGNAL_PARAMS
+    direction = np.zeros(len(close), dtype=np.int8)
+    confidence = np.zeros(len(close), dtype=np.float64)
+
+    with np.errstate(invalid='ignore'):
+        # RSI (NaN дает False в любом сравнении)
+        rsi_call = rsi < params['rsi_oversold']
+        rsi_put = ~rsi_call & (rsi > params['rsi_overbought'])
+        direction[rsi_call] = CALL
+        direction[rsi_put] = PUT
+        confidence += np.where(rsi_call | rsi_put, params['rsi_weight'], 0.0)
+
+        # MACD кроссовер
+        macd_call = (macd_diff > 0) & (macd_diff_prev < 0) & (direction != PUT)
+        macd_put = (macd_diff < 0) & (macd_diff_prev > 0) & (direction != CALL)
+        direction[macd_call] = CALL
+        direction[macd_put] = PUT
+        confidence += np.where(macd_call | macd_put, params['macd_weight'], 0.0)
+
+        # Bollinger Bands: верхняя полоса проверяется, только если не пробита нижняя
+        below_lower = close < bb_lower
+        above_upper = ~below_lower & (close > bb_upper)
+        bb_call = below_lower & (direction != PUT)
+        bb_put = above_upper & (direction != CALL)
+        direction[bb_call] = CALL
+        direction[bb_put] = PUT
+        confidence += np.where(bb_call | bb_put, params['bb_weight'], 0.0)
+
+    if weights is not None:
+        confidence = confidence * weights
+
+    return {
+        'direction': direction,
+        'confidence': confidence,
+        'passed': (confidence >= params['min_confidence']) & (direction != 0),
+        'rsi_call': rsi_call,
+        'rsi_put': rsi_put,
+        'macd_call': macd_call,
+        'macd_put': macd_put,
+        'bb_call': bb_call,
+        'bb_put': bb_put
+    }
+
+
+def build_signals(stacked: Dict[str, Any], evaluated: Dict[str, Any],
+                  timeframe: str = '5m') -> Dict[str, Dict[str, Any]]:
+    """
+    Сформировать словари сигналов для активов, прошедших порог уверенности
+
+    Returns:
+        Dict: {symbol: сигнал в формате AICore.generate_signal}
+    """
+    signals = {}
+    timestamp = datetime.now(timezone.utc).isoformat()
+    passed = np.flatnonzero(evaluated['passed'])
+
+    for i in passed:
+        reasons = []
+        if evaluated['rsi_call'][i]:
+            reasons.append(f"RSI перепродан ({stacked['rsi'][i]:.1f})")
+        elif evaluated['rsi_put'][i]:
+            reasons.append(f"RSI перекуплен ({stacked['rsi'][i]:.1f})")
+        if evaluated['macd_call'][i]:
+            reasons.append("MACD бычий кроссовер")
+        elif evaluated['macd_put'][i]:
+            reasons.append("MACD медвежий кроссовер")
+        if evaluated['bb_call'][i]:
+            reasons.append("Цена ниже нижней полосы Боллинджера")
+        elif evaluated['bb_put'][i]:
+            reasons.append("Цена выше верхней полосы Боллинджера")
+
+        symbol = stacked['symbols'][i]
+        signals[symbol] = {
+            'symbol': symbol,
+            'signal_type': 'CALL' if evaluated['direction'][i] == CALL else 'PUT',
+            'confidence': min(float(evaluated['confidence'][i]), 100),
+            'entry_price': float(stacked['close'][i]),
+            'timestamp': timestamp,
+            'reasons': reasons,
+            'timeframe': timeframe
+        }
+
+    return signals
+
+
+def generate_signals_batch(frames: Dict[str, Any] = None, timeframe: str = '5m',
+                           states: Dict[str, Any] = None,
+                           param_table: Dict[str, Any] = None,
+                           weights: Dict[str, float] = None,
+                           stacked: Dict[str, Any] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Сгенерировать сигналы для всех активов одним вызовом
+
+    Args:
+        frames: {symbol: DataFrame с индикаторами}
+        timeframe: Таймфрейм сигналов
+        states: {symbol: IndicatorState} - альтернатива frames, если
+            индикаторы считаются потоково
+        param_table: Таблица параметров optimizer.py (по умолчанию - исходные правила)
+        weights: Адаптивные веса уверенности {symbol: вес} (по умолчанию 1.0)
+        stacked: Уже собранные массивы (формат stack_latest_rows) - альтернатива
+            frames и states
+
+    Returns:
+        Dict: {symbol: сигнал} только для активов с сигналом
+    """
+    if not PANDAS_AVAILABLE:
+        logger.warning("⚠️ pandas не установлен - генерация сигналов недоступна")
+        return {}
+
+    if stacked is None:
+        stacked = stack_indicator_states(states) if states is not None else stack_latest_rows(frames or {})
+    if not stacked['symbols']:
+        return {}
+
+    params = None
+    if param_table and param_table.get('params'):
+        params = stack_signal_params([
+            resolve_signal_params(param_table, symbol, timeframe) for symbol in stacked['symbols']
+        ])
+
+    evaluated = evaluate_signals(
+        stacked['close'], stacked['rsi'],
+        stacked['macd_diff'], stacked['macd_diff_prev'],
+        stacked['bb_upper'], stacked['bb_lower'],
+        params=params,
+        weights=np.array([weights.get(symbol, 1.0) for symbol in stacked['symbols']]) if weights else None
+    )
+    return build_signals(stacked, evaluated, timeframe=timeframe)
+
+
+# ========================================
+# БЕНЧМАРК
+# ========================================
+
+def _random_frames(count: int, rows: int = 60, seed: int = 42) -> Dict[str, Any]:
+    """Случайные свечи с рассчитанными индикаторами для count активов"""
+    from streaming_indicators import StreamingIndicatorEngine
+
+    rng = np.random.default_rng(seed)
+    engine = StreamingIndicatorEngine()
+    index = pd.date_range('2025-01-01', periods=rows, freq='5min', tz='UTC')
+    frames = {}
+    for i in range(count):
+        close = 100 + np.cumsum(rng.normal(0, 1, rows))
+        df = pd.DataFrame({
+            'Open': close,
+            'High': close + rng.random(rows),
+            'Low': close - rng.random(rows),
+            'Close': close,
+            'Volume': 1.0
+        }, index=index)
+        frames[f'ASSET{i}'] = engine.apply_frame(f'ASSET{i}', '5m', df)
+    states = {symbol: engine.get_state(symbol, '5m') for symbol in frames}
+    return frames, states
+
+
+def benchmark_batch_signals(sizes: List[int] = None, repeat: int = 5) -> List[Dict[str, float]]:
+    """
+    Сравнить AICore.generate_signal в цикле с векторизованной версией
+
+    Args:
+        sizes: Количества активов (по умолчанию 14, 100, 1000)
+        repeat: Число повторов (берется лучшее время)
+
+    Returns:
+        List[Dict]: assets, loop_ms, batch_frames_ms, batch_states_ms для каждого размера
+    """
+    from ai_core import AICore
+
+    ai_core = AICore.__new__(AICore)  # без инициализации API и хранилищ
+    results = []
+
+    for size in sizes or [14, 100, 1000]:
+        frames, states = _random_frames(size)
+        timings = {'loop': float('inf'), 'batch_frames': float('inf'), 'batch_states': float('inf')}
+
+        for _ in range(repeat):
+            started = time.perf_counter()
+            expected = {}
+            for symbol, df in frames.items():
+                signal = ai_core.generate_signal(df, symbol)
+                if signal:
+                    expected[symbol] = signal
+            timings['loop'] = min(timings['loop'], time.perf_counter() - started)
+
+            started = time.perf_counter()
+            from_frames = generate_signals_batch(frames)
+            timings['batch_frames'] = min(timings['batch_frames'], time.perf_counter() - started)
+
+            started = time.perf_counter()
+            from_states = generate_signals_batch(states=states)
+            timings['batch_states'] = min(timings['batch_states'], time.perf_counter() - started)
+
+        for signals in (expected, from_frames, from_states):
+            for signal in signals.values():
+                signal.pop('timestamp')
+        if not (expected == from_frames == from_states):
+            logger.error(f"❌ Результаты расходятся для {size} активов")
+
+        result = {'assets': size, 'signals': len(expected)}
+        result.update({f'{name}_ms': value * 1000 for name, value in timings.items()})
+        results.append(result)
+
+        logger.info(
+            f"📊 {size} активов: цикл {result['loop_ms']:.2f} мс, "
+            f"batch(DataFrame) {result['batch_frames_ms']:.2f} мс, "
+            f"batch(состояния) {result['batch_states_ms']:.2f} мс"
+        )
+
+    return results
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger('ai_core').setLevel(logging.WARNING)
+    benchmark_batch_signals()
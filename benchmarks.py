@@ -0,0 +1,511 @@
+"""
+benchmarks.py - Бенчмарки конвейера анализ → сигнал → сделка
+Версия: 1.0
+Дата: 2026-10-18
+
+Обеспечивает:
+- Замеры calculate_indicators, generate_signal (по одному и пакетом),
+  AutoTrader.execute_signal_for_users, задержки шины сигналов
+  (публикация -> сделки), задержки event loop при расчете индикаторов
+  (в цикле и в пуле процессов), операций DatabaseManager и
+  crypto_utils.encrypt_ssid / decrypt_ssid
+- Реалистичные размеры: от 14 до 1000 активов, от 10 до 100k
+  пользователей с автоторговлей
+- Пропускную способность (элементов в секунду) и задержки p50/p99
+- Отчет в JSON и сравнение двух отчетов (поиск регрессий между коммитами)
+
+Сеть и Supabase не нужны: свечи берутся из SyntheticProvider, БД -
+LocalSupabaseClient (SQLite в памяти). Логи кода ниже WARNING
+отключены, чтобы замер не зависел от вывода.
+
+Запуск:
+    python benchmarks.py --profile full --output bench_new.json
+    python benchmarks.py --compare bench_old.json bench_new.json --threshold 0.15
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import platform
+import subprocess
+from datetime import datetime, timezone
+from typing import Optional, Dict, List, Callable, Any
+
+# Бенчмарки не должны писать свечи и веса сигналов в рабочую БД
+os.environ.setdefault('AI_CANDLE_STORE', '0')
+os.environ.setdefault('AI_SIGNAL_PERFORMANCE', '0')
+
+import numpy as np
+
+from ai_core import AICore
+from autotrader import AutoTrader
+from db_manager import DatabaseManager
+from local_supabase import LocalSupabaseClient
+from market_data import SyntheticProvider
+from pocket_option_api import PocketOptionAPI
+from signal_bus import SignalBus
+from resampler import TimeframeResampler
+from analysis_executor import AnalysisExecutor, EventLoopLagMonitor, pack_series, compute_latest
+import crypto_utils
+
+logger = logging.getLogger(__name__)
+
+# Размеры прогонов
+PROFILES = {
+    'quick': {'assets': [14, 100], 'users': [10, 1000], 'repeat': 5},
+    'full': {'assets': [14, 100, 1000], 'users': [10, 1000, 10000, 100000], 'repeat': 20}
+}
+
+# Метрики, рост которых считается регрессией (для throughput - падение)
+LATENCY_METRICS = ('p50_ms', 'p99_ms')
+
+
+# ========================================
+# ЗАМЕРЫ
+# ========================================
+
+def summarize_latencies(latencies: List[float], items: int = 1) -> Dict[str, Any]:
+    """
+    Свести задержки операций в метрики
+
+    Args:
+        latencies: Длительности операций в секундах
+        items: Сколько элементов (активов, пользователей) обрабатывает одна операция
+
+    Returns:
+        Dict: runs, items, p50_ms, p99_ms, mean_ms, throughput (элементов в секунду)
+    """
+    values = np.asarray(latencies, dtype=np.float64)
+    p50 = float(np.percentile(values, 50))
+    return {
+        'runs': len(values),
+        'items': items,
+        'p50_ms': p50 * 1000,
+        'p99_ms': float(np.percentile(values, 99)) * 1000,
+        'mean_ms': float(values.mean()) * 1000,
+        'throughput': items / p50 if p50 > 0 else float('inf')
+    }
+
+
+def time_calls(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> List[float]:
+    """Выполнить fn warmup + repeat раз и вернуть длительности замеренных вызовов"""
+    for _ in range(warmup):
+        fn()
+
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def time_async_calls(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> List[float]:
+    """Асинхронный вариант time_calls (fn возвращает корутину)"""
+    for _ in range(warmup):
+        await fn()
+
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+# ========================================
+# ДАННЫЕ
+# ========================================
+
+def make_frames(count: int, seed: int = 42) -> Dict[str, Any]:
+    """Свечи '1d' по 5 минут для count синтетических активов"""
+    provider = SyntheticProvider(seed=seed)
+    return {f'SYN{i}': provider.history(f'SYN{i}') for i in range(count)}
+
+
+def make_users(db: DatabaseManager, count: int, seed: int = 42) -> List[str]:
+    """Заполнить таблицу users пользователями с автоторговлей (одной вставкой)"""
+    rng = random.Random(seed)
+    strategies = ['percentage', 'martingale', 'dalembert']
+    users = [
+        {
+            'user_id': str(100000 + i),
+            'username': f'user{i}',
+            'subscription_type': 'vip',
+            'subscription_end': '2099-01-01T00:00:00+00:00',
+            'auto_trading_enabled': True,
+            'auto_trading_strategy': rng.choice(strategies),
+            'auto_trading_mode': 'demo',
+            'current_balance': 1000.0,
+            'percentage_value': 2.5,
+            'martingale_base_stake': 100.0,
+            'martingale_multiplier': 3,
+            'current_martingale_level': rng.randint(0, 3),
+            'dalembert_base_stake': 100.0,
+            'dalembert_unit': 50.0,
+            'current_dalembert_level': rng.randint(0, 3)
+        }
+        for i in range(count)
+    ]
+    db.client.table('users').insert(users).execute()
+    return [user['user_id'] for user in users]
+
+
+# ========================================
+# БЕНЧМАРКИ
+# ========================================
+
+def bench_indicators(sizes: List[int], repeat: int) -> Dict[str, Dict[str, Any]]:
+    """calculate_indicators: полный пересчет и потоковое обновление всех активов (в DataFrame и в буферах)"""
+    ai = AICore(market_data=SyntheticProvider())
+    results = {}
+
+    for count in sizes:
+        frames = make_frames(count)
+
+        results[f'full/{count}'] = summarize_latencies(
+            time_calls(lambda: [ai.calculate_indicators(df.copy()) for df in frames.values()], repeat),
+            items=count
+        )
+
+        # Потоковый режим: состояние прогрето, на каждом цикле одна новая свеча
+        for symbol, df in frames.items():
+            ai.calculate_indicators(df.iloc[:-1].copy(), symbol=symbol)
+        results[f'incremental/{count}'] = summarize_latencies(
+            time_calls(lambda: [ai.calculate_indicators(df.copy(), symbol=symbol)
+                                for symbol, df in frames.items()], repeat),
+            items=count
+        )
+
+        # Кольцевые буферы: та же новая свеча, индикаторы пишутся в буфер на место
+        series = {}
+        for symbol, df in frames.items():
+            resampler = TimeframeResampler(['5m'], base_interval='5m')
+            resampler.update_frame(df.iloc[:-1])
+            ai.update_buffer_indicators(symbol, '5m', resampler.buffer('5m'))
+            series[symbol] = (resampler, df.iloc[-1:])
+        results[f'buffer/{count}'] = summarize_latencies(
+            time_calls(lambda: [(resampler.update_frame(last), ai.update_buffer_indicators(symbol, '5m', resampler.buffer('5m')))
+                                for symbol, (resampler, last) in series.items()], repeat),
+            items=count
+        )
+    return results
+
+
+def bench_signals(sizes: List[int], repeat: int) -> Dict[str, Dict[str, Any]]:
+    """generate_signal по одному активу и generate_signals_batch для всех сразу"""
+    ai = AICore(market_data=SyntheticProvider())
+    ai.incremental_indicators = False
+    results = {}
+
+    for count in sizes:
+        frames = {symbol: ai.calculate_indicators(df) for symbol, df in make_frames(count).items()}
+
+        results[f'scalar/{count}'] = summarize_latencies(
+            time_calls(lambda: [ai.generate_signal(df, symbol) for symbol, df in frames.items()], repeat),
+            items=count
+        )
+        results[f'batch/{count}'] = summarize_latencies(
+            time_calls(lambda: ai.generate_signals_batch(frames), repeat),
+            items=count
+        )
+    return results
+
+
+def bench_autotrader(sizes: List[int], repeat: int) -> Dict[str, Dict[str, Any]]:
+    """AutoTrader.execute_signal_for_users для count пользователей с автоторговлей"""
+    results = {}
+    signal = {
+        'symbol': 'BTC-USD',
+        'signal_type': 'CALL',
+        'confidence': 60.0,
+        'timeframe': '5m'
+    }
+
+    for count in sizes:
+        db = DatabaseManager(client=LocalSupabaseClient())
+        user_ids = make_users(db, count)
+
+        api = PocketOptionAPI()
+        for user_id in user_ids:
+            api.sessions[int(user_id)] = {'connected': True, 'mode': 'demo', 'balance': 1e12}
+
+        trader = AutoTrader(db_manager=db, pocket_api=api)
+        latencies = asyncio.run(time_async_calls(
+            lambda: trader.execute_signal_for_users(signal),
+            repeat=max(1, repeat // (1 + count // 10000))
+        ))
+        results[str(count)] = summarize_latencies(latencies, items=count)
+        trader.db_manager.close()
+        db.client.close()
+    return results
+
+
+def bench_signal_bus(sizes: List[int], repeat: int) -> Dict[str, Dict[str, Any]]:
+    """Задержка сигнал -> сделки: публикация в шину до обработки AutoTrader (и записи в БД)"""
+    results = {}
+
+    async def run(trader: AutoTrader, db: DatabaseManager, runs: int) -> List[float]:
+        bus = SignalBus()
+        subscription = bus.subscribe('autotrader', trader.execute_signal_for_users)
+
+        async def store_signal(signal):
+            await trader.db_manager.add_signal(signal)
+        bus.subscribe('database', store_signal)
+
+        await bus.start()
+        for i in range(runs):
+            await bus.publish({
+                'symbol': 'BTC-USD',
+                'signal_type': 'CALL' if i % 2 else 'PUT',
+                'confidence': 60.0,
+                'entry_price': 100.0,
+                'timeframe': '5m',
+                'profit_loss': 0.0
+            })
+            # Сигналы приходят по одному, а не пачкой
+            await subscription.queue.join()
+        await bus.stop()
+        return list(subscription.latencies)
+
+    for count in sizes:
+        db = DatabaseManager(client=LocalSupabaseClient())
+        user_ids = make_users(db, count)
+
+        api = PocketOptionAPI()
+        for user_id in user_ids:
+            api.sessions[int(user_id)] = {'connected': True, 'mode': 'demo', 'balance': 1e12}
+
+        trader = AutoTrader(db_manager=db, pocket_api=api)
+        latencies = asyncio.run(run(trader, db, max(1, repeat // (1 + count // 10000))))
+        results[str(count)] = summarize_latencies(latencies, items=count)
+        trader.db_manager.close()
+        db.client.close()
+    return results
+
+
+def bench_event_loop_lag(sizes: List[int], repeat: int) -> Dict[str, Dict[str, Any]]:
+    """Задержка event loop, пока считаются индикаторы count активов: в цикле и в пуле"""
+    results = {}
+
+    async def run(series: List, executor: Optional[AnalysisExecutor]) -> List[float]:
+        monitor = EventLoopLagMonitor(interval=0.01, report_every=0)
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.05)
+        monitor.reset()
+
+        for _ in range(repeat):
+            if executor:
+                await executor.compute(series)
+            else:
+                compute_latest(*pack_series([array for _, array in series]))
+                # Как в AICore: между пачками цикл получает управление
+                await asyncio.sleep(0)
+
+        task.cancel()
+        return list(monitor.samples) or [0.0]
+
+    executor = AnalysisExecutor()
+    try:
+        for count in sizes:
+            series = [
+                (symbol, df[['Open', 'High', 'Low', 'Close', 'Volume']].to_numpy())
+                for symbol, df in make_frames(count).items()
+            ]
+            results[f'inline/{count}'] = summarize_latencies(asyncio.run(run(series, None)))
+            results[f'pool/{count}'] = summarize_latencies(asyncio.run(run(series, executor)))
+    finally:
+        executor.shutdown()
+    return results
+
+
+def bench_database(sizes: List[int], repeat: int) -> Dict[str, Dict[str, Any]]:
+    """Операции DatabaseManager на локальной замене Supabase"""
+    results = {}
+
+    for count in sizes:
+        db = DatabaseManager(client=LocalSupabaseClient())
+        user_ids = make_users(db, count)
+        rng = random.Random(7)
+        for user_id in user_ids[:100]:
+            db.add_signal({'user_id': user_id, 'asset': 'BTC-USD', 'signal_type': 'CALL',
+                           'result': rng.choice(['win', 'loss']), 'profit_loss': rng.uniform(-100, 100)})
+
+        calls = max(repeat * 10, 100)
+        operations = {
+            'get_user': lambda: db.get_user(int(rng.choice(user_ids))),
+            'update_user': lambda: db.update_user(int(rng.choice(user_ids)), {'current_balance': 1000.0}),
+            'check_subscription': lambda: db.check_subscription(int(rng.choice(user_ids))),
+            'add_signal': lambda: db.add_signal({'user_id': rng.choice(user_ids), 'asset': 'ETH-USD',
+                                                 'signal_type': 'PUT', 'confidence': 55.0,
+                                                 'profit_loss': 0.0}),
+            'get_user_signals': lambda: db.get_user_signals(int(rng.choice(user_ids[:100]))),
+            'get_user_stats': lambda: db.get_user_stats(int(rng.choice(user_ids[:100]))),
+            'log_command': lambda: db.log_command(int(rng.choice(user_ids)), '/start')
+        }
+        for name, operation in operations.items():
+            results[f'{name}/{count}'] = summarize_latencies(time_calls(operation, calls, warmup=5))
+
+        # Операции над всеми пользователями - элемент = пользователь
+        bulk_repeat = max(1, repeat // (1 + count // 1000))
+        results[f'get_users_with_auto_trading/{count}'] = summarize_latencies(
+            time_calls(db.get_users_with_auto_trading, bulk_repeat), items=count
+        )
+        results[f'get_global_stats/{count}'] = summarize_latencies(
+            time_calls(db.get_global_stats, bulk_repeat), items=count
+        )
+        db.client.close()
+    return results
+
+
+def bench_crypto(repeat: int) -> Dict[str, Dict[str, Any]]:
+    """encrypt_ssid / decrypt_ssid (каждый вызов выводит ключ через PBKDF2)"""
+    ssid = '42ba6c51b138c4907298829c6d1c7e09a4f5e3d8'
+    encrypted = crypto_utils.encrypt_ssid(ssid)
+    return {
+        'encrypt_ssid': summarize_latencies(time_calls(lambda: crypto_utils.encrypt_ssid(ssid), repeat)),
+        'decrypt_ssid': summarize_latencies(time_calls(lambda: crypto_utils.decrypt_ssid(encrypted), repeat))
+    }
+
+
+# Реестр: имя -> функция(профиль)
+BENCHMARKS = {
+    'indicators': lambda p: bench_indicators(p['assets'], p['repeat']),
+    'signals': lambda p: bench_signals(p['assets'], p['repeat']),
+    'autotrader': lambda p: bench_autotrader(p['users'], p['repeat']),
+    'signal_bus': lambda p: bench_signal_bus(p['users'], p['repeat']),
+    'event_loop_lag': lambda p: bench_event_loop_lag(p['assets'], p['repeat']),
+    'database': lambda p: bench_database(p['users'], p['repeat']),
+    'crypto': lambda p: bench_crypto(p['repeat'])
+}
+
+
+# ========================================
+# ОТЧЕТ
+# ========================================
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, timeout=10, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmarks(profile: str = 'quick', only: List[str] = None) -> Dict[str, Any]:
+    """
+    Прогнать бенчмарки
+
+    Args:
+        profile: 'quick' или 'full' (см. PROFILES)
+        only: Имена бенчмарков из BENCHMARKS (по умолчанию все)
+
+    Returns:
+        Dict: {'meta': {...}, 'results': {бенчмарк: {случай: метрики}}}
+    """
+    settings = PROFILES[profile]
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'profile': profile,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'results': {}
+    }
+
+    for name in only or BENCHMARKS:
+        started = time.perf_counter()
+        report['results'][name] = BENCHMARKS[name](settings)
+        logger.info(f"⏱️ {name}: {time.perf_counter() - started:.1f}с")
+        for case, metrics in report['results'][name].items():
+            logger.info(
+                f"  {name}/{case}: p50 {metrics['p50_ms']:.3f} мс, p99 {metrics['p99_ms']:.3f} мс, "
+                f"{metrics['throughput']:.0f}/с"
+            )
+    return report
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any],
+                    threshold: float = 0.1) -> List[Dict[str, Any]]:
+    """
+    Найти регрессии между двумя отчетами
+
+    Регрессия - рост p50/p99 или падение throughput больше чем на threshold
+    (доля) для случая, присутствующего в обоих отчетах.
+
+    Returns:
+        List[Dict]: benchmark, case, metric, baseline, current, change
+    """
+    regressions = []
+    for name, cases in current.get('results', {}).items():
+        for case, metrics in cases.items():
+            before = baseline.get('results', {}).get(name, {}).get(case)
+            if not before:
+                continue
+
+            checks = [(metric, metrics[metric] / before[metric] - 1) for metric in LATENCY_METRICS if before[metric]]
+            if metrics['throughput']:
+                checks.append(('throughput', before['throughput'] / metrics['throughput'] - 1))
+
+            for metric, change in checks:
+                if change > threshold:
+                    regressions.append({
+                        'benchmark': name,
+                        'case': case,
+                        'metric': metric,
+                        'baseline': before[metric],
+                        'current': metrics[metric],
+                        'change': change
+                    })
+    return regressions
+
+
+def main() -> int:
+    """Запуск бенчмарков или сравнения из командной строки"""
+    parser = argparse.ArgumentParser(description='Бенчмарки конвейера анализ → сигнал → сделка')
+    parser.add_argument('--profile', default='quick', choices=list(PROFILES))
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=None)
+    parser.add_argument('--output', default='benchmark_results.json', help='Путь к JSON отчету')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), default=None,
+                        help='Сравнить два отчета вместо прогона')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Допустимое ухудшение (доля)')
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        with open(args.compare[1], 'r', encoding='utf-8') as f:
+            current = json.load(f)
+
+        regressions = compare_reports(baseline, current, args.threshold)
+        for item in regressions:
+            logger.warning(
+                f"⚠️ {item['benchmark']}/{item['case']} {item['metric']}: "
+                f"{item['baseline']:.3f} → {item['current']:.3f} ({item['change'] * 100:+.0f}%)"
+            )
+        if not regressions:
+            logger.info(f"✅ Регрессий нет (порог {args.threshold * 100:.0f}%)")
+        return 1 if regressions else 0
+
+    report = run_benchmarks(args.profile, args.only)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    logger.info(f"💾 Отчет сохранен: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    logger.setLevel(logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""
+cache_utils.py - Кэш в памяти с вытеснением LRU и временем жизни (TTL)
+Версия: 1.0
+Дата: 2026-10-18
+
+Обеспечивает:
+- TTLCache: ограниченный по размеру кэш, записи устаревают через ttl секунд
+- Счетчики попаданий, промахов, вытеснений и устаревших записей
+- FeatureCache: кэш вычисляемых значений с однократным вычислением
+  (single-flight): параллельные запросы одного ключа ждут один расчет
+- Нормализованный хэш текста: почти одинаковые строки (регистр, пробелы,
+  мелкие колебания осцилляторов) дают один ключ
+"""
+
+import re
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Hashable, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+# Число и (необязательно) слово перед ним - метка величины: 'rsi 55.3'
+_NUMBER_RE = re.compile(r'(?:([^\W\d]+)\s+)?(-?\d+(?:\.\d+)?)')
+_SPACE_RE = re.compile(r'\s+')
+
+
+class TTLCache:
+    """LRU-кэш с временем жизни записей (потокобезопасный)"""
+
+    def __init__(self, maxsize: int = 128, ttl: float = 300, name: str = 'cache'):
+        """
+        Args:
+            maxsize: Максимум записей (самая давно использованная вытесняется)
+            ttl: Время жизни записи в секундах
+            name: Имя кэша для логов и статистики
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        """
+        Получить значение по ключу
+
+        Args:
+            key: Ключ
+            default: Значение при промахе
+            count: Учитывать обращение в счетчиках попаданий/промахов
+
+        Returns:
+            Значение из кэша или default
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                item = None
+
+            if item is None:
+                if count:
+                    self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            if count:
+                self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float = None):
+        """Сохранить значение (ttl переопределяет время жизни по умолчанию)"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Удалить запись (инвалидация)"""
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self):
+        """Очистить кэш (счетчики сохраняются)"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Статистика кэша
+
+        Returns:
+            Dict: name, size, maxsize, ttl, hits, misses, hit_rate (%),
+            evictions, expirations
+        """
+        requests = self.hits + self.misses
+        return {
+            'name': self.name,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / requests * 100) if requests else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+
+class FeatureCache(TTLCache):
+    """
+    LRU-кэш вычисляемых значений с однократным вычислением ключа
+
+    Параллельные корутины, запросившие один и тот же отсутствующий ключ,
+    ждут один расчет вместо того, чтобы запускать свой. Используется
+    в одном event loop.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 86400, name: str = 'features'):
+        super().__init__(maxsize=maxsize, ttl=ttl, name=name)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+        self.computes = 0
+        self.coalesced = 0
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]],
+                             store: bool = True) -> Any:
+        """
+        Значение из кэша или результат compute() (один расчет на ключ)
+
+        Результат None не кэшируется. Ошибка расчета передается всем
+        ожидающим и не кэшируется.
+
+        Args:
+            key: Ключ
+            compute: Функция без аргументов, возвращающая awaitable
+            store: False - только объединить параллельные вызовы, без
+                сохранения результата (например, загрузка данных)
+
+        Returns:
+            Значение ключа
+        """
+        if store:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            self.computes += store
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Без ожидающих исключение не должно попасть в лог как необработанное
+            future.exception()
+            raise
+        else:
+            if store and value is not None:
+                self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика TTLCache плюс computes (расчеты) и coalesced (ожидания чужого расчета)"""
+        stats = super().stats()
+        stats.update({
+            'computes': self.computes,
+            'coalesced': self.coalesced,
+            'inflight': len(self._inflight)
+        })
+        return stats
+
+
+def normalized_hash(text: str, digits: int = 6, coarse: Dict[str, int] = None) -> str:
+    """
+    Хэш текста, устойчивый к несущественным различиям
+
+    Текст приводится к нижнему регистру, пробелы схлопываются, числа
+    округляются до digits значащих цифр. Грубее округляются только числа
+    после меток из coarse - ограниченные осцилляторы вроде RSI, где
+    колебание в десятых не меняет картину ('rsi 55.3' и 'rsi 55.4' -> 'rsi 55'
+    при coarse={'rsi': 2}). Цены округлять грубо нельзя: 1.0823 и 1.0849
+    при 3 значащих цифрах дают одинаковый ключ.
+
+    Args:
+        text: Исходный текст
+        digits: Значащих цифр в числах
+        coarse: Значащих цифр для чисел после метки {метка: цифр}
+            (метки в нижнем регистре)
+
+    Returns:
+        str: SHA-256 нормализованного текста (hex)
+    """
+    coarse = coarse or {}
+
+    def round_number(match) -> str:
+        label, number = match.group(1), match.group(2)
+        rounded = f'{float(number):.{coarse.get(label, digits)}g}'
+        return f'{label} {rounded}' if label else rounded
+
+    normalized = _SPACE_RE.sub(' ', text.strip().lower())
+    normalized = _NUMBER_RE.sub(round_number, normalized)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
@@ -0,0 +1,351 @@
+"""
+candle_buffer.py - Кольцевой буфер свечей и индикаторов фиксированного размера
+Версия: 1.0
+Дата: 2026-10-18
+
+Обеспечивает:
+- Хранение OHLCV и индикаторов серии в заранее выделенном массиве NumPy:
+  новые свечи перезаписывают самые старые, память не растет со временем
+  и равна capacity x колонки на серию
+- Представления (view) последних свечей без копирования: каждая строка
+  пишется дважды (позиции i и i + capacity), поэтому окно любых последних
+  свечей всегда непрерывно в памяти
+- Запись индикаторов на место в строки свечей (без DataFrame на цикл)
+- Согласованный снимок колонки для чтения из другого потока (column_since):
+  запись и снимок выполняются под одной блокировкой
+- Необязательное хранение значений в float32 (AI_CANDLE_DTYPE=float32):
+  вдвое меньше памяти ценой точности ~7 значащих цифр; метки времени
+  всегда хранятся в int64
+"""
+
+import os
+import logging
+import threading
+from typing import Optional, Dict, List, Tuple, Any
+
+# NumPy - опциональный (для облегченных версий)
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+from candle_store import OHLCV_COLUMNS
+from streaming_indicators import INDICATOR_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Колонки буфера со свечами и индикаторами
+CANDLE_COLUMNS = OHLCV_COLUMNS + INDICATOR_COLUMNS
+
+
+def default_dtype():
+    """Тип значений из AI_CANDLE_DTYPE ('float64' или 'float32')"""
+    name = os.getenv('AI_CANDLE_DTYPE', 'float64')
+    if name not in ('float64', 'float32'):
+        logger.warning(f"⚠️ Неизвестный AI_CANDLE_DTYPE={name} - используется float64")
+        name = 'float64'
+    return np.dtype(name)
+
+
+class CandleRingBuffer:
+    """Последние capacity свечей одной серии"""
+
+    def __init__(self, capacity: int, columns: List[str] = None, dtype=None):
+        """
+        Args:
+            capacity: Сколько последних свечей хранить
+            columns: Колонки значений (по умолчанию CANDLE_COLUMNS)
+            dtype: float64 или float32 (по умолчанию AI_CANDLE_DTYPE)
+        """
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("Для буфера свечей нужен numpy")
+
+        self.capacity = max(2, int(capacity))
+        self.columns = list(columns or CANDLE_COLUMNS)
+        self.positions: Dict[str, int] = {column: i for i, column in enumerate(self.columns)}
+        self.dtype = np.dtype(dtype) if dtype is not None else default_dtype()
+
+        # Двойная запись: строка i лежит в позициях i и i + capacity
+        self._values = np.full((2 * self.capacity, len(self.columns)), np.nan, dtype=self.dtype)
+        self._timestamps = np.zeros(2 * self.capacity, dtype=np.int64)
+        self._written = 0
+        self.size = 0
+
+        # Запись (event loop) против снимка column_since (поток резолвера);
+        # RLock - extend вызывает upsert
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        """Память под данные буфера (байты)"""
+        return self._values.nbytes + self._timestamps.nbytes
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return int(self._timestamps[self._end - 1]) if self.size else None
+
+    @property
+    def _end(self) -> int:
+        """Конец непрерывного окна последних size строк (исключительно)"""
+        return (self._written - 1) % self.capacity + self.capacity + 1
+
+    def _slot(self, position: int) -> int:
+        """Физическая позиция (первая копия) строки окна с номером position"""
+        return (self._written - self.size + position) % self.capacity
+
+    # ========================================
+    # ЗАПИСЬ
+    # ========================================
+
+    def upsert(self, timestamp: int, values) -> bool:
+        """
+        Добавить свечу или заменить последнюю с той же меткой времени
+
+        Args:
+            timestamp: Метка времени (Unix-секунды)
+            values: Значения первых len(values) колонок (обычно OHLCV);
+                остальные колонки новой свечи - NaN
+
+        Returns:
+            bool: False, если свеча старше последней (не записана)
+        """
+        with self._lock:
+            return self._upsert(timestamp, values)
+
+    def _upsert(self, timestamp: int, values) -> bool:
+        last = self.last_timestamp
+        if last is not None and timestamp < last:
+            # Более старые закрытые свечи не пересчитываются
+            return False
+
+        if last is None or timestamp > last:
+            self._written += 1
+            self.size = min(self.size + 1, self.capacity)
+            slot = self._slot(self.size - 1)
+            self._values[slot, len(values):] = np.nan
+            self._values[slot + self.capacity, len(values):] = np.nan
+        else:
+            slot = self._slot(self.size - 1)
+
+        for row in (slot, slot + self.capacity):
+            self._timestamps[row] = timestamp
+            self._values[row, :len(values)] = values
+        return True
+
+    def extend(self, timestamps, values) -> int:
+        """
+        Добавить пачку свечей с возрастающими метками времени
+
+        Свечи старше последней пропускаются, свеча с той же меткой
+        заменяет последнюю - как при последовательных upsert.
+
+        Args:
+            timestamps: Метки времени (Unix-секунды)
+            values: Массив (свечи, k) значений первых k колонок
+
+        Returns:
+            int: Количество записанных свечей
+        """
+        with self._lock:
+            return self._extend(np.asarray(timestamps, dtype=np.int64), np.asarray(values))
+
+    def _extend(self, timestamps, values) -> int:
+        last = self.last_timestamp
+        if last is not None:
+            fresh = timestamps >= last
+            timestamps, values = timestamps[fresh], values[fresh]
+        written = len(timestamps)
+        if not written:
+            return 0
+
+        if timestamps[0] == last:
+            self._upsert(timestamps[0], values[0])
+            timestamps, values = timestamps[1:], values[1:]
+
+        # Из длинной пачки в буфер попадают только последние capacity свечей
+        timestamps, values = timestamps[-self.capacity:], values[-self.capacity:]
+        count = len(timestamps)
+        width = values.shape[1] if count else 0
+
+        # Не более двух непрерывных кусков: до конца кольца и с его начала
+        start = self._written % self.capacity
+        head = min(count, self.capacity - start)
+        for slot, source in ((start, slice(0, head)), (0, slice(head, count))):
+            rows = source.stop - source.start
+            if rows <= 0:
+                continue
+            for offset in (slot, slot + self.capacity):
+                target = slice(offset, offset + rows)
+                self._timestamps[target] = timestamps[source]
+                self._values[target, :width] = values[source]
+                self._values[target, width:] = np.nan
+
+        self._written += count
+        self.size = min(self.size + count, self.capacity)
+        return written
+
+    def write(self, position: int, columns: slice, values):
+        """
+        Записать значения в строку окна на место
+
+        Args:
+            position: Номер строки в окне (0 - самая старая, -1 - последняя)
+            columns: Срез колонок
+            values: Значения
+        """
+        with self._lock:
+            if position < 0:
+                position += self.size
+            slot = self._slot(position)
+            self._values[slot, columns] = values
+            self._values[slot + self.capacity, columns] = values
+
+    def clear(self):
+        with self._lock:
+            self._written = 0
+            self.size = 0
+
+    # ========================================
+    # ЧТЕНИЕ (БЕЗ КОПИРОВАНИЯ)
+    # ========================================
+
+    def view(self, rows: int = None):
+        """
+        Последние rows свечей (по умолчанию все) без копирования
+
+        Представление действительно до следующей записи в буфер.
+
+        Returns:
+            ndarray (rows, колонки)
+        """
+        rows = self.size if rows is None else min(rows, self.size)
+        end = self._end
+        return self._values[end - rows:end]
+
+    def timestamps(self, rows: int = None):
+        """Метки времени последних rows свечей без копирования"""
+        rows = self.size if rows is None else min(rows, self.size)
+        end = self._end
+        return self._timestamps[end - rows:end]
+
+    def column(self, name: str, rows: int = None):
+        """Колонка последних rows свечей (представление с шагом)"""
+        return self.view(rows)[:, self.positions[name]]
+
+    def since(self, timestamp: int) -> int:
+        """Сколько последних свечей имеют метку времени не меньше timestamp"""
+        timestamps = self.timestamps()
+        return len(timestamps) - int(np.searchsorted(timestamps, timestamp, side='left'))
+
+    # ========================================
+    # СНИМОК (ДЛЯ ДРУГИХ ПОТОКОВ)
+    # ========================================
+
+    def column_since(self, name: str, timestamp: int) -> Optional[Tuple[Any, Any]]:
+        """
+        Копии меток времени и колонки свечей начиная с timestamp
+
+        Окно вычисляется один раз под блокировкой записи, поэтому метки
+        и значения всегда относятся к одним и тем же свечам, даже если
+        буфер в это время дописывается из event loop.
+
+        Args:
+            name: Колонка (например, 'Close')
+            timestamp: Минимальная метка времени (Unix-секунды)
+
+        Returns:
+            Tuple: (timestamps int64, значения float64) или None, если
+            буфер не покрывает timestamp (первая свеча новее или свечей нет)
+        """
+        with self._lock:
+            end = self._end
+            start = end - self.size
+            timestamps = self._timestamps[start:end]
+            if not self.size or timestamps[0] > timestamp:
+                return None
+            offset = int(np.searchsorted(timestamps, timestamp, side='left'))
+            if offset == self.size:
+                return None
+            return (timestamps[offset:].copy(),
+                    self._values[start + offset:end, self.positions[name]].astype(np.float64))
+
+
+# ========================================
+# ТЕСТ
+# ========================================
+
+def test_candle_buffer(capacity: int = 50, bars: int = 1000) -> bool:
+    """
+    Сверить буфер с эталонным списком при многократном переполнении
+
+    Проверяются окно view, обновление последней свечи, запись индикаторов
+    на место, пакетная запись и отсутствие роста памяти.
+
+    Returns:
+        bool: True если все проверки пройдены
+    """
+    rng = np.random.default_rng(7)
+    buffer = CandleRingBuffer(capacity, dtype=np.float64)
+    nbytes = buffer.nbytes
+    reference = []
+    ok = True
+
+    for i in range(bars):
+        row = rng.random(len(OHLCV_COLUMNS))
+        buffer.upsert(i * 60, row)
+        reference.append([i * 60, *row, *[np.nan] * len(INDICATOR_COLUMNS)])
+
+        # Незакрытая свеча обновилась
+        if i % 7 == 0:
+            row = rng.random(len(OHLCV_COLUMNS))
+            buffer.upsert(i * 60, row)
+            reference[-1][1:len(OHLCV_COLUMNS) + 1] = row
+
+        indicators = rng.random(len(INDICATOR_COLUMNS))
+        buffer.write(-1, slice(len(OHLCV_COLUMNS), None), indicators)
+        reference[-1][len(OHLCV_COLUMNS) + 1:] = indicators
+
+        expected = np.array(reference[-capacity:])
+        view = buffer.view()
+        ok &= np.shares_memory(view, buffer._values)
+        ok &= np.array_equal(buffer.timestamps(), expected[:, 0].astype(np.int64))
+        ok &= np.array_equal(view, expected[:, 1:], equal_nan=True)
+
+    # Пачки разной длины (в том числе длиннее емкости) дают то же окно
+    batched = CandleRingBuffer(capacity, dtype=np.float64)
+    sequential = CandleRingBuffer(capacity, dtype=np.float64)
+    timestamp = 0
+    for size in rng.integers(1, 3 * capacity, 40):
+        timestamps = np.arange(timestamp, timestamp + size) * 60
+        rows = rng.random((size, len(OHLCV_COLUMNS)))
+        batched.extend(timestamps, rows)
+        for ts, row in zip(timestamps, rows):
+            sequential.upsert(ts, row)
+        # Следующая пачка начинается с обновления последней свечи
+        timestamp += size - 1
+        ok &= np.array_equal(batched.timestamps(), sequential.timestamps())
+        ok &= np.array_equal(batched.view(), sequential.view(), equal_nan=True)
+
+    ok &= not buffer.upsert(0, rng.random(len(OHLCV_COLUMNS)))
+    ok &= buffer.since((bars - 10) * 60) == 10
+    snapshot = buffer.column_since('Close', (bars - 10) * 60)
+    ok &= snapshot is not None and np.array_equal(snapshot[0], buffer.timestamps(10))
+    ok &= snapshot is not None and np.array_equal(snapshot[1], buffer.column('Close', 10))
+    ok &= buffer.column_since('Close', 0) is None
+    ok &= buffer.nbytes == nbytes
+
+    if ok:
+        logger.info(f"✅ Кольцевой буфер совпадает с эталоном ({bars} свечей, емкость {capacity})")
+    else:
+        logger.error("❌ Кольцевой буфер расходится с эталоном")
+    return bool(ok)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    test_candle_buffer()
@@ -0,0 +1,233 @@
+"""
+candle_store.py - Локальное хранилище свечей (OHLCV) в SQLite
+Версия: 1.0
+Дата: 2026-10-18
+
+Обеспечивает:
+- Постоянное хранение свечей по ключу (asset_symbol, timeframe, timestamp)
+- Верхнюю отметку (high-water mark) для каждой серии
+- Дозагрузку только новых свечей вместо полной выгрузки периода
+- Теплый старт после перезапуска (данные читаются с диска)
+
+Таблица market_history в crypto_signals_bot.db хранит снимки индикаторов,
+а не OHLCV, поэтому свечи лежат в соседней таблице candles того же файла.
+"""
+
+import os
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Optional, Dict, List
+
+# Pandas - опциональный
+try:
+    import pandas as pd
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+    pd = None
+
+logger = logging.getLogger(__name__)
+
+# Длительность периодов yfinance в секундах
+PERIOD_SECONDS = {
+    '1d': 86400,
+    '5d': 5 * 86400,
+    '1mo': 30 * 86400,
+    '3mo': 90 * 86400
+}
+
+# Длительность интервалов (таймфреймов) в секундах
+INTERVAL_SECONDS = {
+    '1m': 60,
+    '2m': 120,
+    '5m': 300,
+    '15m': 900,
+    '30m': 1800,
+    '1h': 3600,
+    '4h': 4 * 3600,
+    '1d': 86400
+}
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS candles (
+    asset_symbol TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    volume REAL,
+    PRIMARY KEY (asset_symbol, timeframe, timestamp)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS candle_watermarks (
+    asset_symbol TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    last_timestamp INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (asset_symbol, timeframe)
+);
+"""
+
+
+def to_epoch_seconds(index) -> List[int]:
+    """Преобразовать DatetimeIndex (с таймзоной или без) в секунды UTC"""
+    if index.tz is None:
+        index = index.tz_localize('UTC')
+    return index.tz_convert('UTC').tz_localize(None).to_numpy('datetime64[s]').astype('int64').tolist()
+
+
+class CandleStore:
+    """Хранилище свечей с дозагрузкой по верхней отметке"""
+
+    def __init__(self, db_path: str = None, retention_days: int = None):
+        """
+        Инициализация хранилища
+
+        Args:
+            db_path: Путь к SQLite файлу (по умолчанию CANDLE_STORE_PATH
+                или crypto_signals_bot.db)
+            retention_days: Сколько дней свечей хранить на серию
+                (по умолчанию CANDLE_RETENTION_DAYS или 7)
+        """
+        self.db_path = db_path or os.getenv('CANDLE_STORE_PATH', 'crypto_signals_bot.db')
+        self.retention_seconds = (retention_days or int(os.getenv('CANDLE_RETENTION_DAYS', '7'))) * 86400
+
+        # Хранилище используется из пула потоков загрузки - одно соединение под блокировкой
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+        logger.info(f"✅ CandleStore инициализирован ({self.db_path})")
+
+    def close(self):
+        """Закрыть соединение с БД"""
+        with self._lock:
+            self._conn.close()
+
+    # ========================================
+    # ВЕРХНЯЯ ОТМЕТКА
+    # ========================================
+
+    def get_watermark(self, symbol: str, timeframe: str) -> Optional[int]:
+        """
+        Получить метку времени последней сохраненной свечи серии
+
+        Returns:
+            int: Unix-время (секунды, UTC) или None, если серия пуста
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_timestamp FROM candle_watermarks WHERE asset_symbol = ? AND timeframe = ?",
+                (symbol, timeframe)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_watermarks(self) -> Dict[tuple, int]:
+        """Верхние отметки всех серий: {(symbol, timeframe): last_timestamp}"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT asset_symbol, timeframe, last_timestamp FROM candle_watermarks"
+            ).fetchall()
+        return {(symbol, timeframe): ts for symbol, timeframe, ts in rows}
+
+    # ========================================
+    # ЗАПИСЬ И ЧТЕНИЕ
+    # ========================================
+
+    def upsert(self, symbol: str, timeframe: str, df) -> int:
+        """
+        Сохранить свечи серии (существующие метки времени перезаписываются)
+
+        Args:
+            symbol: Символ актива
+            timeframe: Таймфрейм
+            df: DataFrame с колонками Open, High, Low, Close, Volume
+
+        Returns:
+            int: Количество записанных свечей
+        """
+        if df is None or df.empty:
+            return 0
+
+        timestamps = to_epoch_seconds(df.index)
+        columns = [df[col].astype(float).tolist() if col in df else [None] * len(df) for col in OHLCV_COLUMNS]
+        rows = [
+            (symbol, timeframe, ts, *values)
+            for ts, *values in zip(timestamps, *columns)
+        ]
+        last_timestamp = max(timestamps)
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO candles "
+                "(asset_symbol, timeframe, timestamp, open, high, low, close, volume) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.execute(
+                "INSERT INTO candle_watermarks (asset_symbol, timeframe, last_timestamp, updated_at) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(asset_symbol, timeframe) DO UPDATE SET "
+                "last_timestamp = MAX(last_timestamp, excluded.last_timestamp), "
+                "updated_at = excluded.updated_at",
+                (symbol, timeframe, last_timestamp, datetime.now(timezone.utc).isoformat())
+            )
+            self._conn.execute(
+                "DELETE FROM candles WHERE asset_symbol = ? AND timeframe = ? AND timestamp < ?",
+                (symbol, timeframe, last_timestamp - self.retention_seconds)
+            )
+            self._conn.commit()
+
+        return len(rows)
+
+    def load(self, symbol: str, timeframe: str, since: int = None, limit: int = None,
+             until: int = None):
+        """
+        Прочитать свечи серии в хронологическом порядке
+
+        Args:
+            symbol: Символ актива
+            timeframe: Таймфрейм
+            since: Минимальная метка времени (Unix-секунды, включительно)
+            limit: Максимальное количество последних свечей
+            until: Максимальная метка времени (Unix-секунды, включительно);
+                вызывающий с часами в прошлом (реплей, тесты) не получит
+                свечи новее своего "сейчас"
+
+        Returns:
+            DataFrame с колонками OHLCV и индексом UTC или None, если данных нет
+        """
+        if not PANDAS_AVAILABLE:
+            return None
+
+        query = (
+            "SELECT timestamp, open, high, low, close, volume FROM candles "
+            "WHERE asset_symbol = ? AND timeframe = ? AND timestamp >= ? "
+        )
+        params = [symbol, timeframe, since or 0]
+        if until is not None:
+            query += "AND timestamp <= ? "
+            params.append(until)
+        query += "ORDER BY timestamp DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        if not rows:
+            return None
+
+        rows.reverse()
+        timestamps = [row[0] for row in rows]
+        df = pd.DataFrame([row[1:] for row in rows], columns=OHLCV_COLUMNS)
+        df.index = pd.to_datetime(timestamps, unit='s', utc=True)
+        return df
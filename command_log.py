@@ -0,0 +1,267 @@
+"""
+command_log.py - Отложенная пакетная запись журнала команд
+Версия: 1.0
+Дата: 2026-10-18
+
+Обеспечивает:
+- Очередь строк журнала команд (таблица commands) в памяти: обработчик
+  Telegram отвечает пользователю, не дожидаясь записи в БД
+- Запись одним INSERT на пачку: каждые COMMAND_LOG_BATCH строк или
+  COMMAND_LOG_FLUSH_MS миллисекунд, что наступит раньше
+- Запись остатка очереди при остановке
+- Необязательный файл подстраховки (COMMAND_LOG_SPILL): строки дописываются
+  в него до записи в БД и читаются обратно при следующем запуске, если
+  процесс упал
+- Метрики: глубина очереди, пачки, ошибки, потерянные строки
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Optional, Dict, List, Callable, Any
+
+logger = logging.getLogger(__name__)
+
+
+class CommandLogBuffer:
+    """Буфер журнала команд с фоновой пакетной записью"""
+
+    def __init__(self, db_manager, run: Callable = None, batch_size: int = None,
+                 flush_interval: float = None, max_queue: int = None,
+                 spill_path: str = None):
+        """
+        Args:
+            db_manager: Экземпляр DatabaseManager (нужен log_commands)
+            run: Корутина run(fn, *args) для синхронных запросов
+                (AsyncDatabaseManager.run); по умолчанию asyncio.to_thread
+            batch_size: Строк в пачке (COMMAND_LOG_BATCH, по умолчанию 100)
+            flush_interval: Максимальная задержка записи в секундах
+                (COMMAND_LOG_FLUSH_MS, по умолчанию 1000 мс)
+            max_queue: Максимум строк в очереди, при переполнении теряются
+                самые старые (COMMAND_LOG_MAX_QUEUE, по умолчанию 10000)
+            spill_path: Файл подстраховки (COMMAND_LOG_SPILL, по умолчанию
+                не используется)
+        """
+        self.db_manager = db_manager
+        self._run = run or asyncio.to_thread
+        self.batch_size = batch_size or int(os.getenv('COMMAND_LOG_BATCH', '100'))
+        self.flush_interval = flush_interval or float(os.getenv('COMMAND_LOG_FLUSH_MS', '1000')) / 1000
+        self.max_queue = max_queue or int(os.getenv('COMMAND_LOG_MAX_QUEUE', '10000'))
+        self.spill_path = spill_path if spill_path is not None else os.getenv('COMMAND_LOG_SPILL') or None
+
+        self._queue: deque = deque()
+        self._wake: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._spill = None
+        self.running = False
+
+        self.max_queued = 0
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+        self.flush_time = 0.0
+
+        if self.spill_path:
+            self._recover()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    # ========================================
+    # ФАЙЛ ПОДСТРАХОВКИ
+    # ========================================
+
+    def _recover(self):
+        """Вернуть в очередь строки, не записанные в БД до падения"""
+        if not os.path.exists(self.spill_path):
+            return
+
+        recovered = 0
+        with open(self.spill_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    self._queue.append(json.loads(line))
+                    recovered += 1
+                except json.JSONDecodeError:
+                    # Строка, оборванная при падении
+                    continue
+
+        if recovered:
+            logger.warning(f"⚠️ Журнал команд: восстановлено {recovered} незаписанных строк из {self.spill_path}")
+        self._rewrite_spill()
+
+    def _append_spill(self, row: Dict[str, Any]):
+        if self._spill is None:
+            self._spill = open(self.spill_path, 'a', encoding='utf-8')
+        self._spill.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self._spill.flush()
+
+    def _rewrite_spill(self):
+        """Оставить в файле только строки, еще не записанные в БД"""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+        tmp_path = self.spill_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for row in self._queue:
+                f.write(json.dumps(row, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self.spill_path)
+
+    # ========================================
+    # ОЧЕРЕДЬ
+    # ========================================
+
+    def add(self, row: Dict[str, Any]):
+        """
+        Поставить строку журнала в очередь (не ждет БД)
+
+        Args:
+            row: Строка таблицы commands (DatabaseManager.command_row)
+        """
+        self._trim(self.max_queue - 1)
+        self._queue.append(row)
+        self.max_queued = max(self.max_queued, len(self._queue))
+
+        if self.spill_path:
+            self._append_spill(row)
+
+        if len(self._queue) >= self.batch_size and self._wake is not None:
+            self._wake.set()
+
+    def _trim(self, limit: int):
+        """Отбросить самые старые строки сверх limit"""
+        while len(self._queue) > limit:
+            self._queue.popleft()
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"⚠️ Очередь журнала команд переполнена, потеряно строк: {self.dropped}")
+
+    def _requeue(self, rows: List[Dict[str, Any]]):
+        """Вернуть незаписанную пачку в начало очереди (в пределах max_queue)"""
+        # Строки, добавленные во время записи, уже в конце очереди
+        self._queue.extendleft(reversed(rows))
+        self._trim(self.max_queue)
+
+    def _settle(self, write: asyncio.Future, rows: List[Dict[str, Any]]) -> bool:
+        """
+        Учесть завершенную запись пачки
+
+        Returns:
+            bool: True - пачка записана; иначе она возвращена в очередь
+        """
+        if not write.cancelled() and write.exception() is not None:
+            logger.error(f"❌ Ошибка записи журнала команд: {write.exception()}")
+        elif not write.cancelled() and write.result():
+            self.batches += 1
+            self.written += len(rows)
+            return True
+
+        self.failures += 1
+        self._requeue(rows)
+        return False
+
+    def _settle_detached(self, write: asyncio.Future, rows: List[Dict[str, Any]]):
+        """Учесть запись пачки, которая завершилась после отмены flush"""
+        if self._settle(write, rows) and self.spill_path:
+            self._rewrite_spill()
+
+    async def flush(self) -> int:
+        """
+        Записать очередь в БД пачками по batch_size строк
+
+        Пачка, которую не удалось записать, возвращается в начало очереди.
+        При отмене flush запись пачки в потоке не прерывается: пачка
+        возвращается в очередь, только если эта запись не удалась.
+
+        Returns:
+            int: Количество записанных строк
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        written_before = self.written
+        async with self._flush_lock:
+            try:
+                while self._queue:
+                    rows = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                    started = time.perf_counter()
+                    write = asyncio.ensure_future(self._run(self.db_manager.log_commands, rows))
+                    try:
+                        await asyncio.shield(write)
+                    except asyncio.CancelledError:
+                        if write.done():
+                            self._settle(write, rows)
+                        else:
+                            # Поток еще пишет пачку: учитываем ее, когда он закончит
+                            write.add_done_callback(lambda done, rows=rows: self._settle_detached(done, rows))
+                        raise
+                    except Exception:
+                        # Ошибка записи разбирается в _settle
+                        pass
+                    self.flush_time += time.perf_counter() - started
+
+                    if not self._settle(write, rows):
+                        break
+            finally:
+                # Записанные пачки убираются из файла подстраховки и при отмене
+                if self.written != written_before and self.spill_path:
+                    self._rewrite_spill()
+        return self.written - written_before
+
+    async def run(self):
+        """
+        Фоновая запись очереди
+        Вызывается из main.py через asyncio.gather
+        """
+        self._wake = asyncio.Event()
+        self.running = True
+        logger.info(f"📝 Журнал команд: пачки по {self.batch_size} строк, не реже раза в {self.flush_interval:.1f}с")
+
+        try:
+            while self.running:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                await self.flush()
+        finally:
+            self.running = False
+
+    async def stop(self):
+        """Остановить фоновую запись и записать остаток очереди"""
+        self.running = False
+        if self._wake is not None:
+            self._wake.set()
+
+        await self.flush()
+        if self._queue:
+            logger.warning(f"⚠️ Журнал команд: не записано {len(self._queue)} строк"
+                           + (f" (сохранены в {self.spill_path})" if self.spill_path else ""))
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Метрики очереди
+
+        Returns:
+            Dict: queued, max_queued, written, batches, failures, dropped,
+            avg_flush_ms
+        """
+        return {
+            'queued': len(self._queue),
+            'max_queued': self.max_queued,
+            'written': self.written,
+            'batches': self.batches,
+            'failures': self.failures,
+            'dropped': self.dropped,
+            'avg_flush_ms': (self.flush_time / (self.batches + self.failures) * 1000)
+            if (self.batches + self.failures) else 0.0
+        }
@@ -29,6 +29,12 @@ class Config:
     # Настройки бота
     ADMIN_IDS = [int(id.strip()) for id in os.getenv('ADMIN_IDS', '7746862973').split(',') if id.strip()]
     SUPPORT_CONTACT = "@banana_pwr"
+    
+    # Чаты для рассылки сигналов AI Core (через запятую, пусто - рассылка выключена)
+    SIGNAL_CHAT_IDS = [int(id.strip()) for id in os.getenv('SIGNAL_CHAT_IDS', '').split(',') if id.strip()]
+    
+    # Размер очереди подписчика шины сигналов
+    SIGNAL_BUS_QUEUE_SIZE = int(os.getenv('SIGNAL_BUS_QUEUE_SIZE', '100'))
     ENABLED_COMMANDS = ['start', 'status', 'trade', 'stop']
     
     @classmethod
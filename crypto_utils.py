@@ -15,7 +15,7 @@ import logging
 from typing import Optional
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.backends import default_backend
 
 logger = logging.getLogger(__name__)
@@ -43,7 +43,7 @@ def generate_key(password: str = None, salt: bytes = None) -> bytes:
         salt = b'pocket-option-ssid-salt-v1'
     
     # Используем PBKDF2 для генерации ключа
-    kdf = PBKDF2(
+    kdf = PBKDF2HMAC(
         algorithm=hashes.SHA256(),
         length=32,
         salt=salt,
@@ -9,16 +9,33 @@ db_manager.py - Менеджер базы данных (Supabase)
 - Хранение и получение торговых сигналов
 - Статистика и аналитика
 - Управление подписками
+- Кэш пользователей (TTL + LRU) перед get_user/get_or_create_user:
+  обновления пользователя меняют запись в кэше на месте
+- Журнал команд в AsyncDatabaseManager пишется пачками в фоне (command_log.py)
+- Статистика пользователя из сводной строки user_stats (user_stats.py),
+  которая обновляется при добавлении и закрытии его сигналов функцией БД
+  apply_user_stats (атомарно на стороне БД, без блокировок в клиенте)
+- AsyncDatabaseManager: те же методы как корутины, запросы выполняются
+  в ограниченном пуле потоков и не блокируют event loop
 """
 
 import os
+import time
+import asyncio
 import logging
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Tuple, Any, Callable
 from dotenv import load_dotenv
 
 load_dotenv()
 
+from cache_utils import TTLCache
+from command_log import CommandLogBuffer
+import user_stats
+
 # Безопасный импорт Supabase
 try:
     from supabase import create_client, Client
@@ -29,13 +46,49 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Типы подписок (тарифы ui_handlers.SUBSCRIPTION_PLANS)
+SUBSCRIPTION_TYPES = ('short', 'long', 'vip')
+
+# Первичные ключи таблиц, у которых нет колонки id (см. README, схема БД)
+TABLE_KEYS = {'users': 'user_id'}
+
 
 class DatabaseManager:
     """Менеджер базы данных через Supabase"""
     
-    def __init__(self):
-        """Инициализация подключения к Supabase"""
-        self.client: Optional[Client] = None
+    def __init__(self, client=None):
+        """
+        Инициализация подключения к Supabase
+        
+        Args:
+            client: Готовый клиент (например, LocalSupabaseClient для
+                бенчмарков и офлайн-прогонов); по умолчанию создается по env
+        """
+        self.client: Optional[Client] = client
+        
+        # Кэш строк users: одно обновление Telegram читает пользователя
+        # из БД не более одного раза (DB_USER_CACHE_TTL=0 - без кэша)
+        user_cache_ttl = float(os.getenv('DB_USER_CACHE_TTL', '60'))
+        self.user_cache: Optional[TTLCache] = TTLCache(
+            maxsize=int(os.getenv('DB_USER_CACHE_SIZE', '10000')),
+            ttl=user_cache_ttl,
+            name='users'
+        ) if user_cache_ttl > 0 else None
+        # Счетчик записей в users: чтение, начатое до записи, не кладет
+        # в кэш устаревшую строку
+        self._user_writes = 0
+        self._user_writes_lock = threading.Lock()
+        
+        # Сводная статистика пользователей (DB_USER_STATS_ROLLUP=0 - считать
+        # из истории сигналов при каждом запросе); отключается сама, если
+        # таблица user_stats недоступна для записи
+        self.user_stats_rollup = os.getenv('DB_USER_STATS_ROLLUP', '1') != '0'
+        # Максимум последних сигналов в пересчете статистики из истории
+        self.user_stats_history_limit = int(os.getenv('DB_USER_STATS_HISTORY_LIMIT', '10000'))
+        
+        if client is not None:
+            logger.info(f"✅ Используется переданный клиент БД ({type(client).__name__})")
+            return
         
         if not SUPABASE_AVAILABLE:
             logger.warning("⚠️ Supabase библиотека не установлена. Работа в режиме заглушки.")
@@ -55,6 +108,47 @@ class DatabaseManager:
             logger.error(f"❌ Ошибка инициализации Supabase: {e}")
             self.client = None
     
+    # ========================================
+    # КЭШ ПОЛЬЗОВАТЕЛЕЙ
+    # ========================================
+    
+    def _cached_user(self, user_id: int) -> Optional[Dict]:
+        """Копия строки пользователя из кэша или None"""
+        if self.user_cache is None:
+            return None
+        user = self.user_cache.get(str(user_id))
+        return dict(user) if user is not None else None
+    
+    def _cache_user(self, user: Optional[Dict], writes: int):
+        """Сохранить прочитанную строку, если после чтения не было записей"""
+        if self.user_cache is None or not user:
+            return
+        with self._user_writes_lock:
+            if writes == self._user_writes:
+                self.user_cache.set(str(user['user_id']), dict(user))
+    
+    def _user_written(self, user_id: int, updates: Optional[Dict[str, Any]] = None):
+        """
+        Отметить запись в users: обновить кэш на месте или сбросить запись
+        
+        Args:
+            user_id: ID пользователя
+            updates: Записанные поля (None - запись не удалась, сбросить)
+        """
+        if self.user_cache is None:
+            return
+        key = str(user_id)
+        with self._user_writes_lock:
+            self._user_writes += 1
+            user = self.user_cache.pop(key)
+            if user is not None and updates is not None:
+                user.update(updates)
+                self.user_cache.set(key, user)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Статистика кэша пользователей (пустой dict, если кэш выключен)"""
+        return self.user_cache.stats() if self.user_cache is not None else {}
+    
     # ========================================
     # ПОЛЬЗОВАТЕЛИ
     # ========================================
@@ -65,11 +159,17 @@ class DatabaseManager:
             logger.info(f"DB STUB: get_or_create_user({user_id})")
             return {'user_id': str(user_id), 'username': username, 'subscription_type': None}
         
+        cached = self._cached_user(user_id)
+        if cached is not None:
+            return cached
+        
         try:
             # Проверяем существование
+            writes = self._user_writes
             existing = self.client.table('users').select('*').eq('user_id', str(user_id)).execute()
             
             if existing.data:
+                self._cache_user(existing.data[0], writes)
                 return existing.data[0]
             
             # Создаем нового пользователя
@@ -91,6 +191,7 @@ class DatabaseManager:
             
             result = self.client.table('users').insert(new_user).execute()
             logger.info(f"✅ Пользователь {user_id} создан")
+            # Строка вставки без значений по умолчанию БД - в кэш не кладется
             return result.data[0] if result.data else None
         
         except Exception as e:
@@ -106,9 +207,12 @@ class DatabaseManager:
         try:
             updates['updated_at'] = datetime.now(timezone.utc).isoformat()
             self.client.table('users').update(updates).eq('user_id', str(user_id)).execute()
+            self._user_written(user_id, updates)
             logger.info(f"✅ Пользователь {user_id} обновлен")
             return True
         except Exception as e:
+            # Неизвестно, применилось ли обновление - кэш сбрасывается
+            self._user_written(user_id)
             logger.error(f"❌ Ошибка update_user: {e}")
             return False
     
@@ -118,9 +222,16 @@ class DatabaseManager:
             logger.info(f"DB STUB: get_user({user_id})")
             return None
         
+        cached = self._cached_user(user_id)
+        if cached is not None:
+            return cached
+        
         try:
+            writes = self._user_writes
             response = self.client.table('users').select('*').eq('user_id', str(user_id)).execute()
-            return response.data[0] if response.data else None
+            user = response.data[0] if response.data else None
+            self._cache_user(user, writes)
+            return user
         except Exception as e:
             logger.error(f"❌ Ошибка get_user: {e}")
             return None
@@ -216,10 +327,20 @@ class DatabaseManager:
             signal_data['created_at'] = datetime.now(timezone.utc).isoformat()
             self.client.table('signals').insert(signal_data).execute()
             logger.info(f"✅ Сигнал {signal_data.get('asset')} добавлен")
-            return True
         except Exception as e:
             logger.error(f"❌ Ошибка add_signal: {e}")
             return False
+        
+        user_id = signal_data.get('user_id')
+        if user_id and self.user_stats_rollup:
+            delta = user_stats.new_delta(user_id)
+            asset = user_stats.signal_asset(signal_data)
+            user_stats.add_signal(delta, asset)
+            # Сигнал может быть записан уже закрытым (импорт истории)
+            if signal_data.get('result'):
+                user_stats.apply_result(delta, asset, signal_data['result'], signal_data.get('profit_loss'))
+            self._apply_user_stats([delta])
+        return True
     
     def get_user_signals(self, user_id: int, limit: int = 50) -> List[Dict]:
         """Получить сигналы пользователя"""
@@ -243,26 +364,144 @@ class DatabaseManager:
         if not self.client:
             return True
         
+        def write() -> Dict[str, bool]:
+            try:
+                updates = {
+                    'result': result,
+                    'close_date': datetime.now(timezone.utc).isoformat()
+                }
+                if profit_loss is not None:
+                    updates['profit_loss'] = profit_loss
+                
+                self.client.table('signals').update(updates).eq('id', signal_id).execute()
+                return {result: True}
+            except Exception as e:
+                logger.error(f"❌ Ошибка update_signal_result: {e}")
+                return {result: False}
+        
+        outcomes = {result: ([signal_id], profit_loss)}
+        return self._write_signal_results(outcomes, write, [signal_id])[result]
+    
+    def get_open_signals(self, before: datetime, limit: int = 5000, after_id: int = None,
+                         columns: str = 'id, user_id, symbol, signal_type, entry_price, timeframe, created_at') -> List[Dict]:
+        """
+        Получить незакрытые сигналы (result не заполнен), созданные до before
+        
+        Страница по курсору id: следующий вызов с after_id = id последней
+        строки продолжает с места остановки, поэтому старые сигналы, которые
+        пока нельзя закрыть, не занимают каждую выборку.
+        
+        Args:
+            before: Верхняя граница created_at
+            limit: Максимальное количество сигналов
+            after_id: Читать сигналы с id больше этого (None - с начала)
+            columns: Читаемые колонки
+        
+        Returns:
+            List[Dict]: Сигналы по возрастанию id (от старых к новым)
+        """
+        if not self.client:
+            return []
+        
         try:
-            updates = {
-                'result': result,
-                'close_date': datetime.now(timezone.utc).isoformat()
-            }
-            if profit_loss is not None:
-                updates['profit_loss'] = profit_loss
-            
-            self.client.table('signals').update(updates).eq('id', signal_id).execute()
-            return True
+            query = self.client.table('signals') \
+                .select(columns) \
+                .is_('result', 'null') \
+                .lte('created_at', before.isoformat())
+            if after_id is not None:
+                query = query.gt('id', after_id)
+            response = query.order('id').limit(limit).execute()
+            return response.data or []
         except Exception as e:
-            logger.error(f"❌ Ошибка update_signal_result: {e}")
-            return False
+            logger.error(f"❌ Ошибка get_open_signals: {e}")
+            return []
+    
+    def update_signal_results(self, signal_ids: List[int], result: str, profit_loss: float = None,
+                              close_date: str = None, chunk_size: int = 500,
+                              signals: List[Dict[str, Any]] = None) -> bool:
+        """
+        Записать одинаковый результат группе сигналов
+        
+        Один запрос UPDATE ... WHERE id IN (...) на chunk_size сигналов
+        вместо запроса на каждую строку.
+        
+        Args:
+            signal_ids: ID сигналов
+            result: Результат ('win', 'loss', 'draw', 'skipped')
+            profit_loss: P&L (одинаковый для группы)
+            close_date: Время закрытия (по умолчанию сейчас)
+            chunk_size: Максимум ID в одном запросе
+            signals: Строки этих сигналов с колонкой user_id (см. update_signal_outcomes)
+        
+        Returns:
+            bool: Успешность операции
+        """
+        return self.update_signal_outcomes(
+            {result: (signal_ids, profit_loss)}, close_date=close_date, chunk_size=chunk_size, signals=signals
+        )[result]
+    
+    def update_signal_outcomes(self, outcomes: Dict[str, Tuple[List[int], Optional[float]]],
+                               close_date: str = None, chunk_size: int = 500,
+                               signals: List[Dict[str, Any]] = None) -> Dict[str, bool]:
+        """
+        Записать результаты нескольких групп сигналов (по группе на результат)
+        
+        Каждая группа - UPDATE ... WHERE id IN (...) на chunk_size сигналов.
+        Сигналы пользователей учитываются в user_stats одним вызовом
+        apply_user_stats в порядке создания, поэтому серии не зависят
+        от порядка групп.
+        
+        Args:
+            outcomes: {результат: (ID сигналов, P&L или None)}
+            close_date: Время закрытия (по умолчанию сейчас)
+            chunk_size: Максимум ID в одном запросе
+            signals: Строки этих сигналов с колонкой user_id (например, из
+                get_open_signals); для user_stats перечитываются только
+                сигналы пользователей. По умолчанию перечитываются все
+        
+        Returns:
+            Dict: {результат: успешность записи}
+        """
+        if not self.client:
+            return {result: True for result in outcomes}
+        
+        close_date = close_date or datetime.now(timezone.utc).isoformat()
+        
+        def write() -> Dict[str, bool]:
+            written = {}
+            for result, (signal_ids, profit_loss) in outcomes.items():
+                updates = {'result': result, 'close_date': close_date}
+                if profit_loss is not None:
+                    updates['profit_loss'] = profit_loss
+                
+                try:
+                    for start in range(0, len(signal_ids), chunk_size):
+                        self.client.table('signals') \
+                            .update(updates) \
+                            .in_('id', signal_ids[start:start + chunk_size]) \
+                            .execute()
+                    written[result] = True
+                except Exception as e:
+                    logger.error(f"❌ Ошибка update_signal_results ({result}): {e}")
+                    written[result] = False
+            return written
+        
+        if signals is not None:
+            user_signal_ids = [signal['id'] for signal in signals if signal.get('user_id')]
+        else:
+            user_signal_ids = [signal_id for signal_ids, _ in outcomes.values() for signal_id in signal_ids]
+        return self._write_signal_results(outcomes, write, user_signal_ids, chunk_size)
     
-    def get_external_signals(self, limit: int = 100) -> List[Dict]:
+    def get_external_signals(self, limit: int = 100, after_id: int = None,
+                             columns: str = 'id, symbol, signal_type, created_at') -> List[Dict]:
         """
         Получить внешние сигналы из парсера для анализа AI Core
         
         Args:
             limit: Максимальное количество сигналов
+            after_id: Курсор - только сигналы с id больше указанного
+                (по возрастанию id); без курсора - самые новые
+            columns: Читаемые колонки
         
         Returns:
             List[Dict]: Список внешних сигналов
@@ -273,16 +512,48 @@ class DatabaseManager:
         
         try:
             # Получаем сигналы с источником 'parser' или 'external'
+            query = self.client.table('signals') \
+                .select(columns) \
+                .in_('source', ['parser', 'external', 'telegram'])
+            
+            if after_id is not None:
+                query = query.gt('id', after_id).order('id')
+            else:
+                query = query.order('created_at', desc=True)
+            
+            response = query.limit(limit).execute()
+            return response.data or []
+        except Exception as e:
+            logger.error(f"❌ Ошибка get_external_signals: {e}")
+            return []
+    
+    def get_recent_signals(self, since: datetime, source: str = 'ai_core', limit: int = 1000) -> List[Dict]:
+        """
+        Получить сигналы, созданные начиная с since
+        
+        Args:
+            since: Нижняя граница created_at
+            source: Источник сигналов
+            limit: Максимальное количество сигналов
+        
+        Returns:
+            List[Dict]: Сигналы от новых к старым
+        """
+        if not self.client:
+            return []
+        
+        try:
             response = self.client.table('signals') \
                 .select('*') \
-                .in_('source', ['parser', 'external', 'telegram']) \
+                .eq('source', source) \
+                .gte('created_at', since.isoformat()) \
                 .order('created_at', desc=True) \
                 .limit(limit) \
                 .execute()
             
             return response.data or []
         except Exception as e:
-            logger.error(f"❌ Ошибка get_external_signals: {e}")
+            logger.error(f"❌ Ошибка get_recent_signals: {e}")
             return []
     
     def mark_signal_as_processed(self, signal_id: int) -> bool:
@@ -315,72 +586,456 @@ class DatabaseManager:
     # ========================================
     
     def get_user_stats(self, user_id: int) -> Dict[str, Any]:
-        """Получить статистику пользователя"""
-        signals = self.get_user_signals(user_id, limit=1000)
+        """
+        Получить статистику пользователя
         
-        if not signals:
-            return {
-                'total_signals': 0,
-                'wins': 0,
-                'losses': 0,
-                'win_rate': 0.0,
-                'total_profit': 0.0
-            }
+        Читается одна строка user_stats, размер ответа не зависит от длины
+        истории. Строка, которой еще нет, один раз пересчитывается из
+        сигналов пользователя (не больше DB_USER_STATS_HISTORY_LIMIT
+        последних; неполный пересчет не сохраняется).
         
-        wins = sum(1 for s in signals if s.get('result') == 'win')
-        losses = sum(1 for s in signals if s.get('result') == 'loss')
-        total_profit = sum(s.get('profit_loss', 0) for s in signals)
+        Returns:
+            Dict: total_signals, wins, losses, draws, win_rate, total_profit,
+            current_streak, best_win_streak, worst_loss_streak, by_asset
+            (см. user_stats.summarize)
+        """
+        if not self.client:
+            return user_stats.summarize(user_stats.empty_rollup(user_id))
         
-        return {
-            'total_signals': len(signals),
-            'wins': wins,
-            'losses': losses,
-            'win_rate': (wins / len(signals) * 100) if signals else 0.0,
-            'total_profit': total_profit
-        }
+        row = None
+        if self.user_stats_rollup:
+            try:
+                response = self.client.table(user_stats.USER_STATS_TABLE) \
+                    .select('*') \
+                    .eq('user_id', str(user_id)) \
+                    .limit(1) \
+                    .execute()
+                row = response.data[0] if response.data else {}
+            except Exception as e:
+                logger.error(f"❌ Ошибка чтения user_stats ({e}) - пересчет из истории сигналов")
+        
+        if row:
+            return user_stats.summarize(user_stats.decode_rollup(row))
+        
+        try:
+            history = self._user_signal_history(user_id, self.user_stats_history_limit)
+            rollup = user_stats.build_rollup(user_id, history)
+        except Exception as e:
+            logger.error(f"❌ Ошибка get_user_stats: {e}")
+            return user_stats.summarize(user_stats.empty_rollup(user_id))
+        
+        complete = len(history) < self.user_stats_history_limit
+        if not complete:
+            logger.warning(f"⚠️ Статистика пользователя {user_id} посчитана по последним "
+                           f"{self.user_stats_history_limit} сигналам")
+        
+        # Строки еще нет (row == {}): сохраняем полный пересчет для следующих чтений
+        if row is not None and complete:
+            self._create_user_rollup(rollup)
+        return user_stats.summarize(rollup)
+    
+    def _count(self, table: str, *filters) -> int:
+        """
+        COUNT(*) строк таблицы без загрузки самих строк
+        
+        Args:
+            table: Таблица
+            *filters: (метод, колонка, значение), например ('eq', 'user_id', '1')
+        
+        Returns:
+            int: Количество строк
+        """
+        query = self.client.table(table).select(TABLE_KEYS.get(table, 'id'), count='exact')
+        for method, column, value in filters:
+            query = getattr(query, method)(column, value)
+        return query.limit(1).execute().count or 0
     
     def get_global_stats(self) -> Dict[str, Any]:
-        """Получить глобальную статистику"""
+        """
+        Получить глобальную статистику
+        
+        Считается запросами COUNT на стороне БД: число обращений
+        не зависит от количества пользователей и сигналов.
+        
+        Returns:
+            Dict: total_users, active_subscriptions, subscriptions_by_type,
+            auto_trading_users, total_signals
+        """
         if not self.client:
             return {
                 'total_users': 0,
                 'active_subscriptions': 0,
+                'subscriptions_by_type': {},
+                'auto_trading_users': 0,
                 'total_signals': 0
             }
         
         try:
-            users = self.get_all_users()
-            active_subs = sum(1 for u in users if self.check_subscription(int(u.get('user_id', 0))))
-            
-            signals_response = self.client.table('signals').select('*', count='exact').execute()
-            total_signals = signals_response.count if hasattr(signals_response, 'count') else 0
+            # Подписка активна, пока subscription_end в будущем (как в check_subscription)
+            active = ('gt', 'subscription_end', datetime.now(timezone.utc).isoformat())
             
             return {
-                'total_users': len(users),
-                'active_subscriptions': active_subs,
-                'total_signals': total_signals
+                'total_users': self._count('users'),
+                'active_subscriptions': self._count('users', active),
+                'subscriptions_by_type': {
+                    subscription_type: self._count('users', active, ('eq', 'subscription_type', subscription_type))
+                    for subscription_type in SUBSCRIPTION_TYPES
+                },
+                'auto_trading_users': self._count('users', ('eq', 'auto_trading_enabled', True)),
+                'total_signals': self._count('signals')
             }
         except Exception as e:
             logger.error(f"❌ Ошибка get_global_stats: {e}")
             return {'error': str(e)}
     
+    # ========================================
+    # СВОДНАЯ СТАТИСТИКА ПОЛЬЗОВАТЕЛЕЙ (user_stats)
+    # ========================================
+    
+    def _user_signal_history(self, user_id, limit: int, page_size: int = 1000) -> List[Dict]:
+        """Последние limit сигналов пользователя от старых к новым (постранично)"""
+        signals = []
+        while len(signals) < limit:
+            size = min(page_size, limit - len(signals))
+            page = self.client.table('signals') \
+                .select('*') \
+                .eq('user_id', str(user_id)) \
+                .order('created_at', desc=True) \
+                .range(len(signals), len(signals) + size - 1) \
+                .execute().data or []
+            signals.extend(page)
+            if len(page) < size:
+                break
+        signals.reverse()
+        return signals
+    
+    def _create_user_rollup(self, rollup: Dict[str, Any]):
+        """
+        Сохранить пересчитанную строку, если ее еще нет
+        
+        Существующая строка (ее мог создать параллельный запрос) не
+        перезаписывается. Запись, пришедшая во время пересчета истории,
+        может быть учтена в новой строке неточно - один раз на пользователя,
+        при первом чтении его статистики.
+        """
+        try:
+            self.client.table(user_stats.USER_STATS_TABLE) \
+                .upsert(user_stats.encode_rollup(rollup), on_conflict='user_id', ignore_duplicates=True) \
+                .execute()
+            logger.info(f"♻️ user_stats пересчитана из истории для пользователя {rollup['user_id']}")
+        except Exception as e:
+            self._disable_user_stats(e)
+    
+    def _apply_user_stats(self, deltas: List[Dict[str, Any]]):
+        """
+        Применить приращения строк user_stats функцией БД apply_user_stats
+        
+        Одно обращение без блокировок в клиенте: строка меняется атомарно
+        внутри БД. Ошибка не отменяет запись сигналов: строки затронутых
+        пользователей (уже без этих приращений) удаляются, а сводная
+        статистика отключается - иначе при отсутствующей или сбоящей
+        функции каждая запись удаляла бы строку и каждое чтение заново
+        пересчитывало бы ее из истории.
+        """
+        try:
+            self.client.rpc(user_stats.APPLY_FUNCTION, {'deltas': deltas}).execute()
+        except Exception as e:
+            try:
+                self.client.table(user_stats.USER_STATS_TABLE) \
+                    .delete() \
+                    .in_('user_id', [delta['user_id'] for delta in deltas]) \
+                    .execute()
+            except Exception as delete_error:
+                logger.error(f"❌ Ошибка удаления строк user_stats: {delete_error}")
+            self._disable_user_stats(e)
+    
+    def _disable_user_stats(self, error: Exception):
+        """Таблица user_stats или функция apply_user_stats недоступны: статистика считается из истории сигналов"""
+        if self.user_stats_rollup:
+            self.user_stats_rollup = False
+            logger.error(f"❌ Сводная статистика user_stats недоступна ({error}) - статистика считается из истории "
+                         f"сигналов до перезапуска; после восстановления таблицу нужно очистить")
+    
+    def _write_signal_results(self, outcomes: Dict[str, Tuple[List[int], Optional[float]]],
+                              write: Callable[[], Dict[str, bool]], user_signal_ids: List[int],
+                              chunk_size: int = 500) -> Dict[str, bool]:
+        """
+        Записать результаты сигналов (write) и учесть их в user_stats
+        
+        Args:
+            outcomes: {результат: (ID сигналов, P&L или None)}
+            write: Запись результатов в signals, возвращает {результат: успешность}
+            user_signal_ids: ID сигналов, которые могут принадлежать пользователям
+                (перечитываются до записи, чтобы знать владельца и прежний результат)
+            chunk_size: Максимум ID в одном запросе
+        
+        Returns:
+            Dict: {результат: успешность записи}
+        """
+        if not user_signal_ids or not self.user_stats_rollup:
+            return write()
+        
+        try:
+            rows = []
+            for start in range(0, len(user_signal_ids), chunk_size):
+                rows.extend(self.client.table('signals')
+                            .select('*')
+                            .in_('id', user_signal_ids[start:start + chunk_size])
+                            .execute().data or [])
+        except Exception as e:
+            logger.error(f"❌ Ошибка чтения сигналов для user_stats: {e}")
+            return write()
+        
+        written = write()
+        outcome_of = {
+            signal_id: (result, profit_loss)
+            for result, (signal_ids, profit_loss) in outcomes.items() if written.get(result)
+            for signal_id in signal_ids
+        }
+        
+        # Серии считаются в порядке создания сигналов
+        deltas: Dict[str, Dict[str, Any]] = {}
+        for row in sorted(rows, key=lambda row: row.get('created_at') or ''):
+            if not row.get('user_id') or row.get('id') not in outcome_of:
+                continue
+            result, profit_loss = outcome_of[row['id']]
+            key = str(row['user_id'])
+            user_stats.apply_result(
+                deltas.setdefault(key, user_stats.new_delta(key)),
+                user_stats.signal_asset(row),
+                result,
+                profit_loss if profit_loss is not None else row.get('profit_loss'),
+                previous=row.get('result'),
+                previous_profit=row.get('profit_loss')
+            )
+        
+        if deltas:
+            self._apply_user_stats(list(deltas.values()))
+        return written
+    
     # ========================================
     # КОМАНДЫ
     # ========================================
     
+    def get_bot_setting(self, key: str) -> Optional[str]:
+        """Получить значение настройки из bot_settings"""
+        if not self.client:
+            return None
+        
+        try:
+            response = self.client.table('bot_settings') \
+                .select('value') \
+                .eq('key', key) \
+                .limit(1) \
+                .execute()
+            return response.data[0].get('value') if response.data else None
+        except Exception as e:
+            logger.error(f"❌ Ошибка get_bot_setting: {e}")
+            return None
+    
+    def set_bot_setting(self, key: str, value: str, description: str = None) -> bool:
+        """Сохранить настройку в bot_settings (insert или update по key)"""
+        if not self.client:
+            return True
+        
+        try:
+            row = {
+                'key': key,
+                'value': value,
+                'updated_at': datetime.now(timezone.utc).isoformat()
+            }
+            if description:
+                row['description'] = description
+            
+            self.client.table('bot_settings').upsert(row, on_conflict='key').execute()
+            return True
+        except Exception as e:
+            logger.error(f"❌ Ошибка set_bot_setting: {e}")
+            return False
+    
+    @staticmethod
+    def command_row(user_id: int, command: str, data: Dict = None) -> Dict[str, Any]:
+        """Строка таблицы commands (время - момент вызова)"""
+        return {
+            'user_id': str(user_id),
+            'command': command,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'data': data or {}
+        }
+    
     def log_command(self, user_id: int, command: str, data: Dict = None) -> bool:
         """Логировать выполненную команду"""
         if not self.client:
             return True
         
         try:
-            self.client.table('commands').insert({
-                'user_id': str(user_id),
-                'command': command,
-                'timestamp': datetime.now(timezone.utc).isoformat(),
-                'data': data or {}
-            }).execute()
+            self.client.table('commands').insert(self.command_row(user_id, command, data)).execute()
             return True
         except Exception as e:
             logger.error(f"❌ Ошибка log_command: {e}")
             return False
+    
+    def log_commands(self, rows: List[Dict[str, Any]]) -> bool:
+        """Записать пачку строк журнала команд одним INSERT"""
+        if not self.client or not rows:
+            return True
+        
+        try:
+            self.client.table('commands').insert(rows).execute()
+            return True
+        except Exception as e:
+            logger.error(f"❌ Ошибка log_commands ({len(rows)} строк): {e}")
+            return False
+
+
+# ========================================
+# АСИНХРОННЫЙ ИНТЕРФЕЙС
+# ========================================
+
+# Методы DatabaseManager, доступные в AsyncDatabaseManager как корутины
+ASYNC_METHODS = (
+    'get_or_create_user', 'update_user', 'get_user', 'get_all_users',
+    'get_users_with_auto_trading', 'check_subscription', 'add_subscription',
+    'add_signal', 'get_user_signals', 'update_signal_result', 'get_open_signals',
+    'update_signal_results', 'update_signal_outcomes', 'get_external_signals', 'get_recent_signals',
+    'mark_signal_as_processed', 'get_user_stats', 'get_global_stats',
+    'get_bot_setting', 'set_bot_setting', 'log_command', 'log_commands'
+)
+
+
+class AsyncDatabaseManager:
+    """
+    Неблокирующий DatabaseManager для async-кода
+
+    Каждый метод из ASYNC_METHODS - корутина с той же сигнатурой, что
+    у DatabaseManager. Синхронный HTTP-запрос Supabase выполняется в пуле
+    из DB_MAX_WORKERS потоков, поэтому медленный запрос одного пользователя
+    не останавливает остальных. Синхронный менеджер доступен как .sync
+    (скрипты, фоновые потоки).
+    
+    Пока запущен command_log.run(), log_command только ставит строку
+    в очередь, и она записывается в БД пачкой.
+    """
+
+    def __init__(self, db_manager: DatabaseManager = None, max_workers: int = None,
+                 max_pending: int = None):
+        """
+        Args:
+            db_manager: Синхронный менеджер (по умолчанию создается по env)
+            max_workers: Потоков для запросов (DB_MAX_WORKERS, по умолчанию 8)
+            max_pending: Максимум запросов в работе и в очереди
+                (DB_MAX_PENDING, по умолчанию 256); остальные ждут в event loop
+        """
+        self.sync = db_manager if db_manager is not None else DatabaseManager()
+        self.max_workers = max_workers or int(os.getenv('DB_MAX_WORKERS', '8'))
+        self.max_pending = max_pending or int(os.getenv('DB_MAX_PENDING', '256'))
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='db')
+        self._pending: Optional[asyncio.Semaphore] = None
+        self.command_log = CommandLogBuffer(self.sync, run=self.run)
+
+        self.calls = 0
+        self.errors = 0
+        self.inflight = 0
+        self.max_inflight = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+        logger.info(f"✅ AsyncDatabaseManager: пул {self.max_workers} потоков")
+
+    @property
+    def client(self):
+        return self.sync.client
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Выполнить синхронную функцию работы с БД в пуле
+
+        Для операций вне ASYNC_METHODS (например, трекеры, которые сами
+        обращаются к DatabaseManager).
+        """
+        if self._pending is None:
+            self._pending = asyncio.Semaphore(self.max_pending)
+
+        async with self._pending:
+            self.inflight += 1
+            self.max_inflight = max(self.max_inflight, self.inflight)
+            started = time.perf_counter()
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                self.inflight -= 1
+                self.calls += 1
+                self.total_time += elapsed
+                self.max_time = max(self.max_time, elapsed)
+
+    async def log_command(self, user_id: int, command: str, data: Dict = None) -> bool:
+        """Логировать команду: в очередь command_log или сразу в БД, если очередь не запущена"""
+        if self.command_log.running:
+            self.command_log.add(self.sync.command_row(user_id, command, data))
+            return True
+        return await self.run(self.sync.log_command, user_id, command, data)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Статистика запросов
+
+        Returns:
+            Dict: calls, errors, inflight, max_inflight, avg_ms, max_ms, workers,
+            user_cache (статистика кэша пользователей), command_log (очередь журнала)
+        """
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'inflight': self.inflight,
+            'max_inflight': self.max_inflight,
+            'avg_ms': (self.total_time / self.calls * 1000) if self.calls else 0.0,
+            'max_ms': self.max_time * 1000,
+            'workers': self.max_workers,
+            'user_cache': self.sync.cache_stats(),
+            'command_log': self.command_log.stats()
+        }
+
+    def close(self):
+        """Дождаться запросов в работе и остановить пул"""
+        self._executor.shutdown(wait=True)
+        logger.info(f"🛑 AsyncDatabaseManager остановлен ({self.calls} запросов)")
+
+
+def _async_method(name: str):
+    """Корутина, выполняющая DatabaseManager.<name> в пуле"""
+    method = getattr(DatabaseManager, name)
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        return await self.run(getattr(self.sync, name), *args, **kwargs)
+
+    return wrapper
+
+
+for _name in ASYNC_METHODS:
+    # Методы с собственной реализацией (log_command) не перезаписываются
+    if _name not in AsyncDatabaseManager.__dict__:
+        setattr(AsyncDatabaseManager, _name, _async_method(_name))
+
+
+def as_async(db_manager) -> Optional[AsyncDatabaseManager]:
+    """
+    Асинхронный менеджер для db_manager
+
+    Для синхронного DatabaseManager создается (один раз на экземпляр)
+    AsyncDatabaseManager; AsyncDatabaseManager и None возвращаются как есть.
+    """
+    if db_manager is None or isinstance(db_manager, AsyncDatabaseManager):
+        return db_manager
+
+    async_manager = getattr(db_manager, '_async_manager', None)
+    if async_manager is None:
+        async_manager = AsyncDatabaseManager(db_manager)
+        db_manager._async_manager = async_manager
+    return async_manager
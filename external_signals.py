@@ -0,0 +1,176 @@
+"""
+external_signals.py - Инкрементальный учет внешних сигналов
+Версия: 1.0
+Дата: 2026-10-18
+
+Обеспечивает:
+- Курсор по внешним сигналам (parser/external/telegram): из БД читаются
+  только строки новее последнего обработанного id
+- Накопительные агрегаты по активам и направлениям в памяти
+  (стоимость цикла зависит от числа новых сигналов, а не от окна)
+- Периодическое сохранение курсора и агрегатов в bot_settings и
+  восстановление при старте
+"""
+
+import json
+import time
+import logging
+from typing import Optional, Dict, List, Any
+
+logger = logging.getLogger(__name__)
+
+# Ключ состояния в bot_settings
+CURSOR_SETTING_KEY = 'external_signals_cursor'
+
+
+class ExternalSignalTracker:
+    """Курсор и накопительные агрегаты внешних сигналов"""
+
+    def __init__(self, db_manager=None, page_size: int = 500, persist_interval: float = 300):
+        """
+        Args:
+            db_manager: Экземпляр DatabaseManager
+            page_size: Сколько строк читать за один запрос
+            persist_interval: Как часто сохранять состояние в БД (секунды)
+        """
+        self.db_manager = db_manager
+        self.page_size = page_size
+        self.persist_interval = persist_interval
+
+        self.last_id: Optional[int] = None
+        self.last_created_at: Optional[str] = None
+        self.total = 0
+        self.by_symbol: Dict[str, Dict[str, int]] = {}
+        self.by_type: Dict[str, int] = {'CALL': 0, 'PUT': 0}
+
+        self._dirty = False
+        self._persisted_at = time.monotonic()
+
+    # ========================================
+    # СОСТОЯНИЕ
+    # ========================================
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'last_id': self.last_id,
+            'last_created_at': self.last_created_at,
+            'total': self.total,
+            'by_symbol': self.by_symbol,
+            'by_type': self.by_type
+        }
+
+    def load(self) -> bool:
+        """
+        Восстановить курсор и агрегаты из bot_settings
+
+        Returns:
+            bool: True, если сохраненное состояние найдено
+        """
+        if not self.db_manager:
+            return False
+
+        raw = self.db_manager.get_bot_setting(CURSOR_SETTING_KEY)
+        if not raw:
+            return False
+
+        try:
+            state = json.loads(raw)
+        except (TypeError, ValueError):
+            logger.warning("⚠️ Поврежденное состояние курсора внешних сигналов - начинаем заново")
+            return False
+
+        self.last_id = state.get('last_id')
+        self.last_created_at = state.get('last_created_at')
+        self.total = int(state.get('total', 0))
+        self.by_symbol = state.get('by_symbol') or {}
+        self.by_type = {'CALL': 0, 'PUT': 0, **(state.get('by_type') or {})}
+        logger.info(f"♻️ Курсор внешних сигналов восстановлен: id {self.last_id}, всего {self.total}")
+        return True
+
+    def persist(self, force: bool = False) -> bool:
+        """
+        Сохранить состояние в bot_settings (не чаще persist_interval)
+
+        Returns:
+            bool: True, если состояние записано
+        """
+        if not self.db_manager or not self._dirty:
+            return False
+        if not force and time.monotonic() - self._persisted_at < self.persist_interval:
+            return False
+
+        saved = self.db_manager.set_bot_setting(
+            CURSOR_SETTING_KEY,
+            json.dumps(self.to_dict(), ensure_ascii=False),
+            description='Курсор и агрегаты внешних сигналов AI Core'
+        )
+        if saved:
+            self._dirty = False
+            self._persisted_at = time.monotonic()
+        return saved
+
+    # ========================================
+    # ЧТЕНИЕ И АГРЕГАЦИЯ
+    # ========================================
+
+    def fetch_new(self) -> List[Dict[str, Any]]:
+        """
+        Прочитать сигналы новее курсора (постранично, по возрастанию id)
+
+        При первом запуске без сохраненного состояния читается только
+        последняя страница, чтобы не выгружать всю историю.
+
+        Returns:
+            List[Dict]: Новые сигналы (id, symbol, signal_type, created_at)
+        """
+        if not self.db_manager:
+            return []
+
+        if self.last_id is None:
+            rows = self.db_manager.get_external_signals(limit=self.page_size)
+            return sorted(rows, key=lambda row: row.get('id') or 0)
+
+        rows = []
+        while True:
+            page = self.db_manager.get_external_signals(
+                limit=self.page_size,
+                after_id=rows[-1]['id'] if rows else self.last_id
+            )
+            rows.extend(page)
+            if len(page) < self.page_size:
+                return rows
+
+    def ingest(self, signals: List[Dict[str, Any]]) -> int:
+        """
+        Добавить новые сигналы в агрегаты и сдвинуть курсор
+
+        Returns:
+            int: Количество учтенных сигналов
+        """
+        for signal in signals:
+            symbol = signal.get('symbol') or 'UNKNOWN'
+            signal_type = signal.get('signal_type') or 'UNKNOWN'
+
+            counts = self.by_symbol.setdefault(symbol, {'CALL': 0, 'PUT': 0})
+            counts[signal_type] = counts.get(signal_type, 0) + 1
+            self.by_type[signal_type] = self.by_type.get(signal_type, 0) + 1
+
+            signal_id = signal.get('id')
+            if signal_id is not None and (self.last_id is None or signal_id > self.last_id):
+                self.last_id = signal_id
+                self.last_created_at = signal.get('created_at')
+
+        if signals:
+            self.total += len(signals)
+            self._dirty = True
+        return len(signals)
+
+    def stats(self, new: int = 0) -> Dict[str, Any]:
+        """Снимок агрегатов (new - сколько сигналов учтено в этом цикле)"""
+        return {
+            'total': self.total,
+            'new': new,
+            'by_symbol': self.by_symbol,
+            'by_type': self.by_type,
+            'last_id': self.last_id
+        }
@@ -0,0 +1,415 @@
+"""
+local_supabase.py - Локальная замена клиента Supabase на SQLite
+Версия: 1.0
+Дата: 2026-10-18
+
+Обеспечивает:
+- Подмножество построителя запросов supabase-py, которое использует
+  DatabaseManager: table/select/insert/update/upsert/delete,
+  фильтры eq/neq/in_/is_/gt/gte/lt/lte, order, limit, range, count='exact'
+- Вызов функций БД (rpc): Python-аналоги SQL-функций выполняются атомарно
+  относительно остальных запросов к клиенту
+- Таблицы без схемы: колонки добавляются при первой вставке,
+  id - автоинкрементный первичный ключ (кроме таблиц PRIMARY_KEYS: как
+  в Supabase, у users ключ user_id и колонки id нет), по user_id
+  строится индекс
+- Счетчик обращений (round trips) и искусственную задержку на запрос,
+  чтобы сравнивать N+1 и пакетные запросы как с удаленной БД
+
+Используется в бенчмарках и офлайн-прогонах:
+    db = DatabaseManager(client=LocalSupabaseClient())
+"""
+
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Optional, Dict, List, Tuple, Any
+
+logger = logging.getLogger(__name__)
+
+# Колонки, по которым индекс создается автоматически
+INDEXED_COLUMNS = ('user_id',)
+
+# Таблицы со своим первичным ключом вместо автоинкрементного id
+PRIMARY_KEYS = {'users': 'user_id'}
+
+
+class LocalResponse:
+    """Ответ в формате supabase-py (data, count)"""
+
+    def __init__(self, data: List[Dict[str, Any]], count: int = None):
+        self.data = data
+        self.count = count
+
+
+class LocalQuery:
+    """Построитель одного запроса к таблице"""
+
+    def __init__(self, client: 'LocalSupabaseClient', table: str):
+        self.client = client
+        self.table_name = table
+        self.action = 'select'
+        self.columns = '*'
+        self.count = None
+        self.payload = None
+        self.on_conflict = None
+        self.ignore_duplicates = False
+        self.filters: List[Tuple[str, str, Any]] = []
+        self.ordering: List[Tuple[str, bool]] = []
+        self.limit_value = None
+        self.offset_value = None
+
+    # Действия
+
+    def select(self, columns: str = '*', count: str = None) -> 'LocalQuery':
+        self.action = 'select'
+        self.columns = columns
+        self.count = count
+        return self
+
+    def insert(self, payload) -> 'LocalQuery':
+        self.action = 'insert'
+        self.payload = payload
+        return self
+
+    def upsert(self, payload, on_conflict: str = 'id', ignore_duplicates: bool = False) -> 'LocalQuery':
+        self.action = 'upsert'
+        self.payload = payload
+        self.on_conflict = on_conflict
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, payload: Dict[str, Any]) -> 'LocalQuery':
+        self.action = 'update'
+        self.payload = payload
+        return self
+
+    def delete(self) -> 'LocalQuery':
+        self.action = 'delete'
+        return self
+
+    # Фильтры
+
+    def _filter(self, column: str, op: str, value: Any) -> 'LocalQuery':
+        self.filters.append((column, op, value))
+        return self
+
+    def eq(self, column: str, value: Any) -> 'LocalQuery':
+        return self._filter(column, '=', value)
+
+    def neq(self, column: str, value: Any) -> 'LocalQuery':
+        return self._filter(column, '!=', value)
+
+    def gt(self, column: str, value: Any) -> 'LocalQuery':
+        return self._filter(column, '>', value)
+
+    def gte(self, column: str, value: Any) -> 'LocalQuery':
+        return self._filter(column, '>=', value)
+
+    def lt(self, column: str, value: Any) -> 'LocalQuery':
+        return self._filter(column, '<', value)
+
+    def lte(self, column: str, value: Any) -> 'LocalQuery':
+        return self._filter(column, '<=', value)
+
+    def in_(self, column: str, values: List[Any]) -> 'LocalQuery':
+        return self._filter(column, 'IN', list(values))
+
+    def is_(self, column: str, value: Any) -> 'LocalQuery':
+        return self._filter(column, 'IS', value)
+
+    # Сортировка и пагинация
+
+    def order(self, column: str, desc: bool = False) -> 'LocalQuery':
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, size: int) -> 'LocalQuery':
+        self.limit_value = size
+        return self
+
+    def range(self, start: int, end: int) -> 'LocalQuery':
+        self.offset_value = start
+        self.limit_value = end - start + 1
+        return self
+
+    def execute(self) -> LocalResponse:
+        return self.client._execute(self)
+
+
+class LocalRpc:
+    """Вызов функции БД (как client.rpc(...) в supabase-py)"""
+
+    def __init__(self, client: 'LocalSupabaseClient', name: str, params: Dict[str, Any]):
+        self.client = client
+        self.name = name
+        self.params = params
+
+    def execute(self) -> LocalResponse:
+        return self.client._call(self.name, self.params)
+
+
+def _apply_user_stats(client: 'LocalSupabaseClient', params: Dict[str, Any]) -> List[Any]:
+    """Аналог SQL-функции apply_user_stats (см. user_stats.py)"""
+    import user_stats
+
+    deltas = params.get('deltas') or []
+    rows = client.table(user_stats.USER_STATS_TABLE) \
+        .select('*') \
+        .in_('user_id', [delta['user_id'] for delta in deltas]) \
+        .execute().data
+    rollups = {row['user_id']: user_stats.decode_rollup(row) for row in rows}
+
+    for delta in deltas:
+        # Приращения пользователей без строки пропускаются, как в SQL-версии
+        if delta['user_id'] in rollups:
+            user_stats.merge_delta(rollups[delta['user_id']], delta)
+    if rollups:
+        client.table(user_stats.USER_STATS_TABLE) \
+            .upsert([user_stats.encode_rollup(rollup) for rollup in rollups.values()], on_conflict='user_id') \
+            .execute()
+    return []
+
+
+# Функции БД, доступные через rpc: имя -> (client, params) -> data
+FUNCTIONS = {
+    'apply_user_stats': _apply_user_stats
+}
+
+
+class LocalSupabaseClient:
+    """SQLite-замена supabase.Client для DatabaseManager"""
+
+    def __init__(self, db_path: str = ':memory:', latency: float = 0.0,
+                 primary_keys: Dict[str, str] = None):
+        """
+        Args:
+            db_path: Путь к SQLite (по умолчанию база в памяти)
+            latency: Искусственная задержка на каждый запрос в секундах
+                (имитация сетевого обращения к Supabase)
+            primary_keys: Первичные ключи таблиц без колонки id
+                (по умолчанию PRIMARY_KEYS)
+        """
+        self.db_path = db_path
+        self.latency = latency
+        self.primary_keys = PRIMARY_KEYS if primary_keys is None else primary_keys
+        self.requests = 0
+
+        self._lock = threading.RLock()
+        # Запросы изнутри функции rpc - часть одного обращения к БД
+        self._local = threading.local()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._columns: Dict[str, List[str]] = {}
+
+    def table(self, name: str) -> LocalQuery:
+        return LocalQuery(self, name)
+
+    def rpc(self, name: str, params: Dict[str, Any] = None) -> LocalRpc:
+        return LocalRpc(self, name, params or {})
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ========================================
+    # СХЕМА
+    # ========================================
+
+    def _ensure_table(self, table: str, columns: List[str] = ()):
+        """Создать таблицу и недостающие колонки"""
+        known = self._columns.get(table)
+        if known is None:
+            key = self.primary_keys.get(table)
+            self._conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" '
+                               + (f'("{key}" PRIMARY KEY)' if key else '(id INTEGER PRIMARY KEY AUTOINCREMENT)'))
+            known = [row[1] for row in self._conn.execute(f'PRAGMA table_info("{table}")')]
+            self._columns[table] = known
+
+        for column in columns:
+            if column not in known:
+                self._conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{column}"')
+                if column in INDEXED_COLUMNS:
+                    self._conn.execute(f'CREATE INDEX "idx_{table}_{column}" ON "{table}" ("{column}")')
+                known.append(column)
+
+    @staticmethod
+    def _encode(value: Any) -> Any:
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False)
+        return value
+
+    # ========================================
+    # ВЫПОЛНЕНИЕ
+    # ========================================
+
+    def _where(self, query: LocalQuery) -> Tuple[str, List[Any]]:
+        clauses = []
+        params = []
+        for column, op, value in query.filters:
+            if column not in self._columns[query.table_name]:
+                # Фильтр по несуществующей колонке ничего не находит
+                # (кроме IS NULL - отсутствующая колонка пуста)
+                clauses.append('1' if op == 'IS' and value in (None, 'null') else '0')
+            elif op == 'IS':
+                # is_('col', 'null') как в PostgREST
+                clauses.append(f'"{column}" IS NULL' if value in (None, 'null') else f'"{column}" IS ?')
+                if value not in (None, 'null'):
+                    params.append(self._encode(value))
+            elif op == 'IN':
+                clauses.append(f'"{column}" IN ({", ".join("?" * len(value))})' if value else '0')
+                params.extend(self._encode(v) for v in value)
+            else:
+                clauses.append(f'"{column}" {op} ?')
+                params.append(self._encode(value))
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def _call(self, name: str, params: Dict[str, Any]) -> LocalResponse:
+        """Выполнить функцию БД одним обращением под блокировкой клиента"""
+        function = FUNCTIONS.get(name)
+        if function is None:
+            raise RuntimeError(f"Функция {name} не найдена")
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            self.requests += 1
+            self._local.nested = True
+            try:
+                return LocalResponse(function(self, params))
+            finally:
+                self._local.nested = False
+
+    def _execute(self, query: LocalQuery) -> LocalResponse:
+        nested = getattr(self._local, 'nested', False)
+        if self.latency and not nested:
+            time.sleep(self.latency)
+
+        with self._lock:
+            if not nested:
+                self.requests += 1
+            table = query.table_name
+
+            if query.action in ('insert', 'upsert'):
+                rows = query.payload if isinstance(query.payload, list) else [query.payload]
+                self._ensure_table(table, sorted({key for row in rows for key in row}))
+                for row in rows:
+                    if query.ignore_duplicates and query.on_conflict in row and self._conn.execute(
+                        f'SELECT 1 FROM "{table}" WHERE "{query.on_conflict}" = ?',
+                        [self._encode(row[query.on_conflict])]
+                    ).fetchone():
+                        # Существующая строка не меняется (ON CONFLICT DO NOTHING)
+                        continue
+                    if query.action == 'upsert' and query.on_conflict in row:
+                        # Существующая строка обновляется только переданными колонками
+                        assignments = ', '.join(f'"{key}" = ?' for key in row)
+                        updated = self._conn.execute(
+                            f'UPDATE "{table}" SET {assignments} WHERE "{query.on_conflict}" = ?',
+                            [self._encode(value) for value in row.values()] + [self._encode(row[query.on_conflict])]
+                        )
+                        if updated.rowcount:
+                            continue
+                    columns = ', '.join(f'"{key}"' for key in row)
+                    self._conn.execute(
+                        f'INSERT INTO "{table}" ({columns}) VALUES ({", ".join("?" * len(row))})',
+                        [self._encode(value) for value in row.values()]
+                    )
+                self._conn.commit()
+                return LocalResponse(rows)
+
+            self._ensure_table(table, sorted(query.payload) if query.action == 'update' else ())
+            where, params = self._where(query)
+
+            if query.action == 'update':
+                assignments = ', '.join(f'"{key}" = ?' for key in query.payload)
+                values = [self._encode(value) for value in query.payload.values()]
+                self._conn.execute(f'UPDATE "{table}" SET {assignments}{where}', values + params)
+                self._conn.commit()
+                return LocalResponse([])
+
+            if query.action == 'delete':
+                self._conn.execute(f'DELETE FROM "{table}"{where}', params)
+                self._conn.commit()
+                return LocalResponse([])
+
+            count = None
+            if query.count:
+                count = self._conn.execute(f'SELECT COUNT(*) FROM "{table}"{where}', params).fetchone()[0]
+
+            if 'id' not in self._columns[table] and 'id' in (column.strip() for column in query.columns.split(',')):
+                # Остальные колонки появляются при вставке, id - нет: как в
+                # PostgREST, выбор несуществующего ключа - ошибка
+                raise RuntimeError(f'column {table}.id does not exist')
+
+            columns = '*' if query.columns.strip() == '*' else ', '.join(
+                f'"{column.strip()}"' for column in query.columns.split(',')
+                if column.strip() in self._columns[table]
+            ) or '*'
+            sql = f'SELECT {columns} FROM "{table}"{where}'
+            ordering = [
+                f'"{column}" {"DESC" if desc else "ASC"}' for column, desc in query.ordering
+                if column in self._columns[table]
+            ]
+            if ordering:
+                sql += ' ORDER BY ' + ', '.join(ordering)
+            if query.limit_value is not None or query.offset_value:
+                sql += f' LIMIT {int(query.limit_value if query.limit_value is not None else -1)}'
+                sql += f' OFFSET {int(query.offset_value or 0)}'
+
+            data = [dict(row) for row in self._conn.execute(sql, params)]
+            return LocalResponse(data, count)
+
+
+def test_global_stats(users: int = 30) -> bool:
+    """
+    Проверить DatabaseManager.get_global_stats на таблице users без колонки id
+
+    Returns:
+        bool: True если счетчики совпадают с данными
+    """
+    from datetime import datetime, timezone, timedelta
+    from db_manager import DatabaseManager
+
+    client = LocalSupabaseClient()
+    db = DatabaseManager(client=client)
+    future = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+    past = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+
+    for user_id in range(users):
+        db.get_or_create_user(user_id, username=f'user{user_id}')
+        db.update_user(user_id, {
+            'subscription_type': ('short', 'long', 'vip')[user_id % 3],
+            'subscription_end': future if user_id % 2 else past,
+            'auto_trading_enabled': user_id % 5 == 0
+        })
+
+    ok = 'id' not in client._columns['users']
+    try:
+        client.table('users').select('id', count='exact').execute()
+        ok = False
+    except RuntimeError:
+        pass
+
+    stats = db.get_global_stats()
+    active = [user_id for user_id in range(users) if user_id % 2]
+    ok &= stats.get('total_users') == users
+    ok &= stats.get('active_subscriptions') == len(active)
+    ok &= stats.get('subscriptions_by_type') == {
+        subscription_type: sum(1 for user_id in active if ('short', 'long', 'vip')[user_id % 3] == subscription_type)
+        for subscription_type in ('short', 'long', 'vip')
+    }
+    ok &= stats.get('auto_trading_users') == sum(1 for user_id in range(users) if user_id % 5 == 0)
+
+    if ok:
+        logger.info(f"✅ local_supabase: get_global_stats по users без id ({users} пользователей)")
+    else:
+        logger.error(f"❌ local_supabase: get_global_stats по users без id: {stats}")
+    return ok
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    test_global_stats()
@@ -7,7 +7,8 @@ main.py - Точка входа монолитного сервиса
 Координирует:
 - Telegram Bot UI (polling)
 - AI Core (аналитика рынка)
-- AutoTrader (торговля на основе сигналов из БД)
+- AutoTrader (торговля на основе сигналов AI Core)
+- Шину сигналов: AI Core -> запись в БД, AutoTrader, webhook, Telegram
 """
 
 import os
@@ -21,12 +22,16 @@ from telegram.ext import Application, CommandHandler, CallbackQueryHandler, Mess
 
 # Импорт модулей проекта
 from config import Config, config
-from db_manager import DatabaseManager  # Используем расширенный DatabaseManager
+from db_manager import DatabaseManager, AsyncDatabaseManager
 from ai_core import AICore
 from autotrader import AutoTrader
 from ui_handlers import UIHandlers
 from admin_manager import AdminManager
 from pocket_option_api import PocketOptionAPI
+from signal_bus import SignalBus, OVERFLOW_DROP_OLDEST
+from signal_resolver import SignalOutcomeResolver
+from analysis_executor import EventLoopLagMonitor
+from webhook_system import webhook_system
 
 # ============================================
 # НАСТРОЙКА ЛОГИРОВАНИЯ
@@ -62,31 +67,49 @@ def init_components():
     Инициализация всех компонентов системы
     
     Returns:
-        Tuple: (db_manager, pocket_api, ai_core, autotrader, ui_handlers, admin_manager)
+        Tuple: (db_manager, pocket_api, ai_core, autotrader, ui_handlers, admin_manager,
+                signal_bus, signal_resolver)
     """
     logger.info("=" * 60)
     logger.info("🚀 ИНИЦИАЛИЗАЦИЯ КОМПОНЕНТОВ")
     logger.info("=" * 60)
     
-    # 1. Database Manager (Supabase)
+    # 1. Database Manager (Supabase): async-компоненты работают через пул
+    # потоков AsyncDatabaseManager, синхронный менеджер - db_manager.sync
     logger.info("📊 Инициализация Database Manager...")
-    db_manager = DatabaseManager()
+    db_manager = AsyncDatabaseManager(DatabaseManager())
     
     # 2. Pocket Option API
     logger.info("💰 Инициализация Pocket Option API...")
     pocket_api = PocketOptionAPI()
     
-    # 3. AI Core (аналитика рынка)
+    # 3. Шина сигналов (AI Core публикует, остальные компоненты подписываются)
+    logger.info("📡 Инициализация шины сигналов...")
+    signal_bus = SignalBus(default_maxsize=config.SIGNAL_BUS_QUEUE_SIZE)
+    
+    # 3.1. AI Core (аналитика рынка)
     logger.info("🤖 Инициализация AI Core...")
-    ai_core = AICore(db_manager=db_manager)
+    ai_core = AICore(db_manager=db_manager, signal_bus=signal_bus)
+    
+    # 3.2. Закрытие сигналов по цене экспирации (цены - из свечей AI Core)
+    logger.info("🏁 Инициализация закрытия сигналов...")
+    # Закрытие пачек идет в собственном потоке резолвера (синхронный менеджер),
+    # чтобы не занимать пул запросов пользователей
+    signal_resolver = SignalOutcomeResolver(
+        db_manager.sync,
+        price_source=ai_core.get_close_series,
+        base_interval=ai_core.base_interval,
+        on_resolved=ai_core.record_signal_result,
+        clock=ai_core.market_data
+    )
     
-    # 4. AutoTrader (торговля на основе сигналов из БД)
+    # 4. AutoTrader (торговля на основе сигналов AI Core)
     logger.info("🔄 Инициализация AutoTrader...")
     autotrader = AutoTrader(db_manager=db_manager, pocket_api=pocket_api)
     
     # 5. UI Handlers (клиентский интерфейс)
     logger.info("📱 Инициализация UI Handlers...")
-    ui_handlers = UIHandlers(db_manager=db_manager, pocket_api=pocket_api)
+    ui_handlers = UIHandlers(db_manager=db_manager, pocket_api=pocket_api, ai_core=ai_core)
     
     # 6. Admin Manager (админ-панель + LLM-чат)
     logger.info("👨‍💼 Инициализация Admin Manager...")
@@ -99,7 +122,38 @@ def init_components():
     logger.info("✅ Все компоненты инициализированы")
     logger.info("=" * 60)
     
-    return db_manager, pocket_api, ai_core, autotrader, ui_handlers, admin_manager
+    return db_manager, pocket_api, ai_core, autotrader, ui_handlers, admin_manager, signal_bus, signal_resolver
+
+
+def subscribe_signal_consumers(signal_bus: SignalBus, db_manager: AsyncDatabaseManager,
+                               autotrader: AutoTrader, ui_handlers: UIHandlers, bot):
+    """
+    Подписать потребителей сигналов на шину
+    
+    Запись в БД и автоторговля не теряют сигналы (издатель ждет место
+    в очереди); webhook и уведомления при отставании пропускают самые
+    старые сигналы. Запись в БД подтверждает доставку: AI Core учитывает
+    сигнал в cooldown, только если он сохранен. Автоторговля и рассылка
+    не подтверждают - повтор сигнала после их ошибки повторил бы сделки.
+    
+    Args:
+        signal_bus: Шина сигналов
+        db_manager: Экземпляр AsyncDatabaseManager
+        autotrader: Экземпляр AutoTrader
+        ui_handlers: Экземпляр UIHandlers
+        bot: telegram.Bot для уведомлений
+    """
+    async def store_signal(signal):
+        return await db_manager.add_signal(signal)
+    
+    async def notify_signal(signal):
+        await ui_handlers.notify_signal(bot, config.SIGNAL_CHAT_IDS, signal)
+    
+    signal_bus.subscribe('autotrader', autotrader.execute_signal_for_users)
+    signal_bus.subscribe('database', store_signal, confirm=True)
+    signal_bus.subscribe('webhook', webhook_system.send_ai_signal, overflow=OVERFLOW_DROP_OLDEST)
+    if config.SIGNAL_CHAT_IDS:
+        signal_bus.subscribe('telegram', notify_signal, overflow=OVERFLOW_DROP_OLDEST)
 
 
 # ============================================
@@ -197,10 +251,13 @@ def register_handlers(app: Application, ui_handlers: UIHandlers, admin_manager:
 async def main_async():
     """
     Главная асинхронная функция
-    Запускает три параллельных потока:
+    Запускает параллельные потоки:
     1. Telegram Bot UI (polling)
     2. AI Core (аналитика рынка)
-    3. AutoTrader (торговля на основе сигналов из БД)
+    3. AutoTrader (торговля на основе сигналов AI Core)
+    4. Закрытие сигналов по цене экспирации
+    
+    Сигналы AI Core доставляются подписчикам через шину сигналов
     """
     logger.info("=" * 60)
     logger.info("🚀 ЗАПУСК МОНОЛИТНОГО СЕРВИСА")
@@ -217,7 +274,8 @@ async def main_async():
         sys.exit(1)
     
     # Инициализация компонентов
-    db_manager, pocket_api, ai_core, autotrader, ui_handlers, admin_manager = init_components()
+    (db_manager, pocket_api, ai_core, autotrader, ui_handlers, admin_manager,
+     signal_bus, signal_resolver) = init_components()
     
     # Создание Telegram Application
     logger.info("📱 Создание Telegram Application...")
@@ -226,6 +284,10 @@ async def main_async():
     # Регистрация хэндлеров
     register_handlers(app, ui_handlers, admin_manager)
     
+    # Подписчики шины сигналов
+    subscribe_signal_consumers(signal_bus, db_manager, autotrader, ui_handlers, app.bot)
+    await signal_bus.start()
+    
     # ========================================
     # ЗАПУСК ПАРАЛЛЕЛЬНЫХ ПОТОКОВ
     # ========================================
@@ -235,7 +297,7 @@ async def main_async():
     logger.info("=" * 60)
     
     try:
-        # Запускаем три потока параллельно через asyncio.gather
+        # Запускаем потоки параллельно через asyncio.gather
         await asyncio.gather(
             # Поток 1: Telegram Bot UI (polling)
             app.run_polling(
@@ -246,9 +308,18 @@ async def main_async():
             # Поток 2: AI Core (аналитика рынка)
             ai_core.run_analysis_cycle(),
             
-            # Поток 3: AutoTrader (торговля на основе сигналов из БД)
+            # Поток 3: AutoTrader (сделки открываются подписчиком шины сигналов)
             autotrader.run_autotrade_cycle(),
             
+            # Поток 4: закрытие сигналов по цене экспирации
+            signal_resolver.run(),
+            
+            # Поток 5: замер задержки event loop
+            EventLoopLagMonitor().run(),
+            
+            # Поток 6: пакетная запись журнала команд
+            db_manager.command_log.run(),
+            
             return_exceptions=True
         )
     
@@ -260,6 +331,12 @@ async def main_async():
     
     finally:
         logger.info("🛑 Остановка сервиса...")
+        await signal_bus.stop()
+        await webhook_system.close()
+        if ai_core.analysis_executor:
+            ai_core.analysis_executor.shutdown()
+        await db_manager.command_log.stop()
+        db_manager.close()
         logger.info("=" * 60)
         logger.info("👋 СЕРВИС ОСТАНОВЛЕН")
         logger.info("=" * 60)
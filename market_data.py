@@ -0,0 +1,416 @@
+"""
+market_data.py - Источники рыночных данных (провайдеры свечей) для AICore
+Версия: 1.0
+Дата: 2026-10-18
+
+Обеспечивает:
+- Общий интерфейс MarketDataProvider (история свечей, часы, ожидание)
+- YFinanceProvider - загрузка через yfinance (рабочий режим)
+- ReplayProvider - воспроизведение свечей из файлов Parquet/CSV
+  (Parquet читается через memory map, если доступен pyarrow)
+- SyntheticProvider - детерминированное случайное блуждание
+- SimulatedClock - виртуальное время: ускоренное (speed > 0) или
+  пошаговое (speed = 0, время идет только в sleep)
+
+Офлайн-провайдеры позволяют прогонять полный цикл анализа без сети,
+детерминированно и быстрее реального времени (CI, нагрузочные тесты).
+
+Выбор провайдера через окружение:
+    MARKET_DATA_PROVIDER=yfinance|replay|synthetic
+    MARKET_DATA_PATH=<каталог с файлами для replay>
+    MARKET_DATA_SPEED=<ускорение виртуального времени, 0 = пошагово>
+    MARKET_DATA_SEED=<зерно synthetic>
+"""
+
+import os
+import time
+import zlib
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Dict, List, Tuple, Any
+
+# Pandas и NumPy - опциональные
+try:
+    import pandas as pd
+    import numpy as np
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+    pd = None
+    np = None
+
+# yfinance - опциональный (только для YFinanceProvider)
+try:
+    import yfinance as yf
+    YFINANCE_AVAILABLE = True
+except ImportError:
+    YFINANCE_AVAILABLE = False
+
+# pyarrow - опциональный (Parquet)
+try:
+    import pyarrow
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+from candle_store import PERIOD_SECONDS, INTERVAL_SECONDS, OHLCV_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Разделитель символа и интервала в имени файла replay: BTC-USD__5m.parquet
+SERIES_SEPARATOR = '__'
+REPLAY_EXTENSIONS = ('.parquet', '.csv')
+
+
+# ========================================
+# ЧАСЫ
+# ========================================
+
+class SimulatedClock:
+    """Виртуальные часы для офлайн-провайдеров"""
+
+    def __init__(self, start: datetime, speed: float = 0):
+        """
+        Args:
+            start: Начальное виртуальное время (UTC)
+            speed: Во сколько раз виртуальное время быстрее реального
+                (0 - время идет только через advance/sleep)
+        """
+        self.speed = speed
+        self._start = start.timestamp()
+        self._offset = 0.0
+        self._started_at = time.monotonic()
+
+    def now(self) -> datetime:
+        """Текущее виртуальное время"""
+        elapsed = (time.monotonic() - self._started_at) * self.speed if self.speed else 0.0
+        return datetime.fromtimestamp(self._start + self._offset + elapsed, tz=timezone.utc)
+
+    def advance(self, seconds: float):
+        """Сдвинуть виртуальное время вперед"""
+        self._offset += seconds
+
+    async def sleep(self, seconds: float):
+        """Подождать seconds виртуальных секунд"""
+        if self.speed:
+            await asyncio.sleep(seconds / self.speed)
+        else:
+            self.advance(seconds)
+            await asyncio.sleep(0)
+
+
+# ========================================
+# ИНТЕРФЕЙС
+# ========================================
+
+class MarketDataProvider:
+    """
+    Источник свечей для AICore
+
+    Наследники реализуют history(); now() и sleep() определяют время,
+    в котором живет цикл анализа (реальное или виртуальное).
+    """
+
+    name = 'base'
+    # Офлайн-провайдер (виртуальное время): не делит хранилище свечей
+    # с рабочим ботом
+    offline = False
+
+    def history(self, symbol: str, period: str = '1d', interval: str = '5m',
+                start: datetime = None):
+        """
+        Получить свечи актива
+
+        Args:
+            symbol: Символ актива
+            period: Глубина данных ('1d', '5d', '1mo', etc.)
+            interval: Интервал ('1m', '5m', '15m', '1h', etc.)
+            start: Начало периода (если указано, period игнорируется)
+
+        Returns:
+            DataFrame с колонками OHLCV и индексом UTC или None
+        """
+        raise NotImplementedError
+
+    def now(self) -> datetime:
+        """Текущее время провайдера (UTC)"""
+        return datetime.now(timezone.utc)
+
+    async def sleep(self, seconds: float):
+        """Пауза цикла анализа во времени провайдера"""
+        await asyncio.sleep(seconds)
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Свечи из yfinance (сеть, реальное время)"""
+
+    name = 'yfinance'
+
+    def history(self, symbol: str, period: str = '1d', interval: str = '5m',
+                start: datetime = None):
+        if not YFINANCE_AVAILABLE:
+            logger.warning("⚠️ yfinance не установлен - рыночные данные недоступны")
+            return None
+
+        ticker = yf.Ticker(symbol)
+        if start is not None:
+            return ticker.history(start=start, interval=interval)
+        return ticker.history(period=period, interval=interval)
+
+
+class _SimulatedProvider(MarketDataProvider):
+    """Общая часть офлайн-провайдеров: виртуальные часы и выборка окна"""
+
+    offline = True
+
+    def __init__(self, clock: SimulatedClock):
+        self.clock = clock
+
+    def now(self) -> datetime:
+        return self.clock.now()
+
+    async def sleep(self, seconds: float):
+        await self.clock.sleep(seconds)
+
+    def _window(self, timestamps, period: str, start: datetime) -> Tuple[int, int]:
+        """Границы свечей [first, last) от start (или now - period) до now включительно"""
+        now = int(self.now().timestamp())
+        since = int(start.timestamp()) if start is not None else now - PERIOD_SECONDS.get(period, PERIOD_SECONDS['1d'])
+        return (
+            int(np.searchsorted(timestamps, since, side='left')),
+            int(np.searchsorted(timestamps, now, side='right'))
+        )
+
+    @staticmethod
+    def _frame(timestamps, values, first: int, last: int):
+        """DataFrame из среза массивов (None, если срез пуст)"""
+        if last <= first:
+            return None
+        df = pd.DataFrame(values[first:last], columns=OHLCV_COLUMNS)
+        df.index = pd.to_datetime(timestamps[first:last], unit='s', utc=True)
+        return df
+
+
+# ========================================
+# ВОСПРОИЗВЕДЕНИЕ ИЗ ФАЙЛОВ
+# ========================================
+
+class ReplayProvider(_SimulatedProvider):
+    """
+    Свечи из файлов <символ>__<интервал>.parquet|.csv
+
+    Файл содержит колонку timestamp (Unix-секунды или дата) и колонки
+    Open, High, Low, Close, Volume. Серии читаются один раз при первом
+    обращении и хранятся как массивы NumPy; каждый вызов history() -
+    срез по бинарному поиску без повторного чтения файла.
+    """
+
+    name = 'replay'
+
+    def __init__(self, path: str, start: datetime = None, speed: float = 0):
+        """
+        Args:
+            path: Каталог с файлами серий
+            start: Начальное виртуальное время (по умолчанию - сутки после
+                самой ранней свечи, чтобы первый цикл получил полный '1d')
+            speed: Ускорение виртуального времени (0 - пошагово)
+        """
+        if not PANDAS_AVAILABLE:
+            raise RuntimeError("pandas не установлен - ReplayProvider недоступен")
+
+        self.path = path
+        self.files: Dict[Tuple[str, str], str] = {}
+        for filename in sorted(os.listdir(path)):
+            stem, ext = os.path.splitext(filename)
+            if ext in REPLAY_EXTENSIONS and SERIES_SEPARATOR in stem:
+                symbol, interval = stem.rsplit(SERIES_SEPARATOR, 1)
+                self.files.setdefault((symbol, interval), os.path.join(path, filename))
+
+        self._series: Dict[Tuple[str, str], Tuple[Any, Any]] = {}
+
+        if start is None:
+            firsts = [timestamps[0] for timestamps, _ in map(lambda key: self._load(*key), self.files) if len(timestamps)]
+            if firsts:
+                start = datetime.fromtimestamp(int(min(firsts)), tz=timezone.utc) + timedelta(days=1)
+            else:
+                start = datetime.now(timezone.utc)
+
+        super().__init__(SimulatedClock(start, speed))
+        logger.info(f"✅ ReplayProvider: {len(self.files)} серий из {path}")
+
+    def _load(self, symbol: str, interval: str) -> Tuple[Any, Any]:
+        """Прочитать серию в массивы (timestamps int64, OHLCV float64)"""
+        key = (symbol, interval)
+        if key in self._series:
+            return self._series[key]
+
+        filename = self.files.get(key)
+        if filename is None:
+            series = (np.empty(0, dtype=np.int64), np.empty((0, len(OHLCV_COLUMNS))))
+            self._series[key] = series
+            return series
+
+        if filename.endswith('.parquet'):
+            df = pd.read_parquet(filename, memory_map=True)
+        else:
+            df = pd.read_csv(filename)
+
+        raw = df['timestamp']
+        if pd.api.types.is_numeric_dtype(raw):
+            timestamps = raw.to_numpy(dtype=np.int64)
+        else:
+            timestamps = pd.to_datetime(raw, utc=True).astype('datetime64[s, UTC]').astype('int64').to_numpy()
+
+        order = np.argsort(timestamps, kind='stable')
+        values = np.column_stack([
+            df[col].to_numpy(dtype=np.float64) if col in df else np.zeros(len(df))
+            for col in OHLCV_COLUMNS
+        ])
+        series = (timestamps[order], values[order])
+        self._series[key] = series
+        return series
+
+    def history(self, symbol: str, period: str = '1d', interval: str = '5m',
+                start: datetime = None):
+        timestamps, values = self._load(symbol, interval)
+        first, last = self._window(timestamps, period, start)
+        return self._frame(timestamps, values, first, last)
+
+    @staticmethod
+    def write_series(path: str, symbol: str, interval: str, df, fmt: str = None) -> str:
+        """
+        Сохранить свечи в файл для воспроизведения
+
+        Args:
+            path: Каталог
+            symbol: Символ актива
+            interval: Интервал
+            df: DataFrame с OHLCV и DatetimeIndex
+            fmt: 'parquet' или 'csv' (по умолчанию parquet, если есть pyarrow)
+
+        Returns:
+            str: Путь к файлу
+        """
+        fmt = fmt or ('parquet' if PARQUET_AVAILABLE else 'csv')
+        os.makedirs(path, exist_ok=True)
+        filename = os.path.join(path, f'{symbol}{SERIES_SEPARATOR}{interval}.{fmt}')
+
+        index = df.index if df.index.tz is not None else df.index.tz_localize('UTC')
+        out = df[[col for col in OHLCV_COLUMNS if col in df]].copy()
+        out.insert(0, 'timestamp', index.tz_convert('UTC').tz_localize(None).to_numpy('datetime64[s]').astype('int64'))
+
+        if fmt == 'parquet':
+            out.to_parquet(filename, index=False)
+        else:
+            out.to_csv(filename, index=False)
+        return filename
+
+
+# ========================================
+# СИНТЕТИЧЕСКИЕ ДАННЫЕ
+# ========================================
+
+class SyntheticProvider(_SimulatedProvider):
+    """
+    Случайное блуждание (геометрическое), детерминированное по seed и символу
+
+    Серия генерируется последовательно от start - history_days и
+    дописывается по мере движения виртуального времени, поэтому
+    перекрывающиеся запросы всегда видят одни и те же свечи.
+    """
+
+    name = 'synthetic'
+
+    def __init__(self, seed: int = 42, start: datetime = None, speed: float = 0,
+                 volatility: float = 0.002, history_days: int = 30):
+        """
+        Args:
+            seed: Зерно генератора
+            start: Начальное виртуальное время (по умолчанию 2024-01-01 UTC)
+            speed: Ускорение виртуального времени (0 - пошагово)
+            volatility: Стандартное отклонение доходности за свечу
+            history_days: Глубина истории до start
+        """
+        if not PANDAS_AVAILABLE:
+            raise RuntimeError("pandas не установлен - SyntheticProvider недоступен")
+
+        start = start or datetime(2024, 1, 1, tzinfo=timezone.utc)
+        super().__init__(SimulatedClock(start, speed))
+        self.seed = seed
+        self.volatility = volatility
+        self.origin = int(start.timestamp()) - history_days * 86400
+        self._series: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def _extend(self, symbol: str, interval: str, until: int) -> Dict[str, Any]:
+        """Догенерировать серию до метки времени until"""
+        key = (symbol, interval)
+        step = INTERVAL_SECONDS.get(interval, 300)
+        series = self._series.get(key)
+        if series is None:
+            rng = np.random.default_rng([self.seed, zlib.crc32(f'{symbol}|{interval}'.encode())])
+            series = {
+                'rng': rng,
+                'timestamps': np.empty(0, dtype=np.int64),
+                'values': np.empty((0, len(OHLCV_COLUMNS))),
+                'price': 10 + 190 * rng.random()
+            }
+            self._series[key] = series
+
+        origin = self.origin - self.origin % step
+        needed = (until - origin) // step + 1 - len(series['timestamps'])
+        if needed <= 0:
+            return series
+
+        rng = series['rng']
+        returns = rng.normal(0, self.volatility, needed)
+        close = series['price'] * np.exp(np.cumsum(returns))
+        open_ = np.concatenate(([series['price']], close[:-1]))
+        spread = np.abs(rng.normal(0, self.volatility / 2, needed)) * close
+        high = np.maximum(open_, close) + spread
+        low = np.minimum(open_, close) - spread
+        volume = rng.integers(100, 10000, needed).astype(np.float64)
+
+        first = len(series['timestamps'])
+        timestamps = origin + np.arange(first, first + needed, dtype=np.int64) * step
+        series['timestamps'] = np.concatenate((series['timestamps'], timestamps))
+        series['values'] = np.concatenate((series['values'], np.column_stack([open_, high, low, close, volume])))
+        series['price'] = close[-1]
+        return series
+
+    def history(self, symbol: str, period: str = '1d', interval: str = '5m',
+                start: datetime = None):
+        series = self._extend(symbol, interval, int(self.now().timestamp()))
+        first, last = self._window(series['timestamps'], period, start)
+        return self._frame(series['timestamps'], series['values'], first, last)
+
+
+# ========================================
+# ФАБРИКА
+# ========================================
+
+def create_provider(name: str = None, **kwargs) -> MarketDataProvider:
+    """
+    Создать провайдер по имени (по умолчанию MARKET_DATA_PROVIDER или yfinance)
+
+    Args:
+        name: 'yfinance', 'replay' или 'synthetic'
+        **kwargs: Параметры конструктора (переопределяют переменные окружения)
+
+    Returns:
+        MarketDataProvider
+    """
+    name = name or os.getenv('MARKET_DATA_PROVIDER', 'yfinance')
+    speed = float(os.getenv('MARKET_DATA_SPEED', '0'))
+
+    if name == 'replay':
+        kwargs.setdefault('path', os.getenv('MARKET_DATA_PATH', 'market_data'))
+        kwargs.setdefault('speed', speed)
+        return ReplayProvider(**kwargs)
+    if name == 'synthetic':
+        kwargs.setdefault('seed', int(os.getenv('MARKET_DATA_SEED', '42')))
+        kwargs.setdefault('speed', speed)
+        return SyntheticProvider(**kwargs)
+    if name != 'yfinance':
+        logger.warning(f"⚠️ Неизвестный провайдер данных '{name}' - используется yfinance")
+    return YFinanceProvider()
@@ -0,0 +1,327 @@
+"""
+numpy_indicators.py - Технические индикаторы на чистом NumPy
+Версия: 1.0
+Дата: 2026-10-18
+
+Обеспечивает:
+- RSI(14), MACD(12,26,9), Bollinger Bands(20,2), EMA и Stochastic(14,3)
+  без зависимости от библиотеки ta
+- Работу с непрерывными массивами float64 и заранее выделенными буферами
+- Результаты, совпадающие с ta (те же формулы и периоды прогрева)
+- Проверку паритета с ta (test_numpy_indicators)
+"""
+
+import time
+import logging
+from typing import Optional, Dict, Any
+
+# NumPy - опциональный (для облегченных версий)
+try:
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+from streaming_indicators import INDICATOR_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# ========================================
+# БАЗОВЫЕ ОПЕРАЦИИ
+# ========================================
+
+def ewm_mean(values, alpha: float, min_periods: int = 0, out=None):
+    """
+    Экспоненциальное среднее, эквивалент pandas ewm(alpha, adjust=False).mean()
+
+    Рекурсия y[t] = ((1 - alpha) * y[t-1] + alpha * x[t]) / ((1 - alpha) + alpha)
+    считается по шагам в том же виде, что и в pandas, включая пропуск шага при
+    x[t] == y[t-1]: на ровном ряде результат точно равен значениям ряда, и
+    разности EMA (MACD) дают ровно 0, а не шум округления с меняющимся знаком.
+    Начальные NaN пропускаются (ряд стартует с первого значения), пропуски
+    внутри ряда не поддерживаются.
+
+    Args:
+        values: Массив float64
+        alpha: Коэффициент сглаживания (0 < alpha < 1)
+        min_periods: Минимальное число наблюдений для непустого значения
+        out: Буфер результата (той же длины)
+
+    Returns:
+        ndarray: Сглаженный ряд (out, если передан)
+    """
+    n = len(values)
+    if out is None:
+        out = np.empty(n, dtype=np.float64)
+    out.fill(np.nan)
+
+    valid = np.flatnonzero(~np.isnan(values))
+    if not len(valid):
+        return out
+
+    start = valid[0]
+    decay = 1.0 - alpha
+    total = decay + alpha
+
+    # Цикл по float из tolist() заметно быстрее поэлементного доступа к ndarray
+    x = values[start:].tolist()
+    result = [0.0] * len(x)
+    y = x[0]
+    for i, value in enumerate(x):
+        if value != y:
+            y = (decay * y + alpha * value) / total
+        result[i] = y
+    out[start:] = result
+
+    if min_periods > 1:
+        out[start:start + min_periods - 1] = np.nan
+    return out
+
+
+def ema(close, window: int, out=None):
+    """EMA, эквивалент ta.trend.EMAIndicator(close, window).ema_indicator()"""
+    return ewm_mean(close, 2.0 / (window + 1), min_periods=window, out=out)
+
+
+def rolling_mean(values, window: int, out=None):
+    """Скользящее среднее (NaN до заполнения окна)"""
+    if out is None:
+        out = np.empty(len(values), dtype=np.float64)
+    out[:window - 1] = np.nan
+    if len(values) >= window:
+        out[window - 1:] = sliding_window_view(values, window).mean(axis=1)
+    return out
+
+
+# ========================================
+# ИНДИКАТОРЫ
+# ========================================
+
+def rsi(close, window: int = 14, out=None):
+    """RSI, эквивалент ta.momentum.RSIIndicator(close, window).rsi()"""
+    n = len(close)
+    if out is None:
+        out = np.empty(n, dtype=np.float64)
+    if n == 0:
+        return out
+
+    diff = np.empty(n, dtype=np.float64)
+    diff[0] = 0.0
+    np.subtract(close[1:], close[:-1], out=diff[1:])
+
+    up = ewm_mean(np.maximum(diff, 0.0), 1.0 / window, min_periods=window)
+    down = ewm_mean(np.maximum(-diff, 0.0), 1.0 / window, min_periods=window)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(100.0, 1.0 + up / down, out=out)
+    np.subtract(100.0, out, out=out)
+    out[down == 0] = 100.0
+    return out
+
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9,
+         out_macd=None, out_signal=None, out_diff=None):
+    """
+    MACD, эквивалент ta.trend.MACD(close)
+
+    Returns:
+        Tuple[ndarray, ndarray, ndarray]: macd, macd_signal, macd_diff
+    """
+    n = len(close)
+    out_macd = out_macd if out_macd is not None else np.empty(n, dtype=np.float64)
+    out_diff = out_diff if out_diff is not None else np.empty(n, dtype=np.float64)
+
+    np.subtract(ema(close, fast), ema(close, slow), out=out_macd)
+    out_signal = ema(out_macd, signal, out=out_signal)
+    np.subtract(out_macd, out_signal, out=out_diff)
+    return out_macd, out_signal, out_diff
+
+
+def bollinger(close, window: int = 20, window_dev: float = 2,
+              out_upper=None, out_middle=None, out_lower=None):
+    """
+    Bollinger Bands, эквивалент ta.volatility.BollingerBands(close, window)
+
+    Returns:
+        Tuple[ndarray, ndarray, ndarray]: upper, middle, lower
+    """
+    n = len(close)
+    out_upper = out_upper if out_upper is not None else np.empty(n, dtype=np.float64)
+    out_lower = out_lower if out_lower is not None else np.empty(n, dtype=np.float64)
+    out_middle = rolling_mean(close, window, out=out_middle)
+
+    deviation = np.full(n, np.nan)
+    if n >= window:
+        deviation[window - 1:] = window_dev * sliding_window_view(close, window).std(axis=1)
+
+    np.add(out_middle, deviation, out=out_upper)
+    np.subtract(out_middle, deviation, out=out_lower)
+    return out_upper, out_middle, out_lower
+
+
+def stochastic(high, low, close, window: int = 14, smooth_window: int = 3,
+               out_k=None, out_d=None):
+    """
+    Stochastic Oscillator, эквивалент ta.momentum.StochasticOscillator(high, low, close)
+
+    Returns:
+        Tuple[ndarray, ndarray]: %K, %D
+    """
+    n = len(close)
+    out_k = out_k if out_k is not None else np.empty(n, dtype=np.float64)
+    out_k.fill(np.nan)
+
+    if n >= window:
+        highest = sliding_window_view(high, window).max(axis=1)
+        lowest = sliding_window_view(low, window).min(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out_k[window - 1:] = 100.0 * (close[window - 1:] - lowest) / (highest - lowest)
+
+    out_d = rolling_mean(out_k, smooth_window, out=out_d)
+    return out_k, out_d
+
+
+def compute_indicators(high, low, close, out=None):
+    """
+    Рассчитать все индикаторы AICore в один буфер
+
+    Args:
+        high, low, close: Непрерывные массивы float64 одинаковой длины
+        out: Буфер (len(close), len(INDICATOR_COLUMNS)) в порядке Fortran,
+            чтобы каждая колонка была непрерывной; создается, если не передан
+
+    Returns:
+        ndarray: Буфер со значениями индикаторов в порядке INDICATOR_COLUMNS
+    """
+    high = np.ascontiguousarray(high, dtype=np.float64)
+    low = np.ascontiguousarray(low, dtype=np.float64)
+    close = np.ascontiguousarray(close, dtype=np.float64)
+
+    n = len(close)
+    if out is None:
+        out = np.empty((n, len(INDICATOR_COLUMNS)), dtype=np.float64, order='F')
+
+    columns = {name: out[:, i] for i, name in enumerate(INDICATOR_COLUMNS)}
+
+    rsi(close, out=columns['RSI'])
+    macd(close, out_macd=columns['MACD'], out_signal=columns['MACD_signal'], out_diff=columns['MACD_diff'])
+    bollinger(close, out_upper=columns['BB_upper'], out_middle=columns['BB_middle'], out_lower=columns['BB_lower'])
+    ema(close, 12, out=columns['EMA_12'])
+    ema(close, 26, out=columns['EMA_26'])
+    stochastic(high, low, close, out_k=columns['Stoch_K'], out_d=columns['Stoch_D'])
+    return out
+
+
+def calculate_indicators(df):
+    """
+    Добавить индикаторы в DataFrame (замена ta-версии AICore.calculate_indicators)
+
+    Args:
+        df: DataFrame с колонками High, Low, Close
+
+    Returns:
+        DataFrame с добавленными индикаторами
+    """
+    values = compute_indicators(
+        df['High'].to_numpy(dtype=np.float64),
+        df['Low'].to_numpy(dtype=np.float64),
+        df['Close'].to_numpy(dtype=np.float64)
+    )
+    for i, column in enumerate(INDICATOR_COLUMNS):
+        df[column] = values[:, i]
+    return df
+
+
+# ========================================
+# ТЕСТИРОВАНИЕ
+# ========================================
+
+def test_numpy_indicators(rows: int = 2000, tolerance: float = 1e-8) -> bool:
+    """
+    Проверяет совпадение индикаторов с библиотекой ta и сравнивает скорость
+
+    Кроме случайного блуждания проверяются ровный ряд и ряд с редкими
+    тиками: на них MACD_diff около нуля, поэтому сверяется еще и знак.
+    """
+    logger.info("🧪 Тестирование numpy_indicators...")
+
+    try:
+        import pandas as pd
+        import ta
+    except ImportError:
+        logger.warning("⚠️ pandas или ta не установлены - проверка паритета пропущена")
+        return False
+
+    def ta_indicators(df):
+        expected = pd.DataFrame(index=df.index)
+        expected['RSI'] = ta.momentum.RSIIndicator(df['Close'], window=14).rsi()
+        macd_ta = ta.trend.MACD(df['Close'])
+        expected['MACD'] = macd_ta.macd()
+        expected['MACD_signal'] = macd_ta.macd_signal()
+        expected['MACD_diff'] = macd_ta.macd_diff()
+        bollinger_ta = ta.volatility.BollingerBands(df['Close'], window=20)
+        expected['BB_upper'] = bollinger_ta.bollinger_hband()
+        expected['BB_middle'] = bollinger_ta.bollinger_mavg()
+        expected['BB_lower'] = bollinger_ta.bollinger_lband()
+        expected['EMA_12'] = ta.trend.EMAIndicator(df['Close'], window=12).ema_indicator()
+        expected['EMA_26'] = ta.trend.EMAIndicator(df['Close'], window=26).ema_indicator()
+        stoch_ta = ta.momentum.StochasticOscillator(df['High'], df['Low'], df['Close'])
+        expected['Stoch_K'] = stoch_ta.stoch()
+        expected['Stoch_D'] = stoch_ta.stoch_signal()
+        return expected
+
+    rng = np.random.default_rng(7)
+    ticks = np.where(rng.random(rows) < 0.05, rng.choice([-1e-4, 1e-4], rows), 0.0)
+    cases = {
+        'random': 100 + np.cumsum(rng.normal(0, 1, rows)),
+        'flat': np.full(rows, 1.0823),
+        'near-flat': 1.0823 + np.cumsum(ticks)
+    }
+
+    passed = True
+    for case, close in cases.items():
+        spread = rng.random(rows) if case == 'random' else np.full(rows, 1e-4)
+        df = pd.DataFrame({'High': close + spread, 'Low': close - spread, 'Close': close})
+
+        started = time.perf_counter()
+        expected = ta_indicators(df)
+        ta_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        actual = compute_indicators(df['High'].to_numpy(), df['Low'].to_numpy(), df['Close'].to_numpy())
+        numpy_time = time.perf_counter() - started
+
+        for i, column in enumerate(INDICATOR_COLUMNS):
+            reference = expected[column].to_numpy(dtype=np.float64)
+            if not np.allclose(actual[:, i], reference, rtol=tolerance, atol=tolerance, equal_nan=True):
+                error = np.nanmax(np.abs(actual[:, i] - reference))
+                logger.error(f"❌ {case} {column}: расхождение с ta (макс. ошибка {error:.3e})")
+                passed = False
+
+        diff = actual[:, INDICATOR_COLUMNS.index('MACD_diff')]
+        reference = expected['MACD_diff'].to_numpy(dtype=np.float64)
+        finite = ~np.isnan(reference)
+        flips = int(np.sum(np.sign(diff[finite]) != np.sign(reference[finite])))
+        if flips:
+            logger.error(f"❌ {case} MACD_diff: знак расходится с ta в {flips} точках")
+            passed = False
+
+        logger.info(f"⏱️ {case}: ta {ta_time * 1000:.2f} мс, numpy {numpy_time * 1000:.2f} мс ({rows} свечей)")
+
+    empty = np.empty(0, dtype=np.float64)
+    if compute_indicators(empty, empty, empty).shape[0] != 0:
+        logger.error("❌ Пустой ряд: неверная форма результата")
+        passed = False
+
+    if passed:
+        logger.info("✅ Тест пройден: индикаторы совпадают с ta")
+    else:
+        logger.error("❌ Тест провален: индикаторы расходятся с ta")
+    return passed
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    test_numpy_indicators()
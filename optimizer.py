@@ -0,0 +1,473 @@
+"""
+optimizer.py - Параллельный подбор параметров правил сигналов
+Версия: 1.0
+Дата: 2026-10-18
+
+Обеспечивает:
+- Перебор (сетка или случайная выборка) порогов RSI, весов RSI/MACD/Bollinger
+  и порога уверенности отдельно для каждого актива и таймфрейма
+- Расчет индикаторов один раз на серию: массивы лежат в общей памяти
+  (multiprocessing.shared_memory) и читаются процессами без копирования
+- ProcessPoolExecutor с мелкими задачами (серия x блок комбинаций),
+  чтобы загрузка ядер была равномерной и масштабирование близким к линейному
+- Версионированную таблицу параметров (JSON), которую AICore загружает при старте
+
+Запуск:
+    python optimizer.py --source market_history --workers 8 --samples 500
+"""
+
+import os
+import json
+import time
+import logging
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import shared_memory
+from typing import Optional, Dict, List, Tuple, Any
+
+import numpy as np
+
+import numpy_indicators
+from backtester import Backtester, backtest_series, DEFAULT_PAYOUT
+from batch_signals import evaluate_signals, load_signal_params, DEFAULT_SIGNAL_PARAMS
+from candle_store import INTERVAL_SECONDS
+from streaming_indicators import INDICATOR_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Порядок параметров в строках сетки
+PARAM_NAMES = list(DEFAULT_SIGNAL_PARAMS)
+
+# Сетка перебора по умолчанию (исходные значения входят в сетку)
+DEFAULT_PARAM_GRID = {
+    'rsi_oversold': [20, 25, 30, 35],
+    'rsi_overbought': [65, 70, 75, 80],
+    'rsi_weight': [15, 20, 25],
+    'macd_weight': [20, 25, 30],
+    'bb_weight': [10, 15, 20],
+    'min_confidence': [35, 40, 45, 50]
+}
+
+# Массивы серии в общей памяти (по строке на поле)
+SHARED_FIELDS = ['close', 'rsi', 'macd_diff', 'macd_diff_prev', 'bb_upper', 'bb_lower', 'outcome']
+
+# Состояние процесса-воркера (заполняется в _init_worker)
+_worker: Dict[str, Any] = {}
+
+
+# ========================================
+# СЕТКА ПАРАМЕТРОВ
+# ========================================
+
+def build_param_grid(grid: Dict[str, List[float]] = None, samples: int = None,
+                     seed: int = 42) -> np.ndarray:
+    """
+    Построить набор комбинаций параметров
+
+    Комбинации, в которых сумма весов не достигает порога уверенности
+    (сигнал невозможен), отбрасываются.
+
+    Args:
+        grid: {параметр: список значений} (по умолчанию DEFAULT_PARAM_GRID)
+        samples: Размер случайной выборки из сетки (None - полная сетка)
+        seed: Зерно генератора для случайной выборки
+
+    Returns:
+        ndarray: Матрица (комбинации, len(PARAM_NAMES)) в порядке PARAM_NAMES
+    """
+    grid = grid or DEFAULT_PARAM_GRID
+    values = [grid.get(name, [DEFAULT_SIGNAL_PARAMS[name]]) for name in PARAM_NAMES]
+    combos = np.array(list(itertools.product(*values)), dtype=np.float64)
+
+    column = {name: combos[:, i] for i, name in enumerate(PARAM_NAMES)}
+    reachable = column['rsi_weight'] + column['macd_weight'] + column['bb_weight'] >= column['min_confidence']
+    combos = combos[reachable & (column['rsi_oversold'] < column['rsi_overbought'])]
+
+    if samples and samples < len(combos):
+        rng = np.random.default_rng(seed)
+        combos = combos[np.sort(rng.choice(len(combos), samples, replace=False))]
+    return combos
+
+
+# ========================================
+# ПОДГОТОВКА ОБЩИХ МАССИВОВ
+# ========================================
+
+def prepare_series(series: Dict[Tuple[str, str], Dict[str, np.ndarray]],
+                   expiry_bars: int = 1) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+    """
+    Посчитать индикаторы и исходы экспирации один раз для всех серий
+
+    Args:
+        series: Результат Backtester.load_series
+        expiry_bars: Экспирация сигнала в свечах своего таймфрейма
+
+    Returns:
+        Tuple: (матрица (len(SHARED_FIELDS), всего свечей) со всеми сериями
+        подряд, список описаний серий с границами start/end и буфером индикаторов)
+    """
+    blocks = []
+    layout = []
+    offset = 0
+
+    for (asset, timeframe), data in series.items():
+        interval = INTERVAL_SECONDS.get(timeframe)
+        if interval is None or len(data['close']) < 2:
+            continue
+
+        timestamps = data['timestamp']
+        close = np.ascontiguousarray(data['close'], dtype=np.float64)
+        indicators = numpy_indicators.compute_indicators(data['high'], data['low'], close)
+        column = {name: indicators[:, i] for i, name in enumerate(INDICATOR_COLUMNS)}
+
+        # Знак движения цены к экспирации (NaN - экспирация за пределами данных)
+        exit_index = np.searchsorted(timestamps, timestamps + interval * expiry_bars, side='left')
+        outcome = np.full(len(close), np.nan)
+        has_exit = exit_index < len(close)
+        outcome[has_exit] = np.sign(close[exit_index[has_exit]] - close[has_exit])
+
+        block = np.empty((len(SHARED_FIELDS), len(close)), dtype=np.float64)
+        block[0] = close
+        block[1] = column['RSI']
+        block[2] = column['MACD_diff']
+        block[3, 0] = np.nan
+        block[3, 1:] = column['MACD_diff'][:-1]
+        block[4] = column['BB_upper']
+        block[5] = column['BB_lower']
+        block[6] = outcome
+        blocks.append(block)
+
+        layout.append({
+            'asset': asset,
+            'timeframe': timeframe,
+            'start': offset,
+            'end': offset + len(close),
+            'expiry_seconds': interval * expiry_bars,
+            'data': data,
+            'indicators': indicators
+        })
+        offset += len(close)
+
+    packed = np.concatenate(blocks, axis=1) if blocks else np.empty((len(SHARED_FIELDS), 0))
+    return packed, layout
+
+
+# ========================================
+# ВОРКЕР
+# ========================================
+
+def _init_worker(shm_name: str, shape: Tuple[int, int], grid_shm_name: str,
+                 grid_shape: Tuple[int, int], payout: float):
+    """Подключить процесс к общей памяти (вызывается один раз на процесс)"""
+    data_shm = shared_memory.SharedMemory(name=shm_name)
+    grid_shm = shared_memory.SharedMemory(name=grid_shm_name)
+
+    # Ссылки на блоки держатся до конца процесса, иначе буфер освободится
+    _worker['shm'] = (data_shm, grid_shm)
+    _worker['data'] = np.ndarray(shape, dtype=np.float64, buffer=data_shm.buf)
+    _worker['grid'] = np.ndarray(grid_shape, dtype=np.float64, buffer=grid_shm.buf)
+    _worker['payout'] = payout
+
+
+def _evaluate_chunk(task: Tuple[int, int, int, int, int]) -> Tuple[int, int, np.ndarray]:
+    """
+    Оценить блок комбинаций параметров на одной серии
+
+    Args:
+        task: (id серии, начало серии, конец серии, первая комбинация, последняя + 1)
+
+    Returns:
+        Tuple: (id серии, первая комбинация, матрица [signals, wins, losses, pnl])
+    """
+    series_id, start, end, first, last = task
+    close, rsi, macd_diff, macd_diff_prev, bb_upper, bb_lower, outcome = _worker['data'][:, start:end]
+    payout = _worker['payout']
+    has_exit = ~np.isnan(outcome)
+
+    results = np.empty((last - first, 4), dtype=np.float64)
+    for j, values in enumerate(_worker['grid'][first:last]):
+        evaluated = evaluate_signals(
+            close, rsi, macd_diff, macd_diff_prev, bb_upper, bb_lower,
+            params=dict(zip(PARAM_NAMES, values))
+        )
+        fired = evaluated['passed'] & has_exit
+        move = outcome[fired] * evaluated['direction'][fired]
+        wins = np.count_nonzero(move > 0)
+        losses = np.count_nonzero(move < 0)
+        results[j] = (len(move), wins, losses, wins * payout - losses)
+
+    return series_id, first, results
+
+
+# ========================================
+# ОПТИМИЗАТОР
+# ========================================
+
+class SignalOptimizer:
+    """Подбор параметров правил AICore по локальной истории"""
+
+    def __init__(self, db_path: str = None, payout: float = DEFAULT_PAYOUT,
+                 expiry_bars: int = 1, min_signals: int = 20, workers: int = None):
+        """
+        Args:
+            db_path: Путь к SQLite (как у Backtester)
+            payout: Выплата за выигрыш в долях ставки
+            expiry_bars: Экспирация сигнала в свечах своего таймфрейма
+            min_signals: Минимум сделок, чтобы комбинация считалась значимой
+            workers: Число процессов (по умолчанию OPTIMIZER_WORKERS или число ядер)
+        """
+        self.backtester = Backtester(db_path=db_path, payout=payout, expiry_bars=expiry_bars)
+        self.payout = payout
+        self.expiry_bars = expiry_bars
+        self.min_signals = min_signals
+        self.workers = workers or int(os.getenv('OPTIMIZER_WORKERS', '0')) or os.cpu_count() or 1
+
+    def evaluate_grid(self, packed: np.ndarray, layout: List[Dict[str, Any]],
+                      combos: np.ndarray, workers: int = None) -> List[np.ndarray]:
+        """
+        Оценить все комбинации на всех сериях в пуле процессов
+
+        Returns:
+            List[ndarray]: Для каждой серии матрица (комбинации, 4):
+            signals, wins, losses, pnl
+        """
+        workers = workers or self.workers
+        results = [np.empty((len(combos), 4), dtype=np.float64) for _ in layout]
+        if not layout or not len(combos):
+            return results
+
+        # Несколько задач на процесс, чтобы длинные серии не задерживали остальных
+        total_tasks = workers * 8
+        chunk = max(1, -(-len(combos) * len(layout) // total_tasks))
+        tasks = [
+            (series_id, item['start'], item['end'], first, min(first + chunk, len(combos)))
+            for series_id, item in enumerate(layout)
+            for first in range(0, len(combos), chunk)
+        ]
+
+        data_shm = shared_memory.SharedMemory(create=True, size=max(packed.nbytes, 1))
+        grid_shm = shared_memory.SharedMemory(create=True, size=max(combos.nbytes, 1))
+        try:
+            np.ndarray(packed.shape, dtype=np.float64, buffer=data_shm.buf)[:] = packed
+            np.ndarray(combos.shape, dtype=np.float64, buffer=grid_shm.buf)[:] = combos
+
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(data_shm.name, packed.shape, grid_shm.name, combos.shape, self.payout)
+            ) as executor:
+                for series_id, first, chunk_results in executor.map(_evaluate_chunk, tasks):
+                    results[series_id][first:first + len(chunk_results)] = chunk_results
+        finally:
+            data_shm.close()
+            data_shm.unlink()
+            grid_shm.close()
+            grid_shm.unlink()
+
+        return results
+
+    def optimize(self, source: str = 'candles', grid: Dict[str, List[float]] = None,
+                 samples: int = None, series: Dict = None) -> Dict[str, Any]:
+        """
+        Подобрать параметры для каждой серии
+
+        Комбинация выбирается по P&L (в ставках, с учетом выплаты) среди
+        комбинаций с не менее чем min_signals сделками. Если лучшая
+        комбинация не превосходит исходные правила, серия остается на
+        параметрах по умолчанию.
+
+        Args:
+            source: Источник свечей (см. Backtester.load_series)
+            grid: Сетка перебора (по умолчанию DEFAULT_PARAM_GRID)
+            samples: Размер случайной выборки из сетки (None - полная сетка)
+            series: Уже загруженные серии (вместо чтения из БД)
+
+        Returns:
+            Dict: {'params': {asset: {timeframe: параметры}}, 'metrics': {...},
+            'combinations', 'series', 'elapsed'}
+        """
+        started = time.perf_counter()
+        series = series if series is not None else self.backtester.load_series(source)
+        packed, layout = prepare_series(series, self.expiry_bars)
+        combos = build_param_grid(grid, samples)
+
+        results = self.evaluate_grid(packed, layout, combos)
+
+        params = {}
+        metrics = {}
+        for item, scores in zip(layout, results):
+            key = f"{item['asset']}|{item['timeframe']}"
+            data = item['data']
+
+            baseline = backtest_series(
+                data['timestamp'], data['high'], data['low'], data['close'],
+                expiry_seconds=item['expiry_seconds'], payout=self.payout,
+                indicators=item['indicators']
+            )
+            series_metrics = {'baseline': _public_metrics(baseline)}
+
+            eligible = np.flatnonzero(scores[:, 0] >= self.min_signals)
+            if len(eligible):
+                win_rate = scores[eligible, 1] / np.maximum(scores[eligible, 1] + scores[eligible, 2], 1)
+                # Лучший P&L, при равенстве - больший винрейт
+                best = eligible[np.lexsort((-win_rate, -scores[eligible, 3]))[0]]
+                if scores[best, 3] > baseline['pnl']:
+                    best_params = dict(zip(PARAM_NAMES, combos[best].tolist()))
+                    optimized = backtest_series(
+                        data['timestamp'], data['high'], data['low'], data['close'],
+                        expiry_seconds=item['expiry_seconds'], payout=self.payout,
+                        params=best_params, indicators=item['indicators']
+                    )
+                    params.setdefault(item['asset'], {})[item['timeframe']] = best_params
+                    series_metrics['optimized'] = _public_metrics(optimized)
+
+            metrics[key] = series_metrics
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"🧮 Оптимизация: {len(layout)} серий x {len(combos)} комбинаций, "
+            f"улучшено {sum(len(tfs) for tfs in params.values())} серий, "
+            f"{self.workers} процессов ({elapsed:.2f}с)"
+        )
+        return {
+            'params': params,
+            'metrics': metrics,
+            'combinations': len(combos),
+            'series': len(layout),
+            'elapsed': elapsed
+        }
+
+
+def _public_metrics(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Метрики backtest_series без массивов сделок"""
+    return {key: value for key, value in result.items() if key not in ('index', 'direction', 'trade_pnl')}
+
+
+# ========================================
+# ТАБЛИЦА ПАРАМЕТРОВ
+# ========================================
+
+def save_param_table(report: Dict[str, Any], path: str = None, **meta) -> Dict[str, Any]:
+    """
+    Записать версионированную таблицу параметров
+
+    Номер версии увеличивается относительно текущего файла. Рядом
+    сохраняется копия с номером версии (signal_params.v3.json), сам файл
+    заменяется атомарно - AICore никогда не прочитает его наполовину.
+
+    Args:
+        report: Результат SignalOptimizer.optimize
+        path: Путь к таблице (по умолчанию AI_SIGNAL_PARAMS_PATH или signal_params.json)
+        **meta: Дополнительные поля (source, payout, expiry_bars...)
+
+    Returns:
+        Dict: Записанная таблица
+    """
+    path = path or os.getenv('AI_SIGNAL_PARAMS_PATH', 'signal_params.json')
+    previous = load_signal_params(path)
+
+    table = {
+        'version': int(previous.get('version', 0)) + 1,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        **meta,
+        'defaults': DEFAULT_SIGNAL_PARAMS,
+        'params': report['params'],
+        'metrics': report['metrics']
+    }
+
+    root, ext = os.path.splitext(path)
+    archive_path = f"{root}.v{table['version']}{ext or '.json'}"
+    for target in (archive_path, path + '.tmp'):
+        with open(target, 'w', encoding='utf-8') as f:
+            json.dump(table, f, ensure_ascii=False, indent=2)
+    os.replace(path + '.tmp', path)
+
+    logger.info(f"💾 Таблица параметров v{table['version']} сохранена: {path}")
+    return table
+
+
+# ========================================
+# БЕНЧМАРК
+# ========================================
+
+def benchmark_scaling(workers_list: List[int] = None, series_count: int = 16,
+                      rows: int = 20000, samples: int = 200) -> Dict[int, float]:
+    """
+    Замерить время перебора при разном числе процессов на синтетических данных
+
+    Returns:
+        Dict: {число процессов: секунды}
+    """
+    workers_list = workers_list or sorted({1, 2, 4, os.cpu_count() or 1})
+    rng = np.random.default_rng(7)
+    series = {}
+    for i in range(series_count):
+        close = 100 + np.cumsum(rng.normal(0, 0.5, rows))
+        series[(f'SYN{i}', '5m')] = {
+            'timestamp': np.arange(rows, dtype=np.int64) * 300,
+            'high': close + rng.random(rows),
+            'low': close - rng.random(rows),
+            'close': close
+        }
+
+    optimizer = SignalOptimizer()
+    packed, layout = prepare_series(series)
+    combos = build_param_grid(samples=samples)
+
+    timings = {}
+    for workers in workers_list:
+        started = time.perf_counter()
+        optimizer.evaluate_grid(packed, layout, combos, workers=workers)
+        timings[workers] = time.perf_counter() - started
+
+    base = timings[workers_list[0]] * workers_list[0]
+    for workers, elapsed in timings.items():
+        logger.info(
+            f"⏱️ {workers} процесс(ов): {elapsed:.2f}с, "
+            f"ускорение x{timings[workers_list[0]] / elapsed:.2f}, "
+            f"эффективность {base / (elapsed * workers) * 100:.0f}%"
+        )
+    return timings
+
+
+def main():
+    """Запуск оптимизатора из командной строки"""
+    parser = argparse.ArgumentParser(description='Подбор параметров правил сигналов AICore')
+    parser.add_argument('--db', default=None, help='Путь к SQLite базе')
+    parser.add_argument('--source', default='candles', choices=['candles', 'market_history'])
+    parser.add_argument('--payout', type=float, default=DEFAULT_PAYOUT)
+    parser.add_argument('--expiry-bars', type=int, default=1)
+    parser.add_argument('--min-signals', type=int, default=20)
+    parser.add_argument('--samples', type=int, default=None, help='Случайная выборка из сетки')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default=None, help='Путь к таблице параметров')
+    parser.add_argument('--benchmark', action='store_true', help='Замер масштабирования по процессам')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark_scaling()
+        return
+
+    optimizer = SignalOptimizer(
+        db_path=args.db,
+        payout=args.payout,
+        expiry_bars=args.expiry_bars,
+        min_signals=args.min_signals,
+        workers=args.workers
+    )
+    report = optimizer.optimize(source=args.source, samples=args.samples)
+    save_param_table(
+        report, args.output,
+        source=args.source,
+        payout=args.payout,
+        expiry_bars=args.expiry_bars,
+        min_signals=args.min_signals,
+        combinations=report['combinations']
+    )
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,221 @@
+"""
+resampler.py - Инкрементальная агрегация свечей в старшие таймфреймы
+Версия: 1.0
+Дата: 2026-10-18
+
+Обеспечивает:
+- Одну базовую серию (обычно 1m) на актив и производные таймфреймы
+  (5m, 15m, 1h, ...) без отдельных загрузок
+- Иерархию уровней: каждый таймфрейм строится из ближайшего младшего,
+  на который делится без остатка (1m -> 5m -> 15m -> 1h)
+- Обновление за O(число дочерних свечей): новые или обновленные
+  базовые свечи пересчитывают только затронутые родительские свечи
+  (векторно, пачкой)
+- Границы свечей выровнены по UTC (ts - ts % длительность)
+- Хранение уровней в кольцевых буферах фиксированного размера
+  (candle_buffer): память не растет со временем работы
+"""
+
+import logging
+from typing import Optional, Dict, List, Any
+
+# Pandas и NumPy - опциональные
+try:
+    import pandas as pd
+    import numpy as np
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+    pd = None
+    np = None
+
+from candle_store import INTERVAL_SECONDS, OHLCV_COLUMNS, to_epoch_seconds
+from candle_buffer import CandleRingBuffer, CANDLE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Позиции полей свечи в колонках буфера
+OPEN, HIGH, LOW, CLOSE, VOLUME = range(5)
+
+
+class TimeframeResampler:
+    """Базовая серия свечей актива и производные таймфреймы"""
+
+    def __init__(self, timeframes: List[str], base_interval: str = '1m',
+                 history_seconds: int = 86400, dtype=None):
+        """
+        Args:
+            timeframes: Нужные таймфреймы (кратные base_interval)
+            base_interval: Таймфрейм базовой серии
+            history_seconds: Сколько истории хранить на каждом уровне
+            dtype: Тип значений буферов (по умолчанию AI_CANDLE_DTYPE)
+        """
+        self.base_interval = base_interval
+        base_seconds = INTERVAL_SECONDS[base_interval]
+
+        self.seconds: Dict[str, int] = {base_interval: base_seconds}
+        self.sources: Dict[str, str] = {}
+
+        # Уровни в порядке возрастания; источник - самый крупный уже
+        # добавленный уровень, на который новый делится без остатка
+        requested = {tf for tf in timeframes if tf != base_interval}
+        for timeframe in sorted(requested, key=lambda tf: INTERVAL_SECONDS.get(tf, 0)):
+            seconds = INTERVAL_SECONDS.get(timeframe)
+            if seconds is None or seconds % base_seconds:
+                logger.warning(f"⚠️ Таймфрейм {timeframe} не выводится из {base_interval} - пропущен")
+                continue
+            source = max(
+                (tf for tf in self.seconds if seconds % self.seconds[tf] == 0),
+                key=lambda tf: self.seconds[tf]
+            )
+            self.seconds[timeframe] = seconds
+            self.sources[timeframe] = source
+
+        # Фиксированные буферы на уровень; колонки индикаторов - только
+        # у анализируемых таймфреймов
+        self.buffers: Dict[str, CandleRingBuffer] = {
+            timeframe: CandleRingBuffer(
+                history_seconds // seconds + 2,
+                columns=CANDLE_COLUMNS if timeframe in timeframes else OHLCV_COLUMNS,
+                dtype=dtype
+            )
+            for timeframe, seconds in self.seconds.items()
+        }
+
+    @property
+    def timeframes(self) -> List[str]:
+        """Все доступные таймфреймы (базовый и производные)"""
+        return list(self.seconds)
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        """Метка времени последней базовой свечи"""
+        return self.buffers[self.base_interval].last_timestamp
+
+    @property
+    def nbytes(self) -> int:
+        """Память под свечи и индикаторы всех уровней (байты)"""
+        return sum(buffer.nbytes for buffer in self.buffers.values())
+
+    # ========================================
+    # ОБНОВЛЕНИЕ
+    # ========================================
+
+    def _aggregate(self, timeframe: str, since: int):
+        """Пересобрать свечи timeframe начиная со свечи, содержащей since"""
+        seconds = self.seconds[timeframe]
+        source = self.buffers[self.sources[timeframe]]
+        rows = source.since(since - since % seconds)
+        if not rows:
+            return
+
+        children = source.view(rows)
+        buckets = source.timestamps(rows)
+        buckets = buckets - buckets % seconds
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(buckets)] - 1
+
+        self.buffers[timeframe].extend(buckets[starts], np.column_stack((
+            children[starts, OPEN],
+            np.maximum.reduceat(children[:, HIGH], starts),
+            np.minimum.reduceat(children[:, LOW], starts),
+            children[ends, CLOSE],
+            np.add.reduceat(children[:, VOLUME], starts)
+        )))
+
+    def add_bars(self, timestamps, values) -> int:
+        """
+        Добавить (или обновить незакрытую) пачку базовых свечей и пересчитать
+        затронутые свечи всех старших таймфреймов
+
+        Args:
+            timestamps: Возрастающие метки времени (Unix-секунды)
+            values: Массив (свечи, 5) - Open, High, Low, Close, Volume
+
+        Returns:
+            int: Количество обработанных свечей
+        """
+        processed = self.buffers[self.base_interval].extend(timestamps, values)
+        if not processed:
+            return 0
+
+        # self.sources упорядочен по возрастанию, источник всегда обновлен раньше
+        first = int(np.asarray(timestamps)[-processed])
+        for timeframe in self.sources:
+            self._aggregate(timeframe, first)
+        return processed
+
+    def add_bar(self, timestamp: int, open_: float, high: float, low: float,
+                close: float, volume: float = 0.0):
+        """
+        Добавить (или обновить незакрытую) базовую свечу и пересчитать
+        формирующиеся свечи всех старших таймфреймов
+        """
+        self.add_bars([timestamp], [[open_, high, low, close, volume]])
+
+    def update_frame(self, df) -> int:
+        """
+        Добавить базовые свечи из DataFrame
+
+        Обрабатываются только свечи не старше последней известной
+        (она могла быть незакрытой и обновиться).
+
+        Args:
+            df: DataFrame с OHLCV и DatetimeIndex базового таймфрейма
+
+        Returns:
+            int: Количество обработанных свечей
+        """
+        if df is None or df.empty:
+            return 0
+
+        values = np.column_stack([
+            df[col].to_numpy(dtype=np.float64) if col in df else np.zeros(len(df))
+            for col in OHLCV_COLUMNS
+        ])
+        return self.add_bars(to_epoch_seconds(df.index), values)
+
+    # ========================================
+    # ЧТЕНИЕ
+    # ========================================
+
+    def buffer(self, timeframe: str) -> Optional[CandleRingBuffer]:
+        """Кольцевой буфер таймфрейма (свечи и индикаторы)"""
+        return self.buffers.get(timeframe)
+
+    def frame(self, timeframe: str, since: int = None):
+        """
+        Свечи таймфрейма как DataFrame (последняя может быть незакрытой)
+
+        Копирует данные буфера - для кода, которому нужен DataFrame.
+
+        Args:
+            timeframe: Таймфрейм
+            since: Минимальная метка времени (Unix-секунды)
+
+        Returns:
+            DataFrame с колонками OHLCV и индексом UTC или None
+        """
+        buffer = self.buffers.get(timeframe)
+        if not PANDAS_AVAILABLE or not buffer:
+            return None
+
+        rows = len(buffer) if since is None else buffer.since(since)
+        if not rows:
+            return None
+
+        df = pd.DataFrame(
+            buffer.view(rows)[:, :len(OHLCV_COLUMNS)].astype(np.float64),
+            columns=OHLCV_COLUMNS
+        )
+        df.index = pd.to_datetime(buffer.timestamps(rows), unit='s', utc=True)
+        return df
+
+    def frames(self, since: int = None) -> Dict[str, Any]:
+        """DataFrame всех таймфреймов: {timeframe: DataFrame}"""
+        result = {}
+        for timeframe in self.seconds:
+            df = self.frame(timeframe, since)
+            if df is not None:
+                result[timeframe] = df
+        return result
@@ -0,0 +1,243 @@
+"""
+signal_bus.py - Внутрипроцессная шина сигналов (publish/subscribe)
+Версия: 1.0
+Дата: 2026-10-18
+
+Обеспечивает:
+- Доставку сигнала от AI Core подписчикам сразу после генерации
+  (AutoTrader, запись в БД, webhook, уведомления Telegram)
+- Отдельную ограниченную asyncio.Queue и обработчик на каждого подписчика:
+  медленный подписчик не задерживает остальных
+- Обратное давление: политика 'block' (издатель ждет место в очереди,
+  сигналы не теряются) или 'drop_oldest' (вытесняется самый старый)
+- Подтверждение доставки (deliver): издатель ждет результата подписчиков
+  с confirm=True (например, записи в БД) и узнает, обработан ли сигнал
+- Метрики: доставлено, отброшено, ошибки, задержка публикация → обработка
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Optional, Dict, Callable, Awaitable, Any
+
+logger = logging.getLogger(__name__)
+
+# Политики переполнения очереди подписчика
+OVERFLOW_BLOCK = 'block'
+OVERFLOW_DROP_OLDEST = 'drop_oldest'
+
+SignalHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class Subscription:
+    """Подписчик шины: очередь, обработчик и метрики"""
+
+    def __init__(self, name: str, handler: SignalHandler, maxsize: int, overflow: str,
+                 confirm: bool = False):
+        self.name = name
+        self.handler = handler
+        self.overflow = overflow
+        self.confirm = confirm
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.task: Optional[asyncio.Task] = None
+
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.latencies: deque = deque(maxlen=1000)
+
+    def offer(self, item) -> bool:
+        """
+        Положить сигнал без ожидания
+
+        Returns:
+            bool: False, если очередь заполнена и политика 'block'
+        """
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            if self.overflow != OVERFLOW_DROP_OLDEST:
+                return False
+
+        _, _, dropped = self.queue.get_nowait()
+        self.queue.task_done()
+        self.dropped += 1
+        self._confirm(dropped, False)
+        self.queue.put_nowait(item)
+        return True
+
+    @staticmethod
+    def _confirm(future: Optional[asyncio.Future], delivered: bool):
+        if future is not None and not future.done():
+            future.set_result(delivered)
+
+    def cancel_pending(self):
+        """Сообщить ожидающим издателям, что сигналы из очереди не обработаны"""
+        while not self.queue.empty():
+            _, _, future = self.queue.get_nowait()
+            self.queue.task_done()
+            self._confirm(future, False)
+
+    async def run(self):
+        """Цикл обработки очереди подписчика"""
+        while True:
+            signal, published_at, future = await self.queue.get()
+            delivered = False
+            try:
+                # Обработчик подтверждающего подписчика сообщает результат:
+                # False или None - сигнал не обработан
+                result = await self.handler(signal)
+                delivered = bool(result) if self.confirm else True
+                self.delivered += 1
+                self.latencies.append(time.perf_counter() - published_at)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"❌ Подписчик {self.name}: ошибка обработки сигнала: {e}")
+            finally:
+                self._confirm(future, delivered)
+                self.queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        return {
+            'queued': self.queue.qsize(),
+            'maxsize': self.queue.maxsize,
+            'overflow': self.overflow,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'latency_p50_ms': latencies[len(latencies) // 2] * 1000 if latencies else None,
+            'latency_max_ms': latencies[-1] * 1000 if latencies else None
+        }
+
+
+class SignalBus:
+    """Шина сигналов с очередью на каждого подписчика"""
+
+    def __init__(self, default_maxsize: int = 100):
+        """
+        Args:
+            default_maxsize: Размер очереди подписчика по умолчанию
+        """
+        self.default_maxsize = default_maxsize
+        self.subscriptions: Dict[str, Subscription] = {}
+        self.published = 0
+        self._running = False
+
+    def subscribe(self, name: str, handler: SignalHandler, maxsize: int = None,
+                  overflow: str = OVERFLOW_BLOCK, confirm: bool = False) -> Subscription:
+        """
+        Подписать обработчик на сигналы
+
+        Args:
+            name: Имя подписчика (для логов и метрик)
+            handler: async-функция, принимающая сигнал
+            maxsize: Размер очереди (по умолчанию default_maxsize)
+            overflow: 'block' или 'drop_oldest'
+            confirm: Результат обработчика подтверждает доставку для deliver()
+
+        Returns:
+            Subscription
+        """
+        subscription = Subscription(name, handler, maxsize or self.default_maxsize, overflow, confirm)
+        self.subscriptions[name] = subscription
+        if self._running:
+            subscription.task = asyncio.create_task(subscription.run(), name=f'signal-bus-{name}')
+        logger.info(f"📡 Подписчик шины сигналов: {name} (очередь {subscription.queue.maxsize}, {overflow})")
+        return subscription
+
+    async def start(self):
+        """Запустить обработчики подписчиков"""
+        self._running = True
+        for subscription in self.subscriptions.values():
+            if subscription.task is None or subscription.task.done():
+                subscription.task = asyncio.create_task(
+                    subscription.run(), name=f'signal-bus-{subscription.name}'
+                )
+        logger.info(f"✅ Шина сигналов запущена ({len(self.subscriptions)} подписчиков)")
+
+    async def stop(self, drain_timeout: float = 5.0):
+        """
+        Остановить обработчики, дождавшись доставки очередей
+
+        Args:
+            drain_timeout: Сколько ждать опустошения очередей (секунды)
+        """
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(sub.queue.join() for sub in self.subscriptions.values())),
+                timeout=drain_timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning("⚠️ Шина сигналов остановлена с недоставленными сигналами")
+
+        self._running = False
+        for subscription in self.subscriptions.values():
+            if subscription.task:
+                subscription.task.cancel()
+        await asyncio.gather(
+            *(sub.task for sub in self.subscriptions.values() if sub.task),
+            return_exceptions=True
+        )
+        for subscription in self.subscriptions.values():
+            subscription.cancel_pending()
+
+    async def publish(self, signal: Dict[str, Any]) -> int:
+        """
+        Опубликовать сигнал всем подписчикам
+
+        Сначала сигнал кладется во все очереди, где есть место; затем
+        издатель ждет только заполненные очереди с политикой 'block'.
+        Каждый подписчик получает свою копию словаря сигнала.
+
+        Returns:
+            int: Количество подписчиков, в очереди которых попал сигнал
+                (не означает, что сигнал уже обработан - см. deliver)
+        """
+        return len(await self._enqueue(signal))
+
+    async def deliver(self, signal: Dict[str, Any]) -> bool:
+        """
+        Опубликовать сигнал и дождаться подтверждающих подписчиков
+
+        Returns:
+            bool: True, если все подписчики с confirm=True обработали сигнал
+                (без таких подписчиков - если сигнал попал хотя бы в одну очередь)
+        """
+        futures = await self._enqueue(signal)
+        confirmations = [future for future in futures.values() if future is not None]
+        if not confirmations:
+            return bool(futures)
+        return all(await asyncio.gather(*confirmations))
+
+    async def _enqueue(self, signal: Dict[str, Any]) -> Dict[str, Optional[asyncio.Future]]:
+        """Положить сигнал в очереди всех подписчиков: {имя: future подтверждения или None}"""
+        published_at = time.perf_counter()
+        self.published += 1
+
+        loop = asyncio.get_running_loop()
+        futures = {
+            name: loop.create_future() if subscription.confirm else None
+            for name, subscription in self.subscriptions.items()
+        }
+
+        blocked = []
+        for name, subscription in self.subscriptions.items():
+            if not subscription.offer((dict(signal), published_at, futures[name])):
+                blocked.append((name, subscription))
+
+        for name, subscription in blocked:
+            await subscription.queue.put((dict(signal), published_at, futures[name]))
+
+        return futures
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики шины и подписчиков"""
+        return {
+            'published': self.published,
+            'subscribers': {name: sub.stats() for name, sub in self.subscriptions.items()}
+        }
@@ -0,0 +1,172 @@
+"""
+signal_cooldown.py - Подавление повторных сигналов (cooldown)
+Версия: 1.0
+Дата: 2026-10-18
+
+Обеспечивает:
+- Индекс последних отправленных сигналов по ключу (symbol, timeframe, direction)
+- Подавление повторов того же направления в течение cooldown
+- Пропуск сигнала при смене направления или росте уверенности
+  (эскалации) не меньше чем на escalation пунктов
+- Вытеснение по времени истечения (куча по expires_at)
+- Восстановление индекса из недавних строк БД при старте
+"""
+
+import heapq
+import logging
+from datetime import datetime, timezone
+from typing import Optional, Dict, List, Tuple, Any
+
+from candle_store import INTERVAL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+DIRECTIONS = ('CALL', 'PUT')
+
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    """ISO-строка или datetime -> datetime с таймзоной UTC"""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+class SignalCooldownIndex:
+    """Индекс cooldown сигналов в памяти"""
+
+    def __init__(self, cooldown_bars: int = 12, escalation: float = 10.0):
+        """
+        Args:
+            cooldown_bars: Длительность cooldown в свечах таймфрейма сигнала
+                (12 свечей 5m = 1 час)
+            escalation: Рост уверенности, при котором повтор все же отправляется
+        """
+        self.cooldown_bars = cooldown_bars
+        self.escalation = escalation
+
+        # (symbol, timeframe, direction) -> (expires_at, confidence)
+        self.entries: Dict[Tuple[str, str, str], Tuple[float, float]] = {}
+        self._expiry_heap: List[Tuple[float, Tuple[str, str, str]]] = []
+
+        self.emitted = 0
+        self.suppressed = 0
+        self.escalations = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def cooldown_seconds(self, timeframe: str) -> int:
+        """Длительность cooldown для таймфрейма"""
+        return self.cooldown_bars * INTERVAL_SECONDS.get(timeframe, 300)
+
+    @staticmethod
+    def _key(signal: Dict[str, Any]) -> Tuple[str, str, str]:
+        return signal['symbol'], signal.get('timeframe', '5m'), signal['signal_type']
+
+    def evict(self, now: float):
+        """Удалить записи с истекшим cooldown"""
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry_heap)
+            entry = self.entries.get(key)
+            # В куче могут остаться устаревшие элементы перезаписанных ключей
+            if entry is not None and entry[0] == expires_at:
+                del self.entries[key]
+
+    # ========================================
+    # ПРОВЕРКА И УЧЕТ
+    # ========================================
+
+    def should_emit(self, signal: Dict[str, Any], now: float) -> bool:
+        """
+        Нужно ли отправлять сигнал
+
+        Сигнал не запоминается: record вызывается только после успешной
+        отправки, иначе неотправленный сигнал подавлял бы повторы весь cooldown.
+
+        Args:
+            signal: Сигнал (symbol, timeframe, signal_type, confidence)
+            now: Текущее время (Unix-секунды)
+
+        Returns:
+            bool: True для нового состояния или эскалации уверенности
+        """
+        self.evict(now)
+        entry = self.entries.get(self._key(signal))
+
+        if entry is None:
+            return True
+
+        if signal.get('confidence', 0) >= entry[1] + self.escalation:
+            self.escalations += 1
+            return True
+
+        self.suppressed += 1
+        return False
+
+    def record(self, signal: Dict[str, Any], now: float, count: bool = True):
+        """
+        Запомнить отправленный сигнал
+
+        Противоположное направление той же серии сбрасывается: следующий
+        разворот снова считается сменой состояния.
+        """
+        symbol, timeframe, direction = key = self._key(signal)
+        expires_at = now + self.cooldown_seconds(timeframe)
+
+        self.entries[key] = (expires_at, float(signal.get('confidence', 0)))
+        heapq.heappush(self._expiry_heap, (expires_at, key))
+
+        for other in DIRECTIONS:
+            if other != direction:
+                self.entries.pop((symbol, timeframe, other), None)
+
+        if count:
+            self.emitted += 1
+
+    # ========================================
+    # ВОССТАНОВЛЕНИЕ
+    # ========================================
+
+    def rebuild(self, rows: List[Dict[str, Any]], now: float) -> int:
+        """
+        Восстановить индекс из недавних сигналов БД
+
+        Args:
+            rows: Строки таблицы signals (symbol, timeframe, signal_type,
+                confidence, created_at) в любом порядке
+            now: Текущее время (Unix-секунды)
+
+        Returns:
+            int: Количество активных записей после восстановления
+        """
+        self.entries.clear()
+        self._expiry_heap.clear()
+
+        dated = []
+        for row in rows:
+            created_at = _parse_time(row.get('created_at') or row.get('timestamp'))
+            if created_at is None or row.get('signal_type') not in DIRECTIONS or not row.get('symbol'):
+                continue
+            dated.append((created_at.timestamp(), row))
+
+        for created_at, row in sorted(dated, key=lambda item: item[0]):
+            self.record(row, created_at, count=False)
+
+        self.evict(now)
+        logger.info(f"♻️ Индекс cooldown восстановлен: {len(self.entries)} активных записей")
+        return len(self.entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики: отправлено, подавлено, эскалаций, активных записей"""
+        return {
+            'emitted': self.emitted,
+            'suppressed': self.suppressed,
+            'escalations': self.escalations,
+            'active': len(self.entries)
+        }
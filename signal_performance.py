@@ -0,0 +1,303 @@
+"""
+signal_performance.py - Адаптивные веса сигналов по фактическим результатам
+Версия: 1.0
+Дата: 2026-10-18
+
+Обеспечивает:
+- Онлайн-обновление signal_performance за O(1) на каждый закрытый сигнал:
+  счетчики total/wins/losses, win_rate и затухающий адаптивный вес
+- Пакетную запись изменений в таблицу (по размеру пачки или по времени)
+- Вес серии (asset, timeframe) для корректировки уверенности сигналов
+  AICore: серии с серией выигрышей усиливаются, с проигрышами - ослабляются
+- Полный пересчет таблицы из signal_history одним векторизованным проходом
+
+Вес считается из экспоненциально затухающей доли выигрышей score
+(начальное значение 0.5, свежие исходы весят больше):
+    score = decay * score + (1 - decay) * (1 если win, иначе 0)
+    weight = 1 + (score - 0.5) * 2 * spread      (от 1 - spread до 1 + spread)
+
+Запуск пересчета:
+    python signal_performance.py --rebuild --db crypto_signals_bot.db
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from datetime import datetime, timezone
+from typing import Optional, Dict, List, Tuple, Any
+
+# Pandas и NumPy нужны только для пересчета из signal_history
+try:
+    import pandas as pd
+    import numpy as np
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+    pd = None
+    np = None
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signal_performance (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    asset TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    total_signals INTEGER DEFAULT 0,
+    wins INTEGER DEFAULT 0,
+    losses INTEGER DEFAULT 0,
+    win_rate REAL DEFAULT 0.0,
+    adaptive_weight REAL DEFAULT 1.0,
+    last_updated TEXT NOT NULL,
+    UNIQUE(asset, timeframe)
+);
+"""
+
+UPSERT_SQL = """
+INSERT INTO signal_performance
+    (asset, timeframe, total_signals, wins, losses, win_rate, adaptive_weight, last_updated)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(asset, timeframe) DO UPDATE SET
+    total_signals = excluded.total_signals,
+    wins = excluded.wins,
+    losses = excluded.losses,
+    win_rate = excluded.win_rate,
+    adaptive_weight = excluded.adaptive_weight,
+    last_updated = excluded.last_updated
+"""
+
+
+def normalize_timeframe(timeframe: str) -> str:
+    """Привести таймфрейм к формату yfinance ('5M' -> '5m')"""
+    return (timeframe or '5m').strip().lower()
+
+
+class SignalPerformanceTracker:
+    """Счетчики и адаптивные веса по сериям (asset, timeframe)"""
+
+    def __init__(self, db_path: str = None, decay: float = None, spread: float = 0.5,
+                 flush_size: int = 50, flush_interval: float = 30.0):
+        """
+        Args:
+            db_path: Путь к SQLite (по умолчанию CANDLE_STORE_PATH или crypto_signals_bot.db)
+            decay: Коэффициент затухания score (AI_PERFORMANCE_DECAY или 0.95)
+            spread: Максимальное отклонение веса от 1.0
+            flush_size: Запись в БД после стольких измененных серий
+            flush_interval: Запись в БД не реже чем раз в столько секунд
+        """
+        self.db_path = db_path or os.getenv('CANDLE_STORE_PATH', 'crypto_signals_bot.db')
+        self.decay = decay or float(os.getenv('AI_PERFORMANCE_DECAY', '0.95'))
+        self.spread = spread
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+
+        # (asset, timeframe) -> [total, wins, losses, score]
+        self.entries: Dict[Tuple[str, str], List[float]] = {}
+        self._dirty: set = set()
+        self._flushed_at = time.monotonic()
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+        self.load()
+
+    def close(self):
+        """Записать изменения и закрыть соединение"""
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    # ========================================
+    # ВЕС
+    # ========================================
+
+    def weight_from_score(self, score: float) -> float:
+        return 1.0 + (score - 0.5) * 2 * self.spread
+
+    def score_from_weight(self, weight: float) -> float:
+        if not self.spread:
+            return 0.5
+        return min(1.0, max(0.0, 0.5 + (weight - 1.0) / (2 * self.spread)))
+
+    def weight(self, asset: str, timeframe: str = '5m') -> float:
+        """Адаптивный вес серии (1.0 для серий без истории)"""
+        entry = self.entries.get((asset, normalize_timeframe(timeframe)))
+        return self.weight_from_score(entry[3]) if entry else 1.0
+
+    def weights(self, assets: List[str], timeframe: str = '5m') -> Dict[str, float]:
+        """Веса нескольких активов одного таймфрейма"""
+        return {asset: self.weight(asset, timeframe) for asset in assets}
+
+    # ========================================
+    # ОНЛАЙН-ОБНОВЛЕНИЕ
+    # ========================================
+
+    def record_outcome(self, asset: str, timeframe: str, result: str) -> Optional[float]:
+        """
+        Учесть результат закрытого сигнала
+
+        Args:
+            asset: Актив
+            timeframe: Таймфрейм сигнала
+            result: 'win' или 'loss' (остальные результаты не учитываются)
+
+        Returns:
+            float: Новый вес серии или None, если результат не учтен
+        """
+        if result not in ('win', 'loss'):
+            return None
+
+        key = (asset, normalize_timeframe(timeframe))
+        win = 1.0 if result == 'win' else 0.0
+
+        with self._lock:
+            entry = self.entries.setdefault(key, [0, 0, 0, 0.5])
+            entry[0] += 1
+            entry[1] += int(win)
+            entry[2] += 1 - int(win)
+            entry[3] = self.decay * entry[3] + (1 - self.decay) * win
+            self._dirty.add(key)
+            pending = len(self._dirty)
+
+        if pending >= self.flush_size or time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+        return self.weight_from_score(entry[3])
+
+    def on_signal_resolved(self, signal: Dict[str, Any]) -> Optional[float]:
+        """Учесть закрытый сигнал (symbol или asset, timeframe, result)"""
+        return self.record_outcome(
+            signal.get('symbol') or signal.get('asset'),
+            signal.get('timeframe', '5m'),
+            signal.get('result')
+        )
+
+    def _row(self, key: Tuple[str, str], now: str) -> Tuple:
+        total, wins, losses, score = self.entries[key]
+        win_rate = wins / (wins + losses) * 100 if wins + losses else 0.0
+        return (key[0], key[1], int(total), int(wins), int(losses),
+                win_rate, round(self.weight_from_score(score), 6), now)
+
+    def flush(self) -> int:
+        """
+        Записать измененные серии одним пакетом
+
+        Returns:
+            int: Количество записанных серий
+        """
+        with self._lock:
+            self._flushed_at = time.monotonic()
+            if not self._dirty:
+                return 0
+
+            now = datetime.now(timezone.utc).isoformat()
+            rows = [self._row(key, now) for key in self._dirty]
+            self._conn.executemany(UPSERT_SQL, rows)
+            self._conn.commit()
+            self._dirty.clear()
+
+        logger.info(f"💾 signal_performance: обновлено серий {len(rows)}")
+        return len(rows)
+
+    def load(self) -> int:
+        """Загрузить счетчики и веса из таблицы в память"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT asset, timeframe, total_signals, wins, losses, adaptive_weight FROM signal_performance"
+            ).fetchall()
+
+            self.entries.clear()
+            for asset, timeframe, total, wins, losses, weight in rows:
+                key = (asset, normalize_timeframe(timeframe))
+                self.entries[key] = [
+                    total or 0, wins or 0, losses or 0,
+                    self.score_from_weight(weight if weight is not None else 1.0)
+                ]
+        return len(self.entries)
+
+    # ========================================
+    # ПОЛНЫЙ ПЕРЕСЧЕТ
+    # ========================================
+
+    def rebuild(self) -> int:
+        """
+        Пересчитать signal_performance из signal_history
+
+        Затухающий score вычисляется в замкнутой форме для всех серий сразу:
+            score_n = decay^n * 0.5 + sum((1 - decay) * decay^(n-1-i) * x_i)
+
+        Returns:
+            int: Количество серий в таблице
+        """
+        if not PANDAS_AVAILABLE:
+            raise RuntimeError("Для пересчета нужны pandas и numpy")
+
+        started = time.perf_counter()
+        with self._lock:
+            df = pd.read_sql_query(
+                "SELECT asset, timeframe, result, COALESCE(close_date, signal_date) AS resolved_at "
+                "FROM signal_history WHERE result IN ('win', 'loss') AND asset IS NOT NULL",
+                self._conn
+            )
+
+        if df.empty:
+            stats = pd.DataFrame(columns=['asset', 'timeframe', 'total', 'wins', 'score'])
+        else:
+            df['timeframe'] = df['timeframe'].map(normalize_timeframe)
+            df['resolved_at'] = pd.to_datetime(df['resolved_at'], format='mixed', errors='coerce')
+            df = df.sort_values('resolved_at', kind='stable', na_position='first')
+            df['x'] = (df['result'] == 'win').astype(np.float64)
+
+            groups = df.groupby(['asset', 'timeframe'], sort=False)
+            position = groups.cumcount().to_numpy()
+            size = groups['x'].transform('size').to_numpy()
+            df['contribution'] = (1 - self.decay) * np.power(self.decay, size - 1 - position) * df['x'].to_numpy()
+
+            stats = groups.agg(total=('x', 'size'), wins=('x', 'sum'), contribution=('contribution', 'sum')).reset_index()
+            stats['score'] = np.power(self.decay, stats['total']) * 0.5 + stats['contribution']
+
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            self.entries = {
+                (row.asset, row.timeframe): [int(row.total), int(row.wins), int(row.total - row.wins), float(row.score)]
+                for row in stats.itertuples(index=False)
+            }
+            self._dirty.clear()
+            self._conn.execute("DELETE FROM signal_performance")
+            self._conn.executemany(UPSERT_SQL, [self._row(key, now) for key in self.entries])
+            self._conn.commit()
+
+        logger.info(
+            f"♻️ signal_performance пересчитана: {len(self.entries)} серий "
+            f"из {len(df)} сигналов ({time.perf_counter() - started:.3f}с)"
+        )
+        return len(self.entries)
+
+
+def main():
+    """Пересчет signal_performance из командной строки"""
+    parser = argparse.ArgumentParser(description='Адаптивные веса сигналов (signal_performance)')
+    parser.add_argument('--db', default=None, help='Путь к SQLite базе')
+    parser.add_argument('--decay', type=float, default=None, help='Коэффициент затухания')
+    parser.add_argument('--rebuild', action='store_true', help='Пересчитать из signal_history')
+    args = parser.parse_args()
+
+    tracker = SignalPerformanceTracker(db_path=args.db, decay=args.decay)
+    if args.rebuild:
+        tracker.rebuild()
+
+    for (asset, timeframe), (total, wins, losses, score) in sorted(tracker.entries.items()):
+        logger.info(
+            f"  {asset} {timeframe}: {total} сигн., {wins}/{losses}, "
+            f"вес {tracker.weight_from_score(score):.3f}"
+        )
+    tracker.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
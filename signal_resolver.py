@@ -0,0 +1,270 @@
+"""
+signal_resolver.py - Пакетное закрытие сигналов по цене экспирации
+Версия: 1.0
+Дата: 2026-10-18
+
+Обеспечивает:
+- Фоновую проверку открытых сигналов (result не заполнен), срок
+  экспирации которых наступил
+- Группировку сигналов по (актив, свеча экспирации): цена закрытия
+  ищется один раз на группу, свечи актива читаются одним запросом
+- Пакетную запись результатов: один UPDATE ... WHERE id IN (...) на
+  каждый исход (win / loss / draw), а не запрос на строку
+- Закрытие сигналов без данных о цене как 'skipped' по истечении max_age,
+  а сигналов без актива или с нечитаемым created_at - сразу
+- Чтение открытых сигналов страницами по курсору id: сигналы, которые
+  пока нельзя закрыть, не вытесняют из выборки более новые
+- Передачу закрытых сигналов в адаптивные веса (signal_performance)
+
+Экспирация сигнала - expiry_bars свечей его таймфрейма от created_at,
+цена экспирации - Close последней базовой свечи, закрытой к этому моменту.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Dict, List, Tuple, Callable, Any
+
+import numpy as np
+
+from candle_store import INTERVAL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Выплата брокера за выигрыш (доля ставки), как в backtester.py
+DEFAULT_PAYOUT = 0.92
+
+# Результат -> profit_loss в долях ставки (win заполняется по payout)
+RESULT_PNL = {'loss': -1.0, 'draw': 0.0, 'skipped': 0.0}
+
+# (timestamps, closes) базовых свечей актива начиная с since
+PriceSource = Callable[[str, int], Optional[Tuple[np.ndarray, np.ndarray]]]
+
+
+def _parse_time(value: Any) -> Optional[float]:
+    """ISO-строка или datetime -> Unix-секунды"""
+    if isinstance(value, datetime):
+        parsed = value
+    elif value:
+        try:
+            parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    else:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class SignalOutcomeResolver:
+    """Фоновое закрытие сигналов с наступившей экспирацией"""
+
+    def __init__(self, db_manager, price_source: PriceSource, base_interval: str = '1m',
+                 payout: float = None, expiry_bars: int = 1, batch_size: int = 5000,
+                 max_age: float = 86400, on_resolved: Callable[[Dict[str, Any]], Any] = None,
+                 clock=None):
+        """
+        Args:
+            db_manager: Экземпляр DatabaseManager
+            price_source: Функция (symbol, since) -> (timestamps, closes) базовых
+                свечей, например AICore.get_close_series
+            base_interval: Таймфрейм свечей price_source
+            payout: Выплата за выигрыш (SIGNAL_PAYOUT или 0.92)
+            expiry_bars: Экспирация в свечах таймфрейма сигнала
+            batch_size: Сколько открытых сигналов читать за проход (страница)
+            max_age: Через сколько секунд после экспирации сигнал без цены
+                закрывается как 'skipped'
+            on_resolved: Вызывается для каждого закрытого win/loss сигнала
+            clock: Источник времени с now() (MarketDataProvider); по умолчанию UTC
+        """
+        self.db_manager = db_manager
+        self.price_source = price_source
+        self.base_seconds = INTERVAL_SECONDS.get(base_interval, 60)
+        self.payout = payout if payout is not None else float(os.getenv('SIGNAL_PAYOUT', str(DEFAULT_PAYOUT)))
+        self.expiry_bars = expiry_bars
+        self.batch_size = batch_size
+        self.max_age = max_age
+        self.on_resolved = on_resolved
+        self.clock = clock
+
+        self.interval = float(os.getenv('SIGNAL_RESOLVE_INTERVAL', '30'))
+        # id последнего прочитанного сигнала; None - следующий проход с начала
+        self.cursor: Optional[int] = None
+        self.resolved = 0
+        self.skipped = 0
+
+    def now(self) -> datetime:
+        return self.clock.now() if self.clock else datetime.now(timezone.utc)
+
+    def expiry_seconds(self, timeframe: str) -> int:
+        return self.expiry_bars * INTERVAL_SECONDS.get((timeframe or '5m').lower(), 300)
+
+    # ========================================
+    # РАЗРЕШЕНИЕ
+    # ========================================
+
+    def _group(self, signals: List[Dict[str, Any]], now: float,
+               invalid: List[Dict[str, Any]]) -> Dict[str, Dict[int, List[Dict[str, Any]]]]:
+        """
+        Сгруппировать сигналы с наступившей экспирацией
+
+        Args:
+            signals: Открытые сигналы
+            now: Текущее время (Unix-секунды)
+            invalid: Сюда добавляются сигналы, которые закрыть нельзя
+                (нет актива или created_at не читается)
+
+        Returns:
+            Dict: {symbol: {метка свечи экспирации: [сигналы]}}
+        """
+        groups: Dict[str, Dict[int, List[Dict[str, Any]]]] = {}
+        for signal in signals:
+            created_at = _parse_time(signal.get('created_at'))
+            if created_at is None or not signal.get('symbol'):
+                invalid.append(signal)
+                continue
+            expires_at = created_at + self.expiry_seconds(signal.get('timeframe'))
+            if expires_at > now:
+                continue
+
+            # Последняя базовая свеча, закрытая к моменту экспирации
+            candle = int(expires_at // self.base_seconds) * self.base_seconds - self.base_seconds
+            signal['_expires_at'] = expires_at
+            groups.setdefault(signal['symbol'], {}).setdefault(candle, []).append(signal)
+        return groups
+
+    def _outcome(self, signal: Dict[str, Any], exit_price: float) -> str:
+        entry = float(signal.get('entry_price') or 0)
+        if exit_price == entry:
+            return 'draw'
+        up = exit_price > entry
+        return 'win' if up == (signal.get('signal_type') == 'CALL') else 'loss'
+
+    def resolve_batch(self, signals: List[Dict[str, Any]], now: float) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Определить исходы сигналов (без записи в БД)
+
+        Args:
+            signals: Открытые сигналы (id, symbol, signal_type, entry_price,
+                timeframe, created_at)
+            now: Текущее время (Unix-секунды)
+
+        Returns:
+            Dict: {результат: [сигналы]}
+        """
+        outcomes: Dict[str, List[Dict[str, Any]]] = {}
+        invalid: List[Dict[str, Any]] = []
+
+        for symbol, by_candle in self._group(signals, now, invalid).items():
+            # Свечи актива - одним чтением от самой ранней нужной свечи
+            series = self.price_source(symbol, min(by_candle))
+            timestamps, closes = series if series is not None else (np.empty(0), np.empty(0))
+
+            if len(timestamps):
+                candles = np.fromiter(by_candle, dtype=np.int64, count=len(by_candle))
+                positions = np.searchsorted(timestamps, candles, side='right') - 1
+            last = timestamps[-1] if len(timestamps) else None
+
+            for i, (candle, group) in enumerate(by_candle.items()):
+                # Свеча экспирации считается закрытой, когда есть свеча новее
+                if last is not None and last > candle and positions[i] >= 0:
+                    exit_price = float(closes[positions[i]])
+                    for signal in group:
+                        signal['exit_price'] = exit_price
+                        outcomes.setdefault(self._outcome(signal, exit_price), []).append(signal)
+                else:
+                    for signal in group:
+                        if now - signal['_expires_at'] > self.max_age:
+                            outcomes.setdefault('skipped', []).append(signal)
+
+        # Без актива или времени создания сигнал не закроется никогда
+        if invalid:
+            logger.warning(f"⚠️ Сигналы без актива или времени создания закрыты как skipped: {len(invalid)}")
+            outcomes.setdefault('skipped', []).extend(invalid)
+
+        return outcomes
+
+    def resolve_once(self) -> Dict[str, int]:
+        """
+        Один проход: прочитать страницу открытых сигналов, закрыть и записать
+        результаты
+
+        Страница начинается после self.cursor; неполная страница значит, что
+        открытые сигналы просмотрены до конца, и следующий проход начнется
+        с самых старых.
+
+        Returns:
+            Dict: {результат: количество}
+        """
+        now = self.now()
+        min_expiry = self.expiry_bars * min(INTERVAL_SECONDS.values())
+        signals = self.db_manager.get_open_signals(
+            before=now - timedelta(seconds=min_expiry), limit=self.batch_size, after_id=self.cursor
+        )
+        self.cursor = signals[-1]['id'] if len(signals) >= self.batch_size else None
+        if not signals:
+            return {}
+
+        outcomes = self.resolve_batch(signals, now.timestamp())
+        closed_at = now.isoformat()
+        counts = {}
+
+        # Все исходы прохода - одним вызовом (по UPDATE на исход)
+        written = self.db_manager.update_signal_outcomes(
+            {
+                result: ([signal['id'] for signal in group], self.payout if result == 'win' else RESULT_PNL[result])
+                for result, group in outcomes.items()
+            },
+            close_date=closed_at,
+            signals=[signal for group in outcomes.values() for signal in group]
+        )
+
+        for result, group in outcomes.items():
+            if not written.get(result):
+                continue
+
+            ids = [signal['id'] for signal in group]
+            counts[result] = len(ids)
+            if result == 'skipped':
+                self.skipped += len(ids)
+                continue
+
+            self.resolved += len(ids)
+            if self.on_resolved:
+                for signal in group:
+                    signal['result'] = result
+                    self.on_resolved(signal)
+
+        if counts:
+            logger.info(f"🏁 Закрыто сигналов: {counts}")
+        return counts
+
+    async def run(self):
+        """
+        Бесконечный цикл закрытия сигналов
+        Вызывается из main.py через asyncio.gather
+        """
+        logger.info("🏁 Запуск цикла закрытия сигналов...")
+
+        while True:
+            try:
+                started = time.perf_counter()
+                # Запросы к БД синхронные - выполняем в потоке
+                await asyncio.to_thread(self.resolve_once)
+
+                # Полная страница - есть еще сигналы: следующий проход сразу
+                if self.cursor is not None:
+                    logger.info(f"⏩ Догоняем очередь сигналов ({time.perf_counter() - started:.2f}с на пачку)")
+                    continue
+
+                if self.clock:
+                    await self.clock.sleep(self.interval)
+                else:
+                    await asyncio.sleep(self.interval)
+
+            except Exception as e:
+                logger.error(f"❌ Ошибка в цикле закрытия сигналов: {e}")
+                await asyncio.sleep(60)
@@ -0,0 +1,385 @@
+"""
+streaming_indicators.py - Потоковый расчет технических индикаторов
+Версия: 1.0
+Дата: 2026-10-18
+
+Обеспечивает:
+- Инкрементальное обновление RSI, MACD, Bollinger Bands, EMA и Stochastic
+  за O(1) на каждую новую свечу (без пересчета всего DataFrame)
+- Отдельное состояние на каждую серию (symbol, timeframe)
+- Корректную обработку незакрытой свечи (повторное обновление той же метки времени)
+- Результаты, совпадающие с библиотекой ta (те же формулы и периоды прогрева)
+- Запись индикаторов прямо в кольцевой буфер свечей (apply_buffer)
+"""
+
+import math
+import logging
+from collections import deque
+from typing import Optional, Dict, List, Tuple, Any
+
+# Pandas и NumPy - опциональные (нужны только для работы с DataFrame)
+try:
+    import pandas as pd
+    import numpy as np
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+    pd = None
+    np = None
+
+logger = logging.getLogger(__name__)
+
+NAN = float('nan')
+
+# Колонки, которые добавляет calculate_indicators (порядок важен)
+INDICATOR_COLUMNS = [
+    'RSI',
+    'MACD', 'MACD_signal', 'MACD_diff',
+    'BB_upper', 'BB_middle', 'BB_lower',
+    'EMA_12', 'EMA_26',
+    'Stoch_K', 'Stoch_D'
+]
+
+
+class IndicatorState:
+    """
+    Состояние индикаторов одной серии свечей
+
+    Формулы повторяют библиотеку ta:
+    - EMA: ewm(span=n, adjust=False), значения с n-й свечи
+    - RSI: ewm(alpha=1/14, adjust=False) по росту/падению, значения с 14-й свечи
+    - MACD: EMA12 - EMA26, сигнальная линия EMA9 от MACD
+    - Bollinger: SMA20 ± 2 * std(ddof=0)
+    - Stochastic: %K по окну 14, %D = SMA3 от %K
+    """
+
+    RSI_WINDOW = 14
+    MACD_FAST = 12
+    MACD_SLOW = 26
+    MACD_SIGNAL = 9
+    BB_WINDOW = 20
+    BB_DEV = 2
+    STOCH_WINDOW = 14
+    STOCH_SMOOTH = 3
+
+    def __init__(self, history_size: int = 288):
+        """
+        Args:
+            history_size: Сколько последних значений индикаторов хранить
+                (288 = сутки пятиминутных свечей)
+        """
+        self.history: deque = deque(maxlen=history_size)
+        self._reset()
+
+    def _reset(self):
+        """Сбросить состояние к холодному старту"""
+        self.count = 0
+        self.last_timestamp = None
+        self.prev_close = None
+
+        # RSI: сглаженные рост/падение
+        self.rsi_up = NAN
+        self.rsi_down = NAN
+
+        # EMA12 / EMA26 и сигнальная линия MACD
+        self.ema_fast = NAN
+        self.ema_slow = NAN
+        self.macd_signal = NAN
+        self.macd_count = 0
+
+        # Окно Bollinger
+        self.bb_window: deque = deque(maxlen=self.BB_WINDOW)
+
+        # Монотонные очереди (index, value) для max(High) / min(Low)
+        self.stoch_max: deque = deque()
+        self.stoch_min: deque = deque()
+        self.stoch_k_window: deque = deque(maxlen=self.STOCH_SMOOTH)
+
+        self.history.clear()
+        self._snapshot = None
+
+    # ========================================
+    # СНИМОК СОСТОЯНИЯ (для незакрытой свечи)
+    # ========================================
+
+    def _take_snapshot(self) -> Tuple:
+        return (
+            self.count, self.last_timestamp, self.prev_close,
+            self.rsi_up, self.rsi_down,
+            self.ema_fast, self.ema_slow, self.macd_signal, self.macd_count,
+            deque(self.bb_window, maxlen=self.BB_WINDOW),
+            deque(self.stoch_max), deque(self.stoch_min),
+            deque(self.stoch_k_window, maxlen=self.STOCH_SMOOTH)
+        )
+
+    def _restore_snapshot(self, snapshot: Tuple):
+        (
+            self.count, self.last_timestamp, self.prev_close,
+            self.rsi_up, self.rsi_down,
+            self.ema_fast, self.ema_slow, self.macd_signal, self.macd_count,
+            self.bb_window, self.stoch_max, self.stoch_min, self.stoch_k_window
+        ) = snapshot
+
+    # ========================================
+    # ОБНОВЛЕНИЕ
+    # ========================================
+
+    @staticmethod
+    def _ewm(prev: float, value: float, alpha: float) -> float:
+        """Шаг ewm(adjust=False): первое значение берется как есть"""
+        if math.isnan(prev):
+            return value
+        return prev + alpha * (value - prev)
+
+    def update(self, timestamp: Any, high: float, low: float, close: float) -> Dict[str, float]:
+        """
+        Добавить свечу (или обновить последнюю, если метка времени совпадает)
+
+        Args:
+            timestamp: Метка времени свечи
+            high: Максимум свечи
+            low: Минимум свечи
+            close: Цена закрытия
+
+        Returns:
+            Dict: Значения индикаторов для этой свечи
+        """
+        if self.last_timestamp is not None and timestamp == self.last_timestamp:
+            # Незакрытая свеча обновилась - откатываемся и пересчитываем
+            self._restore_snapshot(self._snapshot)
+            if self.history:
+                self.history.pop()
+
+        self._snapshot = self._take_snapshot()
+
+        index = self.count
+        self.count += 1
+        self.last_timestamp = timestamp
+
+        # RSI
+        diff = close - self.prev_close if self.prev_close is not None else NAN
+        up = diff if diff > 0 else 0.0
+        down = -diff if diff < 0 else 0.0
+        alpha = 1.0 / self.RSI_WINDOW
+        self.rsi_up = self._ewm(self.rsi_up, up, alpha)
+        self.rsi_down = self._ewm(self.rsi_down, down, alpha)
+        self.prev_close = close
+
+        if self.count < self.RSI_WINDOW:
+            rsi = NAN
+        elif self.rsi_down == 0:
+            rsi = 100.0
+        else:
+            rsi = 100.0 - 100.0 / (1.0 + self.rsi_up / self.rsi_down)
+
+        # EMA и MACD
+        self.ema_fast = self._ewm(self.ema_fast, close, 2.0 / (self.MACD_FAST + 1))
+        self.ema_slow = self._ewm(self.ema_slow, close, 2.0 / (self.MACD_SLOW + 1))
+        ema_12 = self.ema_fast if self.count >= self.MACD_FAST else NAN
+        ema_26 = self.ema_slow if self.count >= self.MACD_SLOW else NAN
+
+        macd = ema_12 - ema_26
+        macd_signal = NAN
+        if not math.isnan(macd):
+            self.macd_signal = self._ewm(self.macd_signal, macd, 2.0 / (self.MACD_SIGNAL + 1))
+            self.macd_count += 1
+            if self.macd_count >= self.MACD_SIGNAL:
+                macd_signal = self.macd_signal
+
+        # Bollinger Bands
+        self.bb_window.append(close)
+        if len(self.bb_window) == self.BB_WINDOW:
+            bb_middle = sum(self.bb_window) / self.BB_WINDOW
+            variance = sum((x - bb_middle) ** 2 for x in self.bb_window) / self.BB_WINDOW
+            deviation = self.BB_DEV * math.sqrt(variance)
+            bb_upper = bb_middle + deviation
+            bb_lower = bb_middle - deviation
+        else:
+            bb_middle = bb_upper = bb_lower = NAN
+
+        # Stochastic Oscillator
+        while self.stoch_max and self.stoch_max[-1][1] <= high:
+            self.stoch_max.pop()
+        self.stoch_max.append((index, high))
+        while self.stoch_min and self.stoch_min[-1][1] >= low:
+            self.stoch_min.pop()
+        self.stoch_min.append((index, low))
+
+        window_start = index - self.STOCH_WINDOW + 1
+        while self.stoch_max[0][0] < window_start:
+            self.stoch_max.popleft()
+        while self.stoch_min[0][0] < window_start:
+            self.stoch_min.popleft()
+
+        stoch_k = NAN
+        if self.count >= self.STOCH_WINDOW:
+            highest = self.stoch_max[0][1]
+            lowest = self.stoch_min[0][1]
+            if highest != lowest:
+                stoch_k = 100.0 * (close - lowest) / (highest - lowest)
+
+        self.stoch_k_window.append(stoch_k)
+        if len(self.stoch_k_window) == self.STOCH_SMOOTH:
+            stoch_d = sum(self.stoch_k_window) / self.STOCH_SMOOTH
+        else:
+            stoch_d = NAN
+
+        values = {
+            'RSI': rsi,
+            'MACD': macd,
+            'MACD_signal': macd_signal,
+            'MACD_diff': macd - macd_signal,
+            'BB_upper': bb_upper,
+            'BB_middle': bb_middle,
+            'BB_lower': bb_lower,
+            'EMA_12': ema_12,
+            'EMA_26': ema_26,
+            'Stoch_K': stoch_k,
+            'Stoch_D': stoch_d
+        }
+
+        self.history.append((timestamp, [values[col] for col in INDICATOR_COLUMNS]))
+        return values
+
+
+class StreamingIndicatorEngine:
+    """Набор состояний индикаторов по ключу (symbol, timeframe)"""
+
+    def __init__(self, history_size: int = 288):
+        """
+        Args:
+            history_size: Глубина истории значений индикаторов на серию
+        """
+        self.history_size = history_size
+        self.states: Dict[Tuple[str, str], IndicatorState] = {}
+
+    def get_state(self, symbol: str, timeframe: str) -> IndicatorState:
+        """Получить (или создать) состояние серии"""
+        key = (symbol, timeframe)
+        state = self.states.get(key)
+        if state is None:
+            state = IndicatorState(history_size=self.history_size)
+            self.states[key] = state
+        return state
+
+    def reset(self, symbol: str, timeframe: str = None):
+        """Сбросить состояние серии (или всех таймфреймов актива)"""
+        for key in list(self.states):
+            if key[0] == symbol and (timeframe is None or key[1] == timeframe):
+                del self.states[key]
+
+    def apply_frame(self, symbol: str, timeframe: str, df):
+        """
+        Обновить состояние свечами из DataFrame и записать индикаторы в него
+
+        Если состояние уже видело часть свечей, обрабатываются только новые
+        (начиная с последней известной - она могла быть незакрытой).
+        Если между состоянием и данными есть разрыв, выполняется холодный
+        старт: состояние пересобирается по всему DataFrame.
+
+        Args:
+            symbol: Символ актива
+            timeframe: Таймфрейм серии
+            df: DataFrame с колонками High, Low, Close
+
+        Returns:
+            DataFrame с добавленными колонками индикаторов
+        """
+        if df is None or df.empty:
+            return df
+
+        state = self.get_state(symbol, timeframe)
+        index = df.index
+
+        start = None
+        if state.last_timestamp is not None:
+            position = index.searchsorted(state.last_timestamp)
+            if position < len(index) and index[position] == state.last_timestamp:
+                start = position
+
+        if start is None:
+            if state.count:
+                logger.info(f"♻️ Холодный старт индикаторов для {symbol} {timeframe}")
+            state._reset()
+            start = 0
+
+        highs = df['High'].to_numpy(dtype=float)
+        lows = df['Low'].to_numpy(dtype=float)
+        closes = df['Close'].to_numpy(dtype=float)
+
+        for i in range(start, len(index)):
+            state.update(index[i], highs[i], lows[i], closes[i])
+
+        timestamps = [item[0] for item in state.history]
+        values = [item[1] for item in state.history]
+        history = pd.DataFrame(values, index=timestamps, columns=INDICATOR_COLUMNS)
+        aligned = history.reindex(index)
+        for column in INDICATOR_COLUMNS:
+            df[column] = aligned[column].to_numpy()
+
+        return df
+
+    def apply_buffer(self, symbol: str, timeframe: str, buffer) -> int:
+        """
+        Обновить состояние свечами кольцевого буфера и записать индикаторы
+        в его строки на место (без DataFrame)
+
+        Правила продолжения и холодного старта - как в apply_frame.
+
+        Args:
+            symbol: Символ актива
+            timeframe: Таймфрейм серии
+            buffer: candle_buffer.CandleRingBuffer с колонками индикаторов
+
+        Returns:
+            int: Количество обработанных свечей
+        """
+        if not len(buffer):
+            return 0
+
+        state = self.get_state(symbol, timeframe)
+        timestamps = buffer.timestamps()
+
+        start = None
+        if state.last_timestamp is not None:
+            position = int(np.searchsorted(timestamps, state.last_timestamp))
+            if position < len(timestamps) and timestamps[position] == state.last_timestamp:
+                start = position
+
+        if start is None:
+            if state.count:
+                logger.info(f"♻️ Холодный старт индикаторов для {symbol} {timeframe}")
+            state._reset()
+            start = 0
+
+        view = buffer.view()
+        high = view[:, buffer.positions['High']].tolist()
+        low = view[:, buffer.positions['Low']].tolist()
+        close = view[:, buffer.positions['Close']].tolist()
+        first = buffer.positions[INDICATOR_COLUMNS[0]]
+        columns = slice(first, first + len(INDICATOR_COLUMNS))
+
+        for i in range(start, len(timestamps)):
+            values = state.update(int(timestamps[i]), high[i], low[i], close[i])
+            buffer.write(i, columns, [values[col] for col in INDICATOR_COLUMNS])
+
+        return len(timestamps) - start
+
+
+def indicators_match(df_left, df_right, rows: int = 1, rtol: float = 1e-6, atol: float = 1e-8) -> bool:
+    """
+    Сравнить индикаторы двух DataFrame (последние rows строк)
+
+    Используется для проверки потокового расчета против полного пересчета.
+    NaN в обоих DataFrame считаются совпадением.
+
+    Returns:
+        bool: True если значения совпадают в пределах допуска
+    """
+    columns = [col for col in INDICATOR_COLUMNS if col in df_left and col in df_right]
+    if not columns:
+        return False
+
+    left = df_left[columns].iloc[-rows:].to_numpy(dtype=float)
+    right = df_right[columns].iloc[-rows:].to_numpy(dtype=float)
+    return bool(np.allclose(left, right, rtol=rtol, atol=atol, equal_nan=True))
@@ -13,10 +13,12 @@ ui_handlers.py - UI обработчики для клиентов
 
 import logging
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, List, Any
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
+from db_manager import as_async
+
 logger = logging.getLogger(__name__)
 
 # Константы тарифов
@@ -51,16 +53,18 @@ SUBSCRIPTION_PLANS = {
 class UIHandlers:
     """Обработчики UI для клиентов"""
     
-    def __init__(self, db_manager=None, pocket_api=None):
+    def __init__(self, db_manager=None, pocket_api=None, ai_core=None):
         """
         Инициализация UIHandlers
         
         Args:
-            db_manager: Экземпляр DatabaseManager
+            db_manager: DatabaseManager или AsyncDatabaseManager
             pocket_api: Экземпляр PocketOptionAPI
+            ai_core: Экземпляр AICore (сигналы /short и /long по индикаторам)
         """
-        self.db_manager = db_manager
+        self.db_manager = as_async(db_manager)
         self.pocket_api = pocket_api
+        self.ai_core = ai_core
         
         logger.info("✅ UIHandlers инициализирован")
     
@@ -74,12 +78,12 @@ class UIHandlers:
         
         # Создаем или получаем пользователя
         if self.db_manager:
-            self.db_manager.get_or_create_user(
+            await self.db_manager.get_or_create_user(
                 user_id=user.id,
                 username=user.username,
                 first_name=user.first_name
             )
-            self.db_manager.log_command(user.id, 'start')
+            await self.db_manager.log_command(user.id, 'start')
         
         keyboard = [
             [InlineKeyboardButton("💎 Тарифы и подписки", callback_data='plans')],
@@ -122,7 +126,7 @@ class UIHandlers:
         user = update.effective_user
         
         if self.db_manager:
-            self.db_manager.log_command(user.id, 'plans')
+            await self.db_manager.log_command(user.id, 'plans')
         
         keyboard = []
         
@@ -157,8 +161,8 @@ class UIHandlers:
         user = update.effective_user
         
         if self.db_manager:
-            self.db_manager.log_command(user.id, 'bank')
-            user_data = self.db_manager.get_user(user.id)
+            await self.db_manager.log_command(user.id, 'bank')
+            user_data = await self.db_manager.get_user(user.id)
         else:
             user_data = None
         
@@ -200,10 +204,10 @@ class UIHandlers:
         user = update.effective_user
         
         if self.db_manager:
-            self.db_manager.log_command(user.id, 'autotrade')
+            await self.db_manager.log_command(user.id, 'autotrade')
             
             # Проверяем VIP подписку
-            has_vip = self.db_manager.check_subscription(user.id, 'vip')
+            has_vip = await self.db_manager.check_subscription(user.id, 'vip')
             
             if not has_vip:
                 text = (
@@ -222,7 +226,7 @@ class UIHandlers:
                 return
             
             # Проверяем статус автоторговли
-            user_data = self.db_manager.get_user(user.id)
+            user_data = await self.db_manager.get_user(user.id)
             auto_trading_enabled = user_data.get('auto_trading_enabled', False) if user_data else False
             
             status_text = "✅ Включена" if auto_trading_enabled else "❌ Отключена"
@@ -257,7 +261,7 @@ class UIHandlers:
         user = update.effective_user
         
         if self.db_manager:
-            self.db_manager.log_command(user.id, 'settings')
+            await self.db_manager.log_command(user.id, 'settings')
         
         keyboard = [
             [InlineKeyboardButton("🌍 Язык", callback_data='settings_language')],
@@ -281,11 +285,11 @@ class UIHandlers:
         user = update.effective_user
         
         if self.db_manager:
-            self.db_manager.log_command(user.id, 'short')
+            await self.db_manager.log_command(user.id, 'short')
             
             # Проверяем подписку
-            has_subscription = self.db_manager.check_subscription(user.id, 'short') or \
-                              self.db_manager.check_subscription(user.id, 'vip')
+            has_subscription = await self.db_manager.check_subscription(user.id, 'short') or \
+                              await self.db_manager.check_subscription(user.id, 'vip')
             
             if not has_subscription:
                 text = (
@@ -303,16 +307,19 @@ class UIHandlers:
                 await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
                 return
         
-        # Генерируем сигнал (заглушка)
-        text = (
-            "⚡ **SHORT СИГНАЛ**\n\n"
-            "📊 Актив: BTC/USD\n"
-            "📈 Направление: 🟢 CALL\n"
-            "⏱️ Время: 5 минут\n"
-            "💰 Ставка: $100\n"
-            "🎯 Уверенность: 75%\n\n"
-            "⚠️ Не является финансовой рекомендацией."
-        )
+        if self.ai_core:
+            text = await self.build_ai_signal_text("⚡ **SHORT СИГНАЛ**", '5m')
+        else:
+            # Генерируем сигнал (заглушка)
+            text = (
+                "⚡ **SHORT СИГНАЛ**\n\n"
+                "📊 Актив: BTC/USD\n"
+                "📈 Направление: 🟢 CALL\n"
+                "⏱️ Время: 5 минут\n"
+                "💰 Ставка: $100\n"
+                "🎯 Уверенность: 75%\n\n"
+                "⚠️ Не является финансовой рекомендацией."
+            )
         
         keyboard = [[InlineKeyboardButton("⬅️ Назад", callback_data='menu')]]
         reply_markup = InlineKeyboardMarkup(keyboard)
@@ -324,21 +331,24 @@ class UIHandlers:
         user = update.effective_user
         
         if self.db_manager:
-            self.db_manager.log_command(user.id, 'long')
+            await self.db_manager.log_command(user.id, 'long')
             
             # LONG сигналы доступны всем (FREE)
             pass
         
-        # Генерируем сигнал (заглушка)
-        text = (
-            "🔵 **LONG СИГНАЛ**\n\n"
-            "📊 Актив: ETH/USD\n"
-            "📈 Направление: 🔴 PUT\n"
-            "⏱️ Время: 1 час\n"
-            "💰 Ставка: 2.5% от банка\n"
-            "🎯 Уверенность: 68%\n\n"
-            "⚠️ Не является финансовой рекомендацией."
-        )
+        if self.ai_core:
+            text = await self.build_ai_signal_text("🔵 **LONG СИГНАЛ**", '1h')
+        else:
+            # Генерируем сигнал (заглушка)
+            text = (
+                "🔵 **LONG СИГНАЛ**\n\n"
+                "📊 Актив: ETH/USD\n"
+                "📈 Направление: 🔴 PUT\n"
+                "⏱️ Время: 1 час\n"
+                "💰 Ставка: 2.5% от банка\n"
+                "🎯 Уверенность: 68%\n\n"
+                "⚠️ Не является финансовой рекомендацией."
+            )
         
         keyboard = [[InlineKeyboardButton("⬅️ Назад", callback_data='menu')]]
         reply_markup = InlineKeyboardMarkup(keyboard)
@@ -350,8 +360,8 @@ class UIHandlers:
         user = update.effective_user
         
         if self.db_manager:
-            self.db_manager.log_command(user.id, 'my_longs')
-            signals = self.db_manager.get_user_signals(user.id, limit=10)
+            await self.db_manager.log_command(user.id, 'my_longs')
+            signals = await self.db_manager.get_user_signals(user.id, limit=10)
         else:
             signals = []
         
@@ -379,8 +389,8 @@ class UIHandlers:
         user = update.effective_user
         
         if self.db_manager:
-            self.db_manager.log_command(user.id, 'my_stats')
-            stats = self.db_manager.get_user_stats(user.id)
+            await self.db_manager.log_command(user.id, 'my_stats')
+            stats = await self.db_manager.get_user_stats(user.id)
         else:
             stats = {}
         
@@ -390,14 +400,34 @@ class UIHandlers:
             f"✅ Выигрышей: {stats.get('wins', 0)}\n"
             f"❌ Проигрышей: {stats.get('losses', 0)}\n"
             f"📊 Винрейт: {stats.get('win_rate', 0):.1f}%\n"
-            f"💰 Прибыль: ${stats.get('total_profit', 0):.2f}"
+            f"💰 Прибыль: ${stats.get('total_profit', 0):.2f}\n"
+            f"🔥 Серия: {self.format_streak(stats.get('current_streak', 0))} "
+            f"(рекорд: {stats.get('best_win_streak', 0)} ✅ / {stats.get('worst_loss_streak', 0)} ❌)"
         )
         
+        by_asset = stats.get('by_asset') or {}
+        if by_asset:
+            text += "\n\n**По активам:**\n"
+            for asset, entry in list(by_asset.items())[:5]:
+                text += (
+                    f"• {asset}: {entry['total']} сигн., винрейт {entry['win_rate']:.0f}%, "
+                    f"${entry['profit']:.2f}\n"
+                )
+        
         keyboard = [[InlineKeyboardButton("⬅️ Назад", callback_data='menu')]]
         reply_markup = InlineKeyboardMarkup(keyboard)
         
         await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
     
+    @staticmethod
+    def format_streak(streak: int) -> str:
+        """Текущая серия: +3 -> '3 ✅ подряд', -2 -> '2 ❌ подряд'"""
+        if streak > 0:
+            return f"{streak} ✅ подряд"
+        if streak < 0:
+            return f"{-streak} ❌ подряд"
+        return "нет"
+    
     async def handle_help(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Обработчик команды /help - Помощь"""
         text = (
@@ -418,6 +448,79 @@ class UIHandlers:
         
         await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
     
+    async def build_ai_signal_text(self, title: str, timeframe: str) -> str:
+        """
+        Текст сигнала по последним закрытым свечам (индикаторы из общего
+        кэша AI Core - повторные запросы не пересчитывают их)
+        
+        Args:
+            title: Заголовок сообщения
+            timeframe: Желаемый таймфрейм (ближайший из анализируемых)
+        """
+        try:
+            signal = await self.ai_core.get_latest_signal(timeframe)
+        except Exception as e:
+            logger.error(f"❌ Ошибка получения сигнала AI Core: {e}")
+            signal = None
+        
+        if not signal:
+            return (
+                f"{title}\n\n"
+                "⏳ Сейчас нет сигналов с достаточной уверенностью.\n"
+                "Попробуйте позже."
+            )
+        
+        direction = signal['signal_type']
+        arrow = '🟢' if direction == 'CALL' else '🔴'
+        return (
+            f"{title}\n\n"
+            f"📊 Актив: {signal['symbol']}\n"
+            f"📈 Направление: {arrow} {direction}\n"
+            f"⏱️ Таймфрейм: {signal.get('timeframe', timeframe)}\n"
+            f"🎯 Уверенность: {signal['confidence']:.0f}%\n\n"
+            "⚠️ Не является финансовой рекомендацией."
+        )
+    
+    # ========================================
+    # РАССЫЛКА СИГНАЛОВ AI CORE
+    # ========================================
+    
+    @staticmethod
+    def format_signal_message(signal: Dict[str, Any]) -> str:
+        """Текст уведомления о сигнале AI Core"""
+        direction = signal.get('signal_type', '')
+        arrow = '🟢' if direction == 'CALL' else '🔴'
+        return (
+            "🤖 **СИГНАЛ AI CORE**\n\n"
+            f"📊 Актив: {signal.get('symbol', '')}\n"
+            f"📈 Направление: {arrow} {direction}\n"
+            f"⏱️ Таймфрейм: {signal.get('timeframe', '5m')}\n"
+            f"🎯 Уверенность: {signal.get('confidence', 0):.0f}%\n\n"
+            "⚠️ Не является финансовой рекомендацией."
+        )
+    
+    async def notify_signal(self, bot, chat_ids: List[int], signal: Dict[str, Any]) -> int:
+        """
+        Отправить сигнал AI Core в чаты Telegram (подписчик шины сигналов)
+        
+        Args:
+            bot: telegram.Bot
+            chat_ids: Получатели
+            signal: Сигнал AI Core
+        
+        Returns:
+            int: Количество доставленных сообщений
+        """
+        text = self.format_signal_message(signal)
+        sent = 0
+        for chat_id in chat_ids:
+            try:
+                await bot.send_message(chat_id=chat_id, text=text, parse_mode='Markdown')
+                sent += 1
+            except Exception as e:
+                logger.error(f"❌ Ошибка отправки сигнала в чат {chat_id}: {e}")
+        return sent
+    
     # ========================================
     # ОБРАБОТЧИК CALLBACK КНОПОК
     # ========================================
@@ -0,0 +1,350 @@
+"""
+user_stats.py - Сводная статистика пользователя (rollup) по его сигналам
+Версия: 1.0
+Дата: 2026-10-18
+
+Обеспечивает:
+- Одну строку user_stats на пользователя: счетчики сигналов и исходов,
+  P&L, текущую и рекордные серии, разбивку по активам
+- Обновление строки за O(1) на добавленный или закрытый сигнал, поэтому
+  /my_stats читает одну маленькую строку вместо всей истории сигналов
+- Приращения (delta) для функции БД apply_user_stats: строка меняется
+  атомарно на стороне БД, без чтения-изменения-записи в клиенте
+- Полный пересчет строки из истории сигналов (для пользователей без
+  строки и для проверки)
+
+Серия (streak) - подряд идущие win или loss в порядке закрытия;
+draw и skipped серию не прерывают. current_streak > 0 - выигрыши подряд,
+< 0 - проигрыши подряд.
+
+Таблица в Supabase (Postgres):
+    CREATE TABLE user_stats (
+        user_id TEXT PRIMARY KEY,
+        total_signals INTEGER DEFAULT 0,
+        wins INTEGER DEFAULT 0,
+        losses INTEGER DEFAULT 0,
+        draws INTEGER DEFAULT 0,
+        total_profit DOUBLE PRECISION DEFAULT 0,
+        current_streak INTEGER DEFAULT 0,
+        best_win_streak INTEGER DEFAULT 0,
+        worst_loss_streak INTEGER DEFAULT 0,
+        assets JSONB DEFAULT '{}',
+        updated_at TIMESTAMPTZ
+    );
+
+Приращения применяются функцией (одно обращение rpc на пачку записей).
+Строка блокируется только внутри БД на время своего обновления; строки,
+которой еще нет, функция не создает - ее создает пересчет из истории
+при первом чтении:
+    CREATE OR REPLACE FUNCTION apply_user_stats(deltas JSONB) RETURNS VOID AS $$
+    DECLARE
+        d JSONB;
+        s user_stats%ROWTYPE;
+        asset TEXT;
+        a JSONB;
+        outcome TEXT;
+    BEGIN
+        FOR d IN SELECT * FROM jsonb_array_elements(deltas) LOOP
+            SELECT * INTO s FROM user_stats WHERE user_id = d->>'user_id' FOR UPDATE;
+            CONTINUE WHEN NOT FOUND;
+            FOR asset, a IN SELECT * FROM jsonb_each(d->'assets') LOOP
+                s.assets := jsonb_set(s.assets, ARRAY[asset], jsonb_build_object(
+                    'total', COALESCE((s.assets->asset->>'total')::INT, 0) + (a->>'total')::INT,
+                    'wins', COALESCE((s.assets->asset->>'wins')::INT, 0) + (a->>'wins')::INT,
+                    'losses', COALESCE((s.assets->asset->>'losses')::INT, 0) + (a->>'losses')::INT,
+                    'profit', COALESCE((s.assets->asset->>'profit')::FLOAT, 0) + (a->>'profit')::FLOAT));
+            END LOOP;
+            FOR outcome IN SELECT * FROM jsonb_array_elements_text(d->'outcomes') LOOP
+                IF outcome = 'win' THEN
+                    s.current_streak := GREATEST(s.current_streak, 0) + 1;
+                    s.best_win_streak := GREATEST(s.best_win_streak, s.current_streak);
+                ELSE
+                    s.current_streak := LEAST(s.current_streak, 0) - 1;
+                    s.worst_loss_streak := GREATEST(s.worst_loss_streak, -s.current_streak);
+                END IF;
+            END LOOP;
+            UPDATE user_stats SET
+                total_signals = total_signals + (d->>'total_signals')::INT,
+                wins = wins + (d->>'wins')::INT,
+                losses = losses + (d->>'losses')::INT,
+                draws = draws + (d->>'draws')::INT,
+                total_profit = total_profit + (d->>'total_profit')::FLOAT,
+                current_streak = s.current_streak,
+                best_win_streak = s.best_win_streak,
+                worst_loss_streak = s.worst_loss_streak,
+                assets = s.assets,
+                updated_at = NOW()
+            WHERE user_id = s.user_id;
+        END LOOP;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Optional, Dict, List, Any
+
+logger = logging.getLogger(__name__)
+
+USER_STATS_TABLE = 'user_stats'
+APPLY_FUNCTION = 'apply_user_stats'
+
+# Колонки строки (кроме user_id, assets и updated_at)
+COUNTERS = ('total_signals', 'wins', 'losses', 'draws', 'total_profit',
+            'current_streak', 'best_win_streak', 'worst_loss_streak')
+
+# Поле счетчика для результата сигнала
+RESULT_FIELDS = {'win': 'wins', 'loss': 'losses', 'draw': 'draws'}
+
+
+def signal_asset(signal: Dict[str, Any]) -> str:
+    """Актив сигнала (asset у пользовательских сигналов, symbol у AI Core)"""
+    return signal.get('asset') or signal.get('symbol') or 'unknown'
+
+
+def empty_rollup(user_id) -> Dict[str, Any]:
+    """Строка пользователя без сигналов"""
+    rollup = {'user_id': str(user_id), 'assets': {}}
+    rollup.update({field: 0 for field in COUNTERS})
+    rollup['total_profit'] = 0.0
+    return rollup
+
+
+def decode_rollup(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Строка из БД -> rollup (assets из SQLite приходит строкой JSON)"""
+    rollup = empty_rollup(row['user_id'])
+    for field in COUNTERS:
+        if row.get(field) is not None:
+            rollup[field] = row[field]
+    assets = row.get('assets') or {}
+    rollup['assets'] = json.loads(assets) if isinstance(assets, str) else dict(assets)
+    return rollup
+
+
+def encode_rollup(rollup: Dict[str, Any]) -> Dict[str, Any]:
+    """rollup -> строка для upsert"""
+    row = dict(rollup)
+    row['updated_at'] = datetime.now(timezone.utc).isoformat()
+    return row
+
+
+def _asset_entry(rollup: Dict[str, Any], asset: str) -> Dict[str, Any]:
+    return rollup['assets'].setdefault(asset, {'total': 0, 'wins': 0, 'losses': 0, 'profit': 0.0})
+
+
+# ========================================
+# ОБНОВЛЕНИЕ
+# ========================================
+
+def add_signal(rollup: Dict[str, Any], asset: str):
+    """Учесть новый (еще не закрытый) сигнал"""
+    rollup['total_signals'] += 1
+    _asset_entry(rollup, asset)['total'] += 1
+
+
+def apply_result(rollup: Dict[str, Any], asset: str, result: str, profit_loss: Optional[float],
+                 previous: str = None, previous_profit: Optional[float] = None):
+    """
+    Учесть закрытие сигнала
+
+    Для приращения (new_delta) серия не пересчитывается, а результат
+    добавляется в outcomes - серию продолжит merge_delta или функция БД.
+
+    Args:
+        rollup: Строка пользователя
+        asset: Актив сигнала
+        result: 'win', 'loss', 'draw' или 'skipped'
+        profit_loss: P&L сигнала (None считается нулем)
+        previous: Прежний результат, если сигнал закрывается повторно
+            (исправление): его счетчики и P&L вычитаются, серии не меняются
+        previous_profit: Прежний P&L при исправлении
+    """
+    entry = _asset_entry(rollup, asset)
+
+    if previous:
+        field = RESULT_FIELDS.get(previous)
+        if field:
+            rollup[field] -= 1
+            if field in entry:
+                entry[field] -= 1
+        rollup['total_profit'] -= previous_profit or 0.0
+        entry['profit'] -= previous_profit or 0.0
+
+    field = RESULT_FIELDS.get(result)
+    if field:
+        rollup[field] += 1
+        if field in entry:
+            entry[field] += 1
+    rollup['total_profit'] += profit_loss or 0.0
+    entry['profit'] += profit_loss or 0.0
+
+    if previous or result not in ('win', 'loss'):
+        return
+
+    if 'outcomes' in rollup:
+        rollup['outcomes'].append(result)
+    else:
+        _extend_streak(rollup, result)
+
+
+def _extend_streak(rollup: Dict[str, Any], result: str):
+    streak = rollup['current_streak']
+    if result == 'win':
+        streak = streak + 1 if streak > 0 else 1
+        rollup['best_win_streak'] = max(rollup['best_win_streak'], streak)
+    else:
+        streak = streak - 1 if streak < 0 else -1
+        rollup['worst_loss_streak'] = max(rollup['worst_loss_streak'], -streak)
+    rollup['current_streak'] = streak
+
+
+def new_delta(user_id) -> Dict[str, Any]:
+    """
+    Пустое приращение строки пользователя
+
+    Счетчики и assets обновляются теми же add_signal и apply_result,
+    что и строка; win/loss копятся в outcomes в порядке закрытия.
+    """
+    delta = empty_rollup(user_id)
+    delta['outcomes'] = []
+    return delta
+
+
+def merge_delta(rollup: Dict[str, Any], delta: Dict[str, Any]):
+    """Применить приращение к строке (то же, что функция БД apply_user_stats)"""
+    for field in RESULT_FIELDS.values():
+        rollup[field] += delta[field]
+    rollup['total_signals'] += delta['total_signals']
+    rollup['total_profit'] += delta['total_profit']
+
+    for asset, change in delta['assets'].items():
+        entry = _asset_entry(rollup, asset)
+        for key in ('total', 'wins', 'losses', 'profit'):
+            entry[key] += change[key]
+
+    for result in delta['outcomes']:
+        _extend_streak(rollup, result)
+
+
+def build_rollup(user_id, signals: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Пересчитать строку из истории сигналов
+
+    Args:
+        user_id: ID пользователя
+        signals: Сигналы пользователя от старых к новым
+
+    Returns:
+        Dict: rollup
+    """
+    rollup = empty_rollup(user_id)
+    for signal in signals:
+        asset = signal_asset(signal)
+        add_signal(rollup, asset)
+        if signal.get('result'):
+            apply_result(rollup, asset, signal['result'], signal.get('profit_loss'))
+    return rollup
+
+
+# ========================================
+# ОТЧЕТ
+# ========================================
+
+def summarize(rollup: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Статистика для /my_stats
+
+    win_rate считается по закрытым win/loss, как в signal_performance.
+
+    Returns:
+        Dict: total_signals, wins, losses, draws, win_rate, total_profit,
+        current_streak, best_win_streak, worst_loss_streak, by_asset
+        ({актив: total, wins, losses, win_rate, profit})
+    """
+    def win_rate(wins: int, losses: int) -> float:
+        return wins / (wins + losses) * 100 if wins + losses else 0.0
+
+    stats = {field: rollup[field] for field in COUNTERS}
+    stats['win_rate'] = win_rate(rollup['wins'], rollup['losses'])
+    stats['by_asset'] = {
+        asset: {**entry, 'win_rate': win_rate(entry['wins'], entry['losses'])}
+        for asset, entry in sorted(rollup['assets'].items(), key=lambda item: -item[1]['total'])
+    }
+    return stats
+
+
+# ========================================
+# ТЕСТ
+# ========================================
+
+def test_user_stats(signals: int = 2000) -> bool:
+    """
+    Сверить онлайн-обновление с пересчетом из истории
+
+    Returns:
+        bool: True если rollup совпадает
+    """
+    import random
+
+    rng = random.Random(11)
+    history = []
+    online = empty_rollup(1)
+
+    for i in range(signals):
+        signal = {'asset': rng.choice(['BTC-USD', 'ETH-USD', 'EURUSD=X']), 'result': None, 'profit_loss': None}
+        history.append(signal)
+        add_signal(online, signal_asset(signal))
+
+        # Закрываем сигналы в порядке создания, часть остается открытой
+        if i % 10 != 9:
+            signal['result'] = rng.choice(['win', 'win', 'loss', 'draw', 'skipped'])
+            signal['profit_loss'] = {'win': 0.92, 'loss': -1.0}.get(signal['result'], 0.0)
+            apply_result(online, signal_asset(signal), signal['result'], signal['profit_loss'])
+
+    streaks = ('current_streak', 'best_win_streak', 'worst_loss_streak')
+    rebuilt = build_rollup(1, history)
+    ok = all(online[field] == rebuilt[field] for field in streaks)
+
+    # Исправление результата не меняет итог относительно пересчета
+    fixed = history[0]
+    apply_result(online, signal_asset(fixed), 'loss', -1.0, previous=fixed['result'],
+                 previous_profit=fixed['profit_loss'])
+    fixed['result'], fixed['profit_loss'] = 'loss', -1.0
+
+    rebuilt = build_rollup(1, history)
+    stored = decode_rollup(json.loads(json.dumps({**encode_rollup(online), 'assets': json.dumps(online['assets'])})))
+
+    counters = ('total_signals', 'wins', 'losses', 'draws', 'total_profit')
+    ok &= all(abs(online[field] - rebuilt[field]) < 1e-9 for field in counters)
+    ok &= all(
+        abs(online['assets'][asset][key] - rebuilt['assets'][asset][key]) < 1e-9
+        for asset in rebuilt['assets'] for key in ('total', 'wins', 'losses', 'profit')
+    )
+    ok &= summarize(stored) == summarize(online)
+
+    # Те же сигналы пачками приращений (как через apply_user_stats) дают ту же строку
+    merged = empty_rollup(1)
+    for start in range(0, signals, 97):
+        delta = new_delta(1)
+        for signal in history[start:start + 97]:
+            add_signal(delta, signal_asset(signal))
+            if signal['result']:
+                apply_result(delta, signal_asset(signal), signal['result'], signal['profit_loss'])
+        merge_delta(merged, json.loads(json.dumps(delta)))
+    ok &= all(abs(merged[field] - rebuilt[field]) < 1e-9 for field in COUNTERS)
+    ok &= all(
+        abs(merged['assets'][asset][key] - rebuilt['assets'][asset][key]) < 1e-9
+        for asset in rebuilt['assets'] for key in ('total', 'wins', 'losses', 'profit')
+    )
+
+    if ok:
+        logger.info(f"✅ user_stats: онлайн-обновление совпадает с пересчетом ({signals} сигналов)")
+    else:
+        logger.error("❌ user_stats: онлайн-обновление расходится с пересчетом")
+    return ok
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    test_user_stats()
@@ -135,5 +135,27 @@ class WebhookSystem:
             'strategy': signal.get('strategy', '')
         }
 
+    async def send_ai_signal(self, signal: Dict[str, Any]) -> bool:
+        """
+        Отправить сигнал AI Core через webhook (подписчик шины сигналов)
+        
+        Args:
+            signal: Сигнал AI Core (symbol, signal_type, timeframe, ...)
+            
+        Returns:
+            bool: True если отправка успешна, False иначе
+        """
+        if not self.webhook_enabled or not self.webhook_url:
+            return False
+        
+        timeframe = signal.get('timeframe', '5m')
+        signal_type = 'short' if timeframe in ('1m', '5m', '15m') else 'long'
+        data = self.format_signal_for_webhook({
+            **signal,
+            'asset': signal.get('symbol', ''),
+            'direction': signal.get('signal_type', '')
+        }, signal_type)
+        return await self.send_signal(data)
+
 # Глобальный экземпляр webhook системы
 webhook_system = WebhookSystem()